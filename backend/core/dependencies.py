@@ -4,9 +4,9 @@
 """
 Shared dependencies for FastAPI routes
 """
-from functools import lru_cache
 from pathlib import Path
 import sys
+import threading
 
 # Add project root to path
 project_root = Path(__file__).parent.parent.parent
@@ -16,12 +16,36 @@ if str(project_root) not in sys.path:
 from main import DocMemorySystem
 from backend.core.config import settings
 
-@lru_cache()
-def get_docmemory_system():
+# A request arriving while warm-up is still building the system must wait
+# for that build rather than start a second system on the same storage
+_system = None
+_system_lock = threading.Lock()
+
+def build_docmemory_system() -> DocMemorySystem:
+    """Create a DocMemory system from the settings"""
+    return DocMemorySystem(
+        storage_path=settings.STORAGE_PATH,
+        ingest_workers=settings.INGEST_WORKERS,
+        watch_directories=settings.WATCH_DIRECTORIES,
+        role=settings.SERVING_ROLE,
+        index_sync_interval=settings.INDEX_SYNC_INTERVAL,
+        trace_sample_rate=settings.TRACE_SAMPLE_RATE
+    )
+
+def get_docmemory_system() -> DocMemorySystem:
     """
-    Get or create DocMemory system instance
-    Uses LRU cache to ensure singleton pattern
+    Get or create the DocMemory system instance
+    Built once under a lock, so concurrent first calls share one instance
     """
-    # TODO: Consider using dependency injection container
-    return DocMemorySystem(storage_path=settings.STORAGE_PATH)
+    global _system
+    if _system is None:
+        with _system_lock:
+            if _system is None:
+                _system = build_docmemory_system()
+    return _system
 
+def reset_docmemory_system():
+    """Forget the instance so the next call builds a new one (after a restore)"""
+    global _system
+    with _system_lock:
+        _system = None
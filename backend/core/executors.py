@@ -0,0 +1,108 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Bounded executors for blocking work called from async handlers
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable, Dict
+from fastapi import HTTPException
+from backend.core.config import settings
+
+class BoundedExecutor:
+    """
+    Thread pool with queue-depth admission control
+    
+    At most max_workers calls run at once and max_queue more may wait.
+    Beyond that, calls are rejected immediately with 503 so one kind of
+    traffic cannot build an unbounded backlog in front of another.
+    """
+    
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-executor")
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.paused = False
+    
+    def _release(self, _future):
+        with self.lock:
+            self.in_flight -= 1
+    
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on the pool, or raise 503 when the queue is full"""
+        with self.lock:
+            if self.paused:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Maintenance in progress, retry shortly",
+                    headers={"Retry-After": "5"}
+                )
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"{self.name.capitalize()} capacity exhausted, retry shortly",
+                    headers={"Retry-After": "1"}
+                )
+            self.in_flight += 1
+        
+        # Release the slot when the work finishes, even if the client went away
+        future = self.executor.submit(partial(func, *args, **kwargs))
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+    
+    def stats(self) -> Dict[str, int]:
+        """Current load of the pool"""
+        with self.lock:
+            return {
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.max_workers),
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "rejected": self.rejected
+            }
+
+@asynccontextmanager
+async def drained(*executors: BoundedExecutor, timeout: float = 30.0):
+    """Stop admitting calls to the executors and wait for the running ones to finish
+    
+    Calls arriving meanwhile are rejected with 503, so maintenance such as
+    an in-place restore never closes the system under a request that is
+    still using it. Raises 409 if another drain is in progress and 503 if
+    the running calls do not finish within timeout.
+    """
+    with _drain_lock:
+        if any(executor.paused for executor in executors):
+            raise HTTPException(status_code=409, detail="Another maintenance operation is in progress")
+        for executor in executors:
+            executor.paused = True
+    try:
+        deadline = time.monotonic() + timeout
+        while any(executor.in_flight for executor in executors):
+            if time.monotonic() > deadline:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Requests are still running, retry shortly",
+                    headers={"Retry-After": "5"}
+                )
+            await asyncio.sleep(0.05)
+        yield
+    finally:
+        for executor in executors:
+            executor.paused = False
+
+_drain_lock = threading.Lock()
+
+# Separate pools so bulk uploads cannot starve interactive search
+search_executor = BoundedExecutor("search", settings.SEARCH_WORKERS, settings.SEARCH_QUEUE_LIMIT)
+ingest_executor = BoundedExecutor("ingest", settings.INGEST_EXECUTOR_WORKERS, settings.INGEST_QUEUE_LIMIT)
@@ -0,0 +1,113 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Fast JSON responses and negotiated compression
+"""
+import gzip
+import json
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson (falls back to the json module)"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported content coding the client accepts: br, then gzip"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        # Low quality levels keep brotli faster than gzip at a better ratio
+        return brotli.compress(body, quality=4)
+    # Level 1 is nearly twice as fast as the default on JSON and loses only a few percent
+    return gzip.compress(body, compresslevel=1)
+
+class CompressionMiddleware:
+    """Compress complete responses with br or gzip according to Accept-Encoding
+    
+    Only responses sent as a single body of at least minimum_size bytes are
+    compressed. Streamed responses (NDJSON/SSE search, file downloads) pass
+    through untouched so their first bytes are not held back.
+    """
+    
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        start_message = None
+        
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body is compressed
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+            
+            initial, start_message = start_message, None
+            headers = MutableHeaders(raw=initial["headers"])
+            body = message.get("body", b"")
+            if (message.get("more_body", False) or len(body) < self.minimum_size
+                    or "content-encoding" in headers):
+                await send(initial)
+                await send(message)
+                return
+            
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(initial)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+        
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,242 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Streaming upload spooling and archive unpacking
+"""
+import hashlib
+import os
+import tarfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from backend.core.config import settings
+
+# Room for multipart boundaries, part headers and form fields around the files
+FORM_OVERHEAD = 64 * 1024
+
+def upload_body_limit(path: str) -> Optional[int]:
+    """Largest request body accepted by an upload route, or None for other routes"""
+    if path.startswith("/api/documents/bulk"):
+        return settings.MAX_BULK_SIZE + FORM_OVERHEAD
+    if path.startswith(("/api/documents/upload", "/api/documents/update")):
+        return settings.MAX_UPLOAD_SIZE + FORM_OVERHEAD
+    return None
+
+class UploadLimitMiddleware:
+    """Reject upload bodies over their limit before the multipart form is parsed
+    
+    Starlette receives and parses the whole form into temporary files before
+    a route runs, so a size check in the route only fires once the upload
+    has already been read. A declared Content-Length over the limit is
+    answered with 413 without reading the body; a chunked body is counted
+    as it arrives and cut off as soon as it passes the limit.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        limit = upload_body_limit(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            await self.reject(send, limit)
+            return
+        
+        received = 0
+        rejected = False
+        
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request" and not rejected:
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    await self.reject(send, limit)
+                    # Ends form parsing as if the client had gone away
+                    return {"type": "http.disconnect"}
+            return message
+        
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+    
+    @staticmethod
+    async def reject(send, limit: int):
+        body = f'{{"detail":"Request body exceeds maximum size of {limit} bytes"}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+@dataclass
+class SpooledUpload:
+    """An upload written to disk, with its SHA-256 computed while streaming"""
+    path: Path
+    sha256: str
+    size: int
+    filename: str
+
+async def spool_upload(file: UploadFile, destination: Path) -> SpooledUpload:
+    """
+    Copy a received upload to the spool in fixed-size chunks, hashing it on the way
+    
+    Memory use stays at one chunk regardless of payload size. The request
+    body was already received by the time this runs; UploadLimitMiddleware
+    turns oversized requests away before that. This check catches a file
+    over MAX_UPLOAD_SIZE inside a body that fit the limit: the spool file
+    is removed and the upload rejected with 413.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(destination, 'wb') as spool_file:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds maximum size of {settings.MAX_UPLOAD_SIZE} bytes"
+                    )
+                digest.update(chunk)
+                spool_file.write(chunk)
+    except BaseException:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+    
+    return SpooledUpload(
+        path=Path(destination),
+        sha256=digest.hexdigest(),
+        size=size,
+        filename=file.filename or Path(destination).name
+    )
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+@dataclass
+class BulkUpload:
+    """Files spooled from a bulk upload, with the entries that were left out"""
+    uploads: List[SpooledUpload] = field(default_factory=list)
+    duplicates: List[Dict[str, str]] = field(default_factory=list)
+    skipped: List[Dict[str, str]] = field(default_factory=list)
+    
+    def discard(self):
+        """Remove every spooled file"""
+        for upload in self.uploads:
+            if os.path.exists(upload.path):
+                os.remove(upload.path)
+
+def is_archive(filename: str) -> bool:
+    """Whether an uploaded file name looks like a zip or tar archive"""
+    return (filename or '').lower().endswith(ARCHIVE_SUFFIXES)
+
+def _iter_archive(fileobj: BinaryIO, filename: str) -> Iterator[Tuple[str, BinaryIO]]:
+    """Yield (member name, stream) for each regular file in an archive
+    
+    Tar archives are read strictly sequentially, zip members are opened one
+    at a time, so no member is ever held in memory as a whole.
+    """
+    if filename.lower().endswith('.zip'):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as stream:
+                        yield info.filename, stream
+    else:
+        with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, archive.extractfile(member)
+
+def _copy_to_spool(stream: BinaryIO, destination: Path, filename: str) -> SpooledUpload:
+    """Copy a stream to disk in chunks, hashing it on the way"""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(destination, 'wb') as spool_file:
+            for chunk in iter(lambda: stream.read(settings.UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{filename} exceeds maximum size of {settings.MAX_UPLOAD_SIZE} bytes"
+                    )
+                digest.update(chunk)
+                spool_file.write(chunk)
+    except BaseException:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+    
+    return SpooledUpload(path=Path(destination), sha256=digest.hexdigest(), size=size, filename=filename)
+
+def spool_bulk_upload(files: List[UploadFile],
+                      new_path: Callable[[str], Path],
+                      supported_formats: List[str]) -> BulkUpload:
+    """
+    Spool every document of a bulk upload, unpacking archives as they stream
+    
+    Blocking; run it in a worker thread. Entries with unsupported formats are
+    skipped and entries whose content repeats an earlier one are dropped.
+    """
+    bulk = BulkUpload()
+    first_by_hash = {}
+    total_size = 0
+    
+    def entries() -> Iterator[Tuple[str, BinaryIO]]:
+        for file in files:
+            if is_archive(file.filename):
+                yield from _iter_archive(file.file, file.filename)
+            else:
+                yield file.filename or 'upload', file.file
+    
+    try:
+        for name, stream in entries():
+            suffix = Path(name).suffix.lower()
+            if '__MACOSX' in Path(name).parts:
+                continue
+            if suffix not in supported_formats:
+                bulk.skipped.append({"filename": name, "reason": f"Unsupported file format: {suffix}"})
+                continue
+            
+            upload = _copy_to_spool(stream, new_path(suffix), name)
+            total_size += upload.size
+            if total_size > settings.MAX_BULK_SIZE:
+                os.remove(upload.path)
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Bulk upload exceeds maximum size of {settings.MAX_BULK_SIZE} bytes"
+                )
+            
+            if upload.sha256 in first_by_hash:
+                os.remove(upload.path)
+                bulk.duplicates.append({"filename": name, "duplicate_of": first_by_hash[upload.sha256]})
+                continue
+            first_by_hash[upload.sha256] = name
+            bulk.uploads.append(upload)
+    except BaseException:
+        bulk.discard()
+        raise
+    
+    return bulk
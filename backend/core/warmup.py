@@ -0,0 +1,72 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Startup warm-up and readiness state
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+class WarmupState:
+    """Tracks the warm-up of the DocMemory system for the readiness probe"""
+    
+    def __init__(self):
+        self.ready = False
+        self.running = False
+        self.error: Optional[str] = None
+        self.phases: Dict[str, float] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.lock = threading.Lock()
+    
+    def run(self, get_system: Callable, replay_queries: int = 0):
+        """Build the system and warm it up, recording per-phase timings"""
+        with self.lock:
+            if self.running or self.ready:
+                return
+            self.running = True
+            self.error = None
+            self.started_at = time.perf_counter()
+        
+        try:
+            start = time.perf_counter()
+            system = get_system()
+            self.phases['system'] = time.perf_counter() - start
+            self.phases.update(system.warm_up(replay_queries=replay_queries))
+            self.ready = True
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+            self.error = str(e)
+        finally:
+            self.finished_at = time.perf_counter()
+            self.running = False
+    
+    def start(self, get_system: Callable, replay_queries: int = 0) -> threading.Thread:
+        """Warm up on a background thread so the server can answer probes meanwhile"""
+        thread = threading.Thread(
+            target=self.run, args=(get_system, replay_queries), name="warmup", daemon=True
+        )
+        thread.start()
+        return thread
+    
+    def report(self) -> Dict:
+        """Readiness status with per-phase timings in seconds"""
+        if self.ready:
+            status = "ready"
+        elif self.error:
+            status = "failed"
+        else:
+            status = "warming_up" if self.running else "not_started"
+        
+        total = None
+        if self.started_at is not None:
+            total = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "status": status,
+            "phases": {phase: round(seconds, 4) for phase, seconds in self.phases.items()},
+            "total_seconds": round(total, 4) if total is not None else None,
+            "error": self.error
+        }
+
+warmup_state = WarmupState()
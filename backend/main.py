@@ -5,6 +5,7 @@
 DocMemory FastAPI Backend
 Main application entry point
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
@@ -13,15 +14,34 @@ import sys
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from backend.routers import documents, search, health
+from backend.routers import backups, documents, search, health, jobs, metrics
 from backend.core.config import settings
+from backend.core.dependencies import get_docmemory_system
+from backend.core.responses import CompressionMiddleware, FastJSONResponse
+from backend.core.uploads import UploadLimitMiddleware
+from backend.core.warmup import warmup_state
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build and warm up the system before /api/ready reports ready
+    if settings.WARMUP_ON_STARTUP:
+        warmup_state.start(get_docmemory_system, replay_queries=settings.WARMUP_REPLAY_QUERIES)
+    yield
 
 app = FastAPI(
     title="DocMemory API",
     description="Semantic Document Memory System API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Turn oversized uploads away before their multipart body is read
+app.add_middleware(UploadLimitMiddleware)
+
+# Compress large responses (full document content, big result pages)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +55,9 @@ app.add_middleware(
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(documents.router, prefix="/api/documents", tags=["documents"])
 app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(backups.router, prefix="/api/backups", tags=["backups"])
+app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 async def root():
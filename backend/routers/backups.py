@@ -0,0 +1,106 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Backup snapshot and restore endpoints
+"""
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from backend.core.config import settings
+from backend.core.dependencies import get_docmemory_system, reset_docmemory_system
+from backend.core.executors import drained, ingest_executor, search_executor
+from src.index_generations import ROLE_READER
+
+router = APIRouter()
+
+class SnapshotRequest(BaseModel):
+    label: Optional[str] = None
+
+class RestoreRequest(BaseModel):
+    snapshot_id: Optional[str] = None
+    until: Optional[datetime] = None
+    target_path: Optional[str] = None
+
+def summarize(manifest: dict) -> dict:
+    """Snapshot fields returned by the API (without the block lists)"""
+    return {key: value for key, value in manifest.items() if key != "files"}
+
+@router.get("/")
+async def list_backups(system = Depends(get_docmemory_system)):
+    """
+    List backup snapshots, oldest first
+    """
+    snapshots = await search_executor.run(system.backup_manager.list_snapshots)
+    return {"snapshots": [summarize(manifest) for manifest in snapshots]}
+
+@router.post("/")
+async def create_backup(
+    request: Optional[SnapshotRequest] = None,
+    system = Depends(get_docmemory_system)
+):
+    """
+    Take a snapshot now; the system keeps serving while it runs
+    """
+    try:
+        label = request.label if request else None
+        manifest = await ingest_executor.run(system.backup_manager.create_snapshot, label)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Backup failed: {str(e)}")
+    return summarize(manifest)
+
+def restore_target(target_path: str) -> Path:
+    """Resolve a requested restore target under RESTORE_ROOT, rejecting anything outside it"""
+    if not settings.RESTORE_ROOT:
+        raise HTTPException(status_code=403, detail="Restores to another directory are disabled (set RESTORE_ROOT)")
+    root = Path(settings.RESTORE_ROOT).resolve()
+    target = (root / target_path).resolve()
+    if root not in target.parents:
+        raise HTTPException(status_code=400, detail="target_path must be a directory inside RESTORE_ROOT")
+    return target
+
+def restore_in_place(system, request: RestoreRequest) -> dict:
+    """Stop the system, restore its storage and start a fresh one"""
+    manager = system.backup_manager
+    system.close()
+    try:
+        return manager.restore(snapshot_id=request.snapshot_id, until=request.until)
+    finally:
+        reset_docmemory_system()
+        get_docmemory_system()
+
+@router.post("/restore")
+async def restore_backup(
+    request: RestoreRequest,
+    system = Depends(get_docmemory_system)
+):
+    """
+    Restore a snapshot, optionally rolled forward to "until"
+    
+    With target_path the snapshot is restored into that directory, relative
+    to RESTORE_ROOT, and this server keeps running unchanged. Without it the
+    storage is restored in place: new requests are rejected with 503, the
+    running ones are allowed to finish, and the system is then stopped,
+    restored and rebuilt.
+    """
+    try:
+        if request.target_path:
+            return await ingest_executor.run(
+                system.backup_manager.restore,
+                snapshot_id=request.snapshot_id,
+                target_path=str(restore_target(request.target_path)),
+                until=request.until
+            )
+        if system.role == ROLE_READER:
+            raise HTTPException(status_code=409, detail="Restore in place on the writer process")
+        async with drained(search_executor, ingest_executor):
+            return await asyncio.to_thread(restore_in_place, system, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Restore failed: {str(e)}")
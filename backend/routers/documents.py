@@ -5,14 +5,22 @@
 Document management endpoints
 """
 import os
-import tempfile
-from typing import Optional
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from pathlib import Path
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
 from backend.core.dependencies import get_docmemory_system
+from backend.core.executors import ingest_executor, search_executor
+from backend.core.responses import FastJSONResponse
+from backend.core.uploads import spool_bulk_upload, spool_upload
 
 router = APIRouter()
 
-@router.post("/upload")
+def require_writer(system):
+    """Reject writes on a read-only search worker before anything is spooled"""
+    if system.read_only:
+        raise HTTPException(status_code=409, detail="Search workers are read-only; send uploads to the writer process")
+
+@router.post("/upload", status_code=202)
 async def upload_document(
     file: UploadFile = File(...),
     title: Optional[str] = None,
@@ -21,39 +29,139 @@ async def upload_document(
 ):
     """
     Upload a document to the system
+    
+    The file is streamed into the store and queued for background ingestion;
+    poll GET /api/jobs/{job_id} for progress.
     """
-    # Save uploaded file temporarily
-    temp_path = None
+    require_writer(system)
+    suffix = os.path.splitext(file.filename)[1] if file.filename else '.txt'
+    upload = await spool_upload(file, system.new_upload_path(suffix))
     try:
-        # Create temporary file
-        suffix = os.path.splitext(file.filename)[1] if file.filename else '.txt'
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            temp_path = tmp_file.name
-            content = await file.read()
-            tmp_file.write(content)
+        # A re-upload of identical content returns the stored chunks
+        existing_ids = await ingest_executor.run(system.find_documents_by_file_hash, upload.sha256)
+        if existing_ids is not None:
+            os.remove(upload.path)
+            return {
+                "success": True,
+                "job_id": None,
+                "status": "completed",
+                "document_ids": existing_ids,
+                "count": len(existing_ids),
+                "filename": file.filename,
+                "duplicate": True
+            }
+        
+        # Parse tags
+        tag_list = tags.split(',') if tags else []
+        
+        # Queue the document for background ingestion
+        job_id = await ingest_executor.run(system.enqueue_documents, [{
+            "path": str(upload.path),
+            "filename": file.filename,
+            "title": title or file.filename,
+            "tags": tag_list,
+            "file_hash": upload.sha256
+        }])
         
+        return {
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "filename": file.filename,
+            "duplicate": False
+        }
+    except Exception as e:
+        if os.path.exists(upload.path):
+            os.remove(upload.path)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+@router.post("/bulk", status_code=202)
+async def bulk_upload_documents(
+    files: List[UploadFile] = File(...),
+    tags: Optional[str] = None,
+    system = Depends(get_docmemory_system)
+):
+    """
+    Upload many documents, or zip/tar archives of documents, as one job
+    
+    Archives are unpacked as they stream, entries with identical content are
+    ingested once, and everything goes through the parallel batch pipeline.
+    Poll GET /api/jobs/{job_id} for per-file results.
+    """
+    require_writer(system)
+    bulk = await ingest_executor.run(
+        spool_bulk_upload, files, system.new_upload_path, system.supported_formats()
+    )
+    try:
         # Parse tags
         tag_list = tags.split(',') if tags else []
         
-        # Add document to system
-        doc_ids = system.add_document_from_file(
-            file_path=temp_path,
-            title=title or file.filename,
+        entries = [{
+            "path": str(upload.path),
+            "filename": upload.filename,
+            "title": Path(upload.filename).stem,
+            "tags": tag_list,
+            "file_hash": upload.sha256
+        } for upload in bulk.uploads]
+        job_id = await ingest_executor.run(system.enqueue_documents, entries) if entries else None
+    except Exception as e:
+        bulk.discard()
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=500, detail=f"Bulk upload failed: {str(e)}")
+    
+    return {
+        "success": True,
+        "job_id": job_id,
+        "status": "queued" if job_id else "completed",
+        "files_queued": len(entries),
+        "duplicates": bulk.duplicates,
+        "skipped": bulk.skipped
+    }
+
+@router.put("/update")
+async def update_document(
+    file: UploadFile = File(...),
+    document_ids: str = Form(...),
+    title: Optional[str] = None,
+    tags: Optional[str] = None,
+    system = Depends(get_docmemory_system)
+):
+    """
+    Re-ingest a changed document, re-embedding only the chunks that changed
+    """
+    require_writer(system)
+    suffix = os.path.splitext(file.filename)[1] if file.filename else '.txt'
+    upload = await spool_upload(file, system.new_upload_path(suffix))
+    try:
+        # Parse previous chunk IDs and tags
+        doc_id_list = [doc_id.strip() for doc_id in document_ids.split(',') if doc_id.strip()]
+        tag_list = tags.split(',') if tags else None
+        
+        result = await ingest_executor.run(
+            system.update_document_from_file,
+            file_path=str(upload.path),
+            doc_ids=doc_id_list,
+            title=title,
             tags=tag_list
         )
+        if not result["success"]:
+            raise HTTPException(status_code=500, detail=f"Update failed: {result['error']}")
         
         return {
             "success": True,
-            "document_ids": doc_ids,
-            "count": len(doc_ids),
+            "document_ids": result["document_ids"],
+            "added": result["added"],
+            "kept": result["kept"],
+            "removed": result["removed"],
             "filename": file.filename
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
     finally:
-        # Clean up temp file
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+        # Clean up spooled file
+        if os.path.exists(upload.path):
+            os.remove(upload.path)
 
 @router.get("/")
 async def list_documents(
@@ -68,7 +176,7 @@ async def list_documents(
     # TODO: Implement proper document listing with pagination
     return {
         "documents": [],
-        "total": system.get_document_count(),
+        "total": await search_executor.run(system.get_document_count),
         "limit": limit,
         "offset": offset
     }
@@ -82,11 +190,11 @@ async def get_document(
     Get a specific document by ID
     """
     try:
-        doc = system.get_document(doc_id)
+        doc = await search_executor.run(system.get_document, doc_id)
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        return {
+        return FastJSONResponse({
             "id": doc.id,
             "title": doc.title,
             "content": doc.content,
@@ -94,7 +202,9 @@ async def get_document(
             "document_type": doc.document_type,
             "timestamp": doc.timestamp.isoformat() if doc.timestamp else None,
             "source_file": doc.source_file
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -108,11 +218,13 @@ async def get_related_documents(
     Get documents related to a specific document
     """
     try:
-        related = system.get_related_documents(doc_id, limit=limit)
-        return {
+        related = await search_executor.run(system.get_related_documents, doc_id, limit=limit)
+        return FastJSONResponse({
             "document_id": doc_id,
             "related": related
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
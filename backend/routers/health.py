@@ -4,8 +4,12 @@
 """
 Health check endpoints
 """
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
 from backend.core.dependencies import get_docmemory_system
+from backend.core.executors import ingest_executor, search_executor
+from backend.core.warmup import warmup_state
 
 router = APIRouter()
 
@@ -14,15 +18,27 @@ async def health_check():
     """Basic health check"""
     return {"status": "healthy", "service": "DocMemory API"}
 
+@router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 only once the system is built and warmed up"""
+    report = warmup_state.report()
+    return JSONResponse(status_code=200 if warmup_state.ready else 503, content=report)
+
 @router.get("/status")
 async def system_status(system = Depends(get_docmemory_system)):
     """Get system status with document count"""
     try:
-        doc_count = system.get_document_count()
+        doc_count = await search_executor.run(system.get_document_count)
         return {
             "status": "active",
             "document_count": doc_count,
-            "system_health": "good"
+            "system_health": "good",
+            "serving_role": system.role,
+            "index_generation": system.index_generation(),
+            "executors": {
+                "search": search_executor.stats(),
+                "ingest": ingest_executor.stats()
+            }
         }
     except Exception as e:
         return {
@@ -31,3 +47,11 @@ async def system_status(system = Depends(get_docmemory_system)):
             "system_health": "degraded"
         }
 
+
+@router.get("/status/memory")
+async def memory_status(
+    project_chunks: Optional[int] = Query(None, ge=0, description="Project the RSS at this many chunks"),
+    system = Depends(get_docmemory_system)
+):
+    """Estimated bytes per in-memory component and per stored chunk"""
+    return await search_executor.run(system.memory_report, project_chunks)
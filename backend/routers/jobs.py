@@ -0,0 +1,24 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Background ingestion job endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from backend.core.dependencies import get_docmemory_system
+from backend.core.executors import search_executor
+
+router = APIRouter()
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    system = Depends(get_docmemory_system)
+):
+    """
+    Get status and progress of an ingestion job
+    """
+    job = await search_executor.run(system.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
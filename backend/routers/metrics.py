@@ -0,0 +1,39 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Prometheus metrics endpoint
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from backend.core.executors import ingest_executor, search_executor
+from src.metrics import registry
+
+router = APIRouter()
+
+EXECUTORS = {"search": search_executor, "ingest": ingest_executor}
+
+registry.gauge(
+    "docmemory_executor_in_flight", "Calls running or queued on each request executor",
+    lambda: {name: executor.stats()["in_flight"] for name, executor in EXECUTORS.items()},
+    ("executor",)
+)
+registry.gauge(
+    "docmemory_executor_queued", "Calls waiting for a thread on each request executor",
+    lambda: {name: executor.stats()["queued"] for name, executor in EXECUTORS.items()},
+    ("executor",)
+)
+registry.gauge(
+    "docmemory_executor_rejected", "Calls rejected with 503 by each request executor",
+    lambda: {name: executor.stats()["rejected"] for name, executor in EXECUTORS.items()},
+    ("executor",)
+)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Stage latency histograms and system gauges in the Prometheus text format
+    
+    Served without building the system, so scrapes work during warm-up.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
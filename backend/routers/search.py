@@ -4,10 +4,13 @@
 """
 Search endpoints
 """
-from typing import Literal
+from typing import Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from backend.core.dependencies import get_docmemory_system
+from backend.core.executors import search_executor
+from backend.core.responses import FastJSONResponse, dumps
 
 router = APIRouter()
 
@@ -15,6 +18,50 @@ class SearchRequest(BaseModel):
     query: str
     search_type: Literal["semantic", "keyword", "hybrid"] = "hybrid"
     limit: int = 10
+    stream: Optional[Literal["ndjson", "sse"]] = None
+    explain: bool = False
+    profile: bool = False
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def format_result(result: dict) -> dict:
+    """Search result fields returned by the API"""
+    return {
+        "id": result.get("id", ""),
+        "title": result.get("title", ""),
+        "content": result.get("content", ""),
+        "score": result.get("score", 0.0),
+        "source_file": result.get("source_file", ""),
+        "tags": result.get("tags", []),
+        "timestamp": result.get("timestamp", "")
+    }
+
+def encode_event(event: dict, stream: str) -> str:
+    """One NDJSON line or server-sent event"""
+    if event["type"] == "result":
+        event = {**event, "result": format_result(event["result"])}
+    data = dumps(event).decode("utf-8")
+    if stream == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+async def stream_search(request: SearchRequest, system) -> StreamingResponse:
+    """Send the ranked IDs and scores first, then each result as its own line"""
+    events = system.search_stream(
+        query=request.query,
+        search_type=request.search_type,
+        limit=request.limit
+    )
+    # Encoding and ranking run on the search pool before the response starts,
+    # so overload and search errors still get a proper status code
+    first_event = await search_executor.run(next, events)
+    
+    def body():
+        yield encode_event(first_event, request.stream)
+        for event in events:
+            yield encode_event(event, request.stream)
+    
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[request.stream])
 
 @router.post("/")
 async def search_documents(
@@ -23,33 +70,51 @@ async def search_documents(
 ):
     """
     Search documents using semantic, keyword, or hybrid search
+    
+    With "stream": "ndjson" or "sse" the response is streamed as events
+    instead of one JSON body. With "explain": true the response also has an
+    "explain" object with the executed plan, candidate counts and per-stage
+    timings; "profile": true adds the top functions under cProfile.
     """
     try:
-        results = system.search(
-            query=request.query,
-            search_type=request.search_type,
-            limit=request.limit
-        )
+        if request.stream:
+            if request.explain:
+                raise HTTPException(status_code=400, detail="explain is not available for streamed responses")
+            return await stream_search(request, system)
+        
+        explanation = None
+        if request.explain:
+            explained = await search_executor.run(
+                system.explain_search,
+                query=request.query,
+                search_type=request.search_type,
+                limit=request.limit,
+                profile=request.profile
+            )
+            results, explanation = explained["results"], explained["explain"]
+        else:
+            results = await search_executor.run(
+                system.search,
+                query=request.query,
+                search_type=request.search_type,
+                limit=request.limit
+            )
         
         # Format results for API response
-        formatted_results = []
-        for result in results:
-            formatted_results.append({
-                "id": result.get("id", ""),
-                "title": result.get("title", ""),
-                "content": result.get("content", ""),
-                "score": result.get("score", 0.0),
-                "source_file": result.get("source_file", ""),
-                "tags": result.get("tags", []),
-                "timestamp": result.get("timestamp", "")
-            })
+        formatted_results = [format_result(result) for result in results]
         
-        return {
+        body = {
             "query": request.query,
             "search_type": request.search_type,
             "results": formatted_results,
             "count": len(formatted_results)
         }
+        if explanation is not None:
+            body["explain"] = explanation
+        # Returned as a response object so FastAPI skips its generic encoder pass
+        return FastJSONResponse(body)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -0,0 +1,4 @@
+"""
+DocMemory - Benchmarks
+Standalone performance measurements; run each module with python -m
+"""
@@ -0,0 +1,198 @@
+"""
+DocMemory - Recall Benchmark
+Recall against latency, build time and size for candidate FAISS index
+configurations, measured against the exact IndexFlatIP that DocMemoryCore uses
+
+Run from the repository root, on a synthetic corpus or on an existing store:
+    python -m benchmarks.bench_recall --chunks 100k --workdir /var/tmp/recall-bench
+    python -m benchmarks.bench_recall --storage ./docmemory_storage/ --workdir /var/tmp/recall-bench
+    python -m benchmarks.bench_recall --chunks 100k --config "IVF1024,Flat:nprobe=8,32" --config "HNSW48:efSearch=64"
+"""
+import argparse
+import json
+import math
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_suite import SIZES
+from benchmarks.corpus import SyntheticCorpus
+from src.backup import BackupManager, DATABASE_FILE
+
+def load_store_vectors(storage_path: Path, workdir: Path) -> np.ndarray:
+    """Normalized embeddings of a DocMemory store, memory-mapped from a scratch export"""
+    directory = workdir / "index"
+    directory.mkdir(parents=True, exist_ok=True)
+    BackupManager.export_index(Path(storage_path) / DATABASE_FILE, directory)
+    return np.load(directory / "vectors.npy", mmap_mode='r')
+
+def store_queries(vectors: np.ndarray, count: int, noise: float = 0.05, seed: int = 1) -> np.ndarray:
+    """Stored vectors with Gaussian noise, standing in for queries near the data"""
+    rng = np.random.default_rng(seed)
+    queries = np.array(vectors[np.sort(rng.choice(len(vectors), count, replace=False))], dtype=np.float32)
+    queries += rng.standard_normal(queries.shape, dtype=np.float32) * noise / math.sqrt(queries.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def synthetic_vectors(chunks: int, queries: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Mock-model embeddings of the benchmark corpus and of phrase queries drawn from it"""
+    from main import MockEmbeddingModel
+    corpus = SyntheticCorpus(seed)
+    model = MockEmbeddingModel(seed=seed)
+    vectors = np.empty((chunks, model.embedding_dim), dtype=np.float32)
+    batch = []
+    position = 0
+    for _, text in corpus.chunks(chunks):
+        batch.append(text)
+        if len(batch) == 10000:
+            vectors[position:position + len(batch)] = model.encode(batch)
+            position += len(batch)
+            batch = []
+    if batch:
+        vectors[position:] = model.encode(batch)
+    return vectors, model.encode(corpus.queries(queries, chunks))
+
+def default_configs(count: int) -> List[Tuple[str, str, List[int]]]:
+    """(factory string, search parameter, values) sized for count vectors"""
+    # About 4 * sqrt(n) inverted lists, as a power of two
+    nlist = 2 ** max(4, round(math.log2(4 * math.sqrt(count))))
+    nprobes = [value for value in (1, 4, 16, 64, 256) if value <= nlist]
+    return [
+        (f"IVF{nlist},Flat", "nprobe", nprobes),
+        (f"IVF{nlist},SQ8", "nprobe", nprobes),
+        (f"IVF{nlist},PQ48", "nprobe", nprobes),
+        ("HNSW32,Flat", "efSearch", [16, 32, 64, 128, 256]),
+    ]
+
+def parse_config(spec: str) -> Tuple[str, str, List[int]]:
+    """Parse "IVF1024,Flat:nprobe=8,32" into its factory string, parameter and values"""
+    factory, _, sweep = spec.partition(':')
+    if not sweep:
+        return factory, None, [None]
+    parameter, _, values = sweep.partition('=')
+    return factory, parameter, [int(value) for value in values.split(',')]
+
+def recall_at_k(found: np.ndarray, exact: np.ndarray) -> float:
+    """Mean share of the exact top k that the approximate top k contains"""
+    k = exact.shape[1]
+    return float(np.mean([len(np.intersect1d(f[f >= 0], e)) / k for f, e in zip(found, exact)]))
+
+def time_queries(index, queries: np.ndarray, k: int) -> Tuple[np.ndarray, List[float]]:
+    """Search one query at a time, as the API does, returning results and per-query seconds"""
+    found = np.empty((len(queries), k), dtype=np.int64)
+    timings = []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, indices = index.search(queries[i:i + 1], k)
+        timings.append(time.perf_counter() - start)
+        found[i] = indices[0]
+    return found, timings
+
+def index_bytes(index, workdir: Path) -> int:
+    """Serialized size, which is close to the index's resident memory"""
+    path = workdir / "index.faiss"
+    faiss.write_index(index, str(path))
+    size = path.stat().st_size
+    path.unlink()
+    return size
+
+def build_index(factory: str, vectors: np.ndarray, train_size: int, batch_size: int = 65536):
+    index = faiss.index_factory(vectors.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        sample = np.random.default_rng(0).choice(len(vectors), min(len(vectors), train_size), replace=False)
+        index.train(np.ascontiguousarray(vectors[np.sort(sample)], dtype=np.float32))
+    for start in range(0, len(vectors), batch_size):
+        index.add(np.ascontiguousarray(vectors[start:start + batch_size], dtype=np.float32))
+    return index
+
+def run(vectors: np.ndarray, queries: np.ndarray, configs: List[Tuple[str, str, List[int]]],
+        k: int, workdir: Path, train_size: int) -> List[Dict]:
+    rows = []
+
+    # Ground truth: the exact index DocMemoryCore serves from
+    start = time.perf_counter()
+    exact_index = build_index("Flat", vectors, train_size)
+    build_seconds = time.perf_counter() - start
+    exact, timings = time_queries(exact_index, queries, k)
+    rows.append(summary("Flat (current)", None, None, 1.0, timings, build_seconds,
+                        index_bytes(exact_index, workdir), len(vectors)))
+    del exact_index
+
+    for factory, parameter, values in configs:
+        start = time.perf_counter()
+        index = build_index(factory, vectors, train_size)
+        build_seconds = time.perf_counter() - start
+        size = index_bytes(index, workdir)
+        for value in values:
+            if parameter:
+                faiss.ParameterSpace().set_index_parameter(index, parameter, value)
+            found, timings = time_queries(index, queries, k)
+            rows.append(summary(factory, parameter, value, recall_at_k(found, exact), timings,
+                                build_seconds, size, len(vectors)))
+            print(f"  {rows[-1]['config']:<36} recall@{k} {rows[-1]['recall']:.3f}  "
+                  f"{rows[-1]['queries_per_second']:>9,.0f} q/s", flush=True)
+        del index
+    return rows
+
+def summary(factory: str, parameter: str, value: int, recall: float, timings: List[float],
+            build_seconds: float, size: int, count: int) -> Dict:
+    milliseconds = np.array(timings) * 1000
+    return {
+        "config": factory + (f" {parameter}={value}" if parameter else ""),
+        "factory": factory,
+        "parameter": parameter,
+        "value": value,
+        "recall": round(recall, 4),
+        "queries_per_second": round(len(timings) / sum(timings), 1),
+        "p50_ms": round(float(np.percentile(milliseconds, 50)), 3),
+        "p99_ms": round(float(np.percentile(milliseconds, 99)), 3),
+        "build_seconds": round(build_seconds, 2),
+        "index_bytes": size,
+        "bytes_per_vector": round(size / count, 1)
+    }
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recall and latency of FAISS index configurations")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--storage", help="DocMemory storage directory to read embeddings from")
+    source.add_argument("--chunks", default="100k", help="Synthetic corpus size: 10k, 100k, 1m or a number")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries to evaluate")
+    parser.add_argument("--k", type=int, default=10, help="Results per query for recall@k")
+    parser.add_argument("--config", action="append",
+                        help='Index to evaluate, e.g. "IVF1024,Flat:nprobe=8,32" (repeatable; default: a standard sweep)')
+    parser.add_argument("--train-size", type=int, default=100000, help="Vectors sampled to train IVF and PQ")
+    parser.add_argument("--workdir", default="./recall_bench", help="Scratch directory (deleted first)")
+    parser.add_argument("--output", help="Write the results JSON to this file")
+    args = parser.parse_args(argv)
+
+    workdir = Path(args.workdir)
+    shutil.rmtree(workdir, ignore_errors=True)
+    workdir.mkdir(parents=True)
+    if args.storage:
+        vectors = load_store_vectors(Path(args.storage), workdir)
+        queries = store_queries(vectors, min(args.queries, len(vectors)))
+    else:
+        vectors, queries = synthetic_vectors(SIZES.get(args.chunks.lower()) or int(args.chunks), args.queries)
+    configs = [parse_config(spec) for spec in args.config] if args.config else default_configs(len(vectors))
+
+    print(f"{len(vectors):,} vectors, {len(queries):,} queries, recall@{args.k} against exact search")
+    rows = run(vectors, queries, configs, args.k, workdir, args.train_size)
+    print(f"\n  {'config':<36} {'recall':>7} {'q/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'B/vector':>9}")
+    for row in rows:
+        print(f"  {row['config']:<36} {row['recall']:>7.3f} {row['queries_per_second']:>9,.0f} "
+              f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['build_seconds']:>8.2f} {row['bytes_per_vector']:>9,.0f}")
+    results = {"vectors": len(vectors), "queries": len(queries), "k": args.k, "results": rows}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
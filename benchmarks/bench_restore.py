@@ -0,0 +1,127 @@
+"""
+DocMemory - Restore Benchmark
+Time to restore a snapshot, replay the change log and start serving, against
+rebuilding the index from SQLite as a restart after an unzip had to
+
+Run from the repository root:
+    python -m benchmarks.bench_restore --chunks 1000000 --workdir /var/tmp/restore-bench
+"""
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.backup import BackupManager
+from src.docmemory_core import DocMemoryCore, compute_content_hash
+
+def build_store(storage_path: Path, chunks: int, dim: int = 384, batch_size: int = 50000, seed: int = 0):
+    """Fill a store with synthetic chunks directly through SQL"""
+    DocMemoryCore(str(storage_path), load_index=False).close()
+    rng = random.Random(seed)
+    vector_rng = np.random.default_rng(seed)
+    words = [f"word{i}" for i in range(5000)]
+    timestamp = datetime(2024, 1, 15).isoformat()
+
+    conn = sqlite3.connect(storage_path / "document_memories.db")
+    conn.execute("PRAGMA synchronous=OFF")
+    for start in range(0, chunks, batch_size):
+        count = min(batch_size, chunks - start)
+        vectors = vector_rng.standard_normal((count, dim)).astype(np.float32)
+        memories, embeddings = [], []
+        for offset in range(count):
+            doc_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            content = f"chunk {start + offset} " + " ".join(rng.choices(words, k=50))
+            memories.append((doc_id, f"Document {(start + offset) // 20}", content,
+                             f"/data/doc_{(start + offset) // 20}.pdf", timestamp, "pdf", "[]", "{}", "{}",
+                             "", "[]", compute_content_hash(content)))
+            embeddings.append((doc_id, vectors[offset].tobytes()))
+        conn.executemany('''
+            INSERT INTO document_memories
+            (id, title, content, source_file, timestamp, document_type, tags, relationships, metadata, summary, page_numbers, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', memories)
+        conn.executemany("INSERT INTO document_embeddings (id, embedding) VALUES (?, ?)", embeddings)
+        conn.commit()
+    conn.close()
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def run(workdir: Path, chunks: int, changes: int, rebuild: bool) -> List[Dict]:
+    storage = workdir / "storage"
+    target = workdir / "restored"
+    shutil.rmtree(workdir, ignore_errors=True)
+    workdir.mkdir(parents=True)
+    rows = []
+
+    _, seconds = timed(lambda: build_store(storage, chunks))
+    print(f"  built {chunks:,} chunks in {seconds:.1f}s")
+
+    manager = BackupManager(str(storage), max_bytes_per_second=None)
+    manifest, seconds = timed(manager.create_snapshot)
+    rows.append({"step": "snapshot (first, all blocks new)", "seconds": seconds})
+
+    # Changes after the snapshot, written through the core so they reach the change log
+    core = DocMemoryCore(str(storage), load_index=False)
+    core.change_log = manager.change_log
+    vectors = np.random.default_rng(1).standard_normal((changes, core.embedding_dim)).astype(np.float32)
+    for i in range(changes):
+        core.store_document(f"change {i}", "Changed", "changed.txt", vectors[i])
+    core.close()
+    manager.change_log.close()
+
+    second, seconds = timed(manager.create_snapshot)
+    rows.append({"step": f"snapshot (after {changes:,} changes)", "seconds": seconds,
+                 "note": f"{second['stats']['blocks_written']}/{second['stats']['blocks_total']} blocks new"})
+
+    stats, seconds = timed(lambda: manager.restore(snapshot_id=manifest['id'], target_path=str(target),
+                                                   until=datetime.max))
+    rows.append({"step": "restore: extract snapshot", "seconds": stats['extract_seconds']})
+    rows.append({"step": f"restore: replay {stats['records_replayed']:,} records + patch index",
+                 "seconds": stats['replay_seconds']})
+    restore_seconds = seconds
+
+    restored, seconds = timed(lambda: DocMemoryCore(str(target)))
+    ntotal = restored.faiss_index.ntotal
+    restored.close()
+    del restored
+    rows.append({"step": "start: load persisted index", "seconds": seconds})
+    rows.append({"step": "total restore to serving", "seconds": restore_seconds + seconds,
+                 "note": f"{ntotal:,} vectors"})
+
+    if rebuild:
+        rebuilt, seconds = timed(lambda: DocMemoryCore(str(target)))
+        rebuilt.close()
+        rows.append({"step": "start: rebuild index from SQLite (before)", "seconds": seconds})
+    return rows
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshot restore and point-in-time recovery time")
+    parser.add_argument("--chunks", type=int, default=1000000, help="Chunks in the synthetic store")
+    parser.add_argument("--changes", type=int, default=1000, help="Chunks written after the snapshot")
+    parser.add_argument("--workdir", default="./restore_bench", help="Scratch directory (deleted first)")
+    parser.add_argument("--skip-rebuild", action="store_true", help="Skip the index rebuild baseline")
+    args = parser.parse_args(argv)
+
+    print(f"{args.chunks:,} chunks, {args.changes:,} changes replayed")
+    rows = run(Path(args.workdir), args.chunks, args.changes, not args.skip_rebuild)
+    for row in rows:
+        print(f"  {row['step']:<48} {row['seconds']:8.2f} s  {row.get('note', '')}")
+    print(json.dumps(rows))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+"""
+DocMemory - Serialization Benchmark
+Cost of encoding and compressing API payloads per 100 search results
+
+Run from the repository root:
+    python -m benchmarks.bench_serialization --repeats 200
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from backend.core.responses import brotli, compress, dumps, orjson
+
+def make_results(count: int = 100, content_chars: int = 1000, seed: int = 0) -> List[Dict]:
+    """Search results shaped like the API's, with word-like content"""
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(2000)]
+    results = []
+    for i in range(count):
+        content = ''
+        while len(content) < content_chars:
+            content += rng.choice(words) + ' '
+        results.append({
+            "id": f"{rng.getrandbits(128):032x}",
+            "title": f"Document {i}",
+            "content": content[:content_chars],
+            "score": rng.random(),
+            "source_file": f"/data/documents/report_{i}.pdf",
+            "tags": ["research", "quarterly"],
+            "timestamp": "2024-01-15T10:30:00"
+        })
+    return results
+
+def measure(function: Callable[[], object], repeats: int) -> float:
+    """Median seconds per call"""
+    function()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def run(repeats: int, content_chars: int) -> List[Dict]:
+    payload = {"query": "quarterly revenue", "search_type": "hybrid",
+               "results": make_results(100, content_chars), "count": 100}
+    encoded = dumps(payload)
+
+    cases = [
+        # What FastAPI does for a plain dict return value
+        ("json (jsonable_encoder + json.dumps)",
+         lambda: json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        ("json.dumps", lambda: json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+    ]
+    if orjson is not None:
+        cases.append(("orjson", lambda: orjson.dumps(payload)))
+    cases.append(("gzip level 1 (served)", lambda: compress(encoded, "gzip")))
+    cases.append(("gzip level 6 (default)", lambda: gzip.compress(encoded, compresslevel=6)))
+    if brotli is not None:
+        cases.append(("brotli quality 4", lambda: compress(encoded, "br")))
+
+    rows = []
+    for name, function in cases:
+        output = function()
+        rows.append({"case": name, "ms_per_100": measure(function, repeats) * 1000, "bytes": len(output)})
+    return rows
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serialization cost per 100 search results")
+    parser.add_argument("--repeats", type=int, default=200, help="Timed calls per case")
+    parser.add_argument("--content-chars", type=int, default=1000, help="Characters of content per result")
+    args = parser.parse_args(argv)
+
+    print(f"100 results x {args.content_chars} chars, median of {args.repeats} runs")
+    for row in run(args.repeats, args.content_chars):
+        print(f"  {row['case']:<38} {row['ms_per_100']:8.3f} ms  {row['bytes']:>9,} bytes")
+    if orjson is None:
+        print("  (orjson not installed)")
+    if brotli is None:
+        print("  (brotli not installed)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
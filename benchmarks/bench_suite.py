@@ -0,0 +1,232 @@
+"""
+DocMemory - Benchmark Suite
+Ingest throughput, search latency, startup time and memory on a synthetic
+corpus, written as JSON for comparison across commits
+
+Every run embeds with the seeded MockEmbeddingModel, so the numbers measure
+DocMemory itself rather than the model. Run from the repository root:
+    python -m benchmarks.bench_suite --chunks 100000 --workdir /var/tmp/docmemory-bench --output before.json
+    python -m benchmarks.bench_suite --chunks 100000 --workdir /var/tmp/docmemory-bench --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import SyntheticCorpus, bulk_load
+from src.docmemory_core import DocMemoryCore
+from src.metrics import resident_memory_bytes
+
+SEARCH_TYPES = ("semantic", "keyword", "hybrid")
+SIZES = {"10k": 10000, "100k": 100000, "1m": 1000000}
+
+def latency_summary(seconds: List[float]) -> Dict:
+    milliseconds = np.array(seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(milliseconds, 50)), 3),
+        "p95_ms": round(float(np.percentile(milliseconds, 95)), 3),
+        "p99_ms": round(float(np.percentile(milliseconds, 99)), 3),
+        "mean_ms": round(float(milliseconds.mean()), 3),
+        "queries_per_second": round(len(seconds) / sum(seconds), 1)
+    }
+
+def peak_memory_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def build(storage: Path, documents: Path, corpus: SyntheticCorpus, chunks: int,
+          ingest_chunks: int, ingest_workers: int) -> Dict:
+    """Bulk-load most of the corpus, then time the last ingest_chunks through the ingestion pipeline"""
+    from main import DocMemorySystem, MockEmbeddingModel
+    model = MockEmbeddingModel()
+    results = {}
+
+    background = chunks - ingest_chunks
+    if background:
+        start = time.perf_counter()
+        core = DocMemoryCore(str(storage), load_index=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stored = bulk_load(core, corpus, model, background)
+        core.close()
+        seconds = time.perf_counter() - start
+        results["bulk_load"] = {"chunks": stored, "seconds": round(seconds, 3),
+                                "chunks_per_second": round(stored / seconds)}
+
+    corpus.write_documents(documents, ingest_chunks, start=background)
+    with contextlib.redirect_stdout(io.StringIO()):
+        system = DocMemorySystem(str(storage), ingest_workers=0, preload_model=False, embedding_model=model)
+        start = time.perf_counter()
+        stats = system.ingest_directory(str(documents), workers=ingest_workers)
+        seconds = time.perf_counter() - start
+        system.close()
+    results["ingest"] = {"files": stats.files_done, "chunks": stats.chunks_stored, "workers": ingest_workers,
+                         "seconds": round(seconds, 3), "chunks_per_second": round(stats.chunks_stored / seconds)}
+    return results
+
+def serve(storage: Path, corpus: SyntheticCorpus, chunks: int, queries: int, limit: int) -> Dict:
+    """Start a system on the built store and time searches; run in a fresh process"""
+    start = time.perf_counter()
+    from main import DocMemorySystem, MockEmbeddingModel
+    import_seconds = time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        system = DocMemorySystem(str(storage), ingest_workers=0, preload_model=False,
+                                 embedding_model=MockEmbeddingModel())
+        startup_seconds = time.perf_counter() - start
+        ready_memory = resident_memory_bytes()
+
+        documents = system.docmemory.core_memory.get_document_count()
+        texts = corpus.queries(queries, chunks)
+        start = time.perf_counter()
+        system.search(texts[0], search_type="hybrid", limit=limit)
+        first_query_seconds = time.perf_counter() - start
+
+        search = {}
+        for search_type in SEARCH_TYPES:
+            for text in texts[:5]:
+                system.search(text, search_type=search_type, limit=limit)
+            timings = []
+            hits = 0
+            for text in texts:
+                start = time.perf_counter()
+                hits += len(system.search(text, search_type=search_type, limit=limit))
+                timings.append(time.perf_counter() - start)
+            search[search_type] = {**latency_summary(timings), "mean_results": round(hits / len(texts), 2)}
+        system.close()
+
+    return {
+        "documents": documents,
+        "startup": {
+            "import_seconds": round(import_seconds, 3),
+            "system_seconds": round(startup_seconds, 3),
+            "first_query_seconds": round(first_query_seconds, 3)
+        },
+        "memory": {
+            "ready_rss_bytes": ready_memory,
+            "after_search_rss_bytes": resident_memory_bytes(),
+            "peak_rss_bytes": peak_memory_bytes()
+        },
+        "search": search
+    }
+
+def run_serve_process(storage: Path, seed: int, chunks: int, queries: int, limit: int) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_suite", "--serve", str(storage), "--seed", str(seed),
+         "--chunks", str(chunks), "--queries", str(queries), "--limit", str(limit)],
+        cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True
+    ).stdout
+    # Shutdown hooks may print after the results line
+    return json.loads([line for line in output.splitlines() if line.startswith('{')][-1])
+
+def environment() -> Dict:
+    import faiss
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=Path(__file__).resolve().parent,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "faiss": getattr(faiss, "__version__", None)
+    }
+
+def run(workdir: Path, chunks: int, ingest_chunks: int, ingest_workers: int,
+        queries: int, limit: int, seed: int) -> Dict:
+    shutil.rmtree(workdir, ignore_errors=True)
+    workdir.mkdir(parents=True)
+    corpus = SyntheticCorpus(seed)
+    ingest_chunks = min(ingest_chunks, chunks)
+    results = {
+        "environment": environment(),
+        "config": {"chunks": chunks, "ingest_chunks": ingest_chunks, "queries": queries,
+                   "limit": limit, "seed": seed, "embedding_model": "MockEmbeddingModel"}
+    }
+    results.update(build(workdir / "storage", workdir / "documents", corpus, chunks, ingest_chunks, ingest_workers))
+    results.update(run_serve_process(workdir / "storage", seed, chunks, queries, limit))
+    results["memory"]["rss_bytes_per_chunk"] = round(results["memory"]["ready_rss_bytes"] / results["documents"], 1)
+    return results
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    values = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[f"{prefix}{key}"] = value
+    return values
+
+def compare(baseline: Dict, results: Dict) -> List[str]:
+    """One line per metric present in both runs with its relative change"""
+    before = flatten({k: v for k, v in baseline.items() if k not in ("environment", "config")})
+    after = flatten({k: v for k, v in results.items() if k not in ("environment", "config")})
+    lines = [f"  {'metric':<40} {'baseline':>14} {'this run':>14} {'change':>8}"]
+    for key in before:
+        if key in after:
+            change = f"{(after[key] - before[key]) / before[key] * 100:+.1f}%" if before[key] else ""
+            lines.append(f"  {key:<40} {before[key]:>14,} {after[key]:>14,} {change:>8}")
+    return lines
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="DocMemory benchmark suite")
+    parser.add_argument("--chunks", default="10k", help="Corpus size: 10k, 100k, 1m or a number of chunks")
+    parser.add_argument("--ingest-chunks", type=int, default=5000,
+                        help="Chunks ingested through the pipeline and timed; the rest are bulk-loaded")
+    parser.add_argument("--ingest-workers", type=int, default=4, help="Directory ingestion workers")
+    parser.add_argument("--queries", type=int, default=200, help="Timed queries per search type")
+    parser.add_argument("--limit", type=int, default=10, help="Results per query")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus and query seed")
+    parser.add_argument("--workdir", default="./bench_suite", help="Scratch directory (deleted first)")
+    parser.add_argument("--output", help="Write the results JSON to this file")
+    parser.add_argument("--compare", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    chunks = SIZES.get(args.chunks.lower()) or int(args.chunks)
+    if args.serve:
+        print(json.dumps(serve(Path(args.serve), SyntheticCorpus(args.seed), chunks, args.queries, args.limit)))
+        return 0
+
+    results = run(Path(args.workdir), chunks, args.ingest_chunks, args.ingest_workers,
+                  args.queries, args.limit, args.seed)
+    print(f"{results['documents']:,} chunks, commit {results['environment']['commit']}")
+    for step in ("bulk_load", "ingest"):
+        if step in results:
+            print(f"  {step:<10} {results[step]['chunks_per_second']:>9,} chunks/s")
+    startup = results["startup"]
+    print(f"  startup    {startup['system_seconds']:.2f} s (+{startup['import_seconds']:.2f} s imports), "
+          f"first query {startup['first_query_seconds'] * 1000:.1f} ms, "
+          f"RSS {results['memory']['ready_rss_bytes'] / 2**20:.0f} MiB")
+    for search_type, latency in results["search"].items():
+        print(f"  {search_type:<10} p50 {latency['p50_ms']:8.2f} ms  p95 {latency['p95_ms']:8.2f} ms  "
+              f"p99 {latency['p99_ms']:8.2f} ms")
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), results)))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+"""
+DocMemory - Export/Import Benchmark
+Chunks per second through bulk export and import
+
+Run from the repository root:
+    python -m benchmarks.bench_transfer --chunks 200000 --workdir /var/tmp/transfer-bench
+"""
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_restore import build_store
+from src.corpus_transfer import export_corpus, import_corpus
+from src.docmemory_core import DocMemoryCore
+
+def run(workdir: Path, chunks: int, format: str, dtype: str) -> List[Dict]:
+    shutil.rmtree(workdir, ignore_errors=True)
+    workdir.mkdir(parents=True)
+    build_store(workdir / "source", chunks)
+
+    source = DocMemoryCore(str(workdir / "source"), load_index=False)
+    manifest = export_corpus(source, workdir / "export", format=format, dtype=dtype)
+    source.close()
+
+    target = DocMemoryCore(str(workdir / "target"))
+    stats = import_corpus(target, workdir / "export")
+    assert target.faiss_index.ntotal == chunks
+    target.close()
+
+    export_bytes = sum(path.stat().st_size for path in (workdir / "export").iterdir())
+    return [
+        {"step": f"export ({format}, {dtype})", "seconds": manifest['seconds'],
+         "chunks_per_second": round(chunks / manifest['seconds']), "bytes": export_bytes},
+        {"step": "import", "seconds": stats['seconds'], "chunks_per_second": stats['chunks_per_second']},
+    ]
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk export and import throughput")
+    parser.add_argument("--chunks", type=int, default=200000, help="Chunks in the synthetic store")
+    parser.add_argument("--format", default="jsonl", help="Metadata shard format")
+    parser.add_argument("--dtype", default="float16", help="Embedding precision")
+    parser.add_argument("--workdir", default="./transfer_bench", help="Scratch directory (deleted first)")
+    args = parser.parse_args(argv)
+
+    rows = run(Path(args.workdir), args.chunks, args.format, args.dtype)
+    print(f"{args.chunks:,} chunks")
+    for row in rows:
+        print(f"  {row['step']:<26} {row['seconds']:8.2f} s  {row['chunks_per_second']:>9,} chunks/s")
+    print(json.dumps(rows))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
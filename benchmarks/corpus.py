@@ -0,0 +1,142 @@
+"""
+DocMemory - Synthetic Corpus
+Reproducible documents, chunks and queries for benchmarks
+
+Chunks are drawn from a fixed vocabulary of made-up words: each chunk mixes
+words of one topic with common words from a Zipf distribution, so keyword
+and semantic searches for topic words have realistic, selective matches.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from src.docmemory_core import DocMemoryCore, compute_content_hash
+
+# Chunks are generated in blocks of this many, each from its own seed
+BLOCK_SIZE = 1000
+
+SYLLABLES = ["ka", "lo", "mi", "ter", "zu", "ran", "ble", "sho", "vi", "dan", "por", "eth",
+             "qua", "nis", "ul", "gre", "fa", "tom", "sil", "ber"]
+
+class SyntheticCorpus:
+    """Deterministic generator of chunk texts and matching queries"""
+
+    def __init__(self, seed: int = 0, vocabulary_size: int = 20000, topics: int = 500,
+                 words_per_topic: int = 40, words_per_chunk: int = 80, topic_share: float = 0.3):
+        self.seed = seed
+        self.words_per_chunk = words_per_chunk
+        self.topic_share = topic_share
+        rng = random.Random(seed)
+
+        words = set()
+        while len(words) < vocabulary_size:
+            words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+        words = sorted(words)
+        rng.shuffle(words)
+        self.vocabulary = np.array(words)
+
+        # Zipf weights for background words; topic words come from the rarer tail
+        weights = 1.0 / np.arange(1, vocabulary_size + 1)
+        self.word_cdf = np.cumsum(weights / weights.sum())
+        tail = np.arange(vocabulary_size // 10, vocabulary_size)
+        topic_rng = np.random.default_rng(seed)
+        self.topics = np.stack([topic_rng.choice(tail, words_per_topic, replace=False) for _ in range(topics)])
+
+    def chunks(self, count: int, start: int = 0) -> Iterator[Tuple[int, str]]:
+        """Yield (topic, text) for chunks start .. start + count - 1
+
+        Chunk i is the same text whichever range it is generated in.
+        """
+        end = start + count
+        topic_words = int(self.words_per_chunk * self.topic_share)
+        for block in range(start // BLOCK_SIZE, (end + BLOCK_SIZE - 1) // BLOCK_SIZE):
+            rng = np.random.default_rng((self.seed, block))
+            topics = rng.integers(len(self.topics), size=BLOCK_SIZE)
+            picks = rng.integers(self.topics.shape[1], size=(BLOCK_SIZE, topic_words))
+            background = np.searchsorted(self.word_cdf, rng.random((BLOCK_SIZE, self.words_per_chunk - topic_words)))
+            indices = rng.permuted(np.hstack([self.topics[topics[:, None], picks],
+                                              np.minimum(background, len(self.vocabulary) - 1)]), axis=1)
+            first = block * BLOCK_SIZE
+            for number in range(max(start, first), min(end, first + BLOCK_SIZE)):
+                yield int(topics[number - first]), self._sentences(number, self.vocabulary[indices[number - first]])
+
+    @staticmethod
+    def _sentences(number: int, words: np.ndarray) -> str:
+        sentences = []
+        for start in range(0, len(words), 14):
+            sentence = ' '.join(words[start:start + 14])
+            sentences.append(sentence[:1].upper() + sentence[1:] + '.')
+        return f"Section {number}. " + ' '.join(sentences)
+
+    def queries(self, count: int, chunks: int, seed: int = 1) -> List[str]:
+        """Two to four consecutive words from a sentence of a random chunk among the first chunks
+
+        Phrases taken from stored text give the substring keyword search
+        something to match, and their topic words steer semantic search.
+        """
+        rng = random.Random(seed)
+        queries = []
+        for _ in range(count):
+            _, text = next(self.chunks(1, start=rng.randrange(chunks)))
+            words = rng.choice(text.split('. ')[1:]).rstrip('.').lower().split()
+            length = rng.randint(2, 4)
+            start = rng.randrange(len(words) - length + 1)
+            queries.append(' '.join(words[start:start + length]))
+        return queries
+
+    def write_documents(self, directory: Path, chunks: int, chunks_per_document: int = 10,
+                        start: int = 0) -> List[Path]:
+        """Write text files holding the given number of chunk texts as paragraphs"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        paragraphs = []
+        for _, text in self.chunks(chunks, start=start):
+            paragraphs.append(text)
+            if len(paragraphs) == chunks_per_document:
+                paths.append(self._write(directory, start + len(paths) * chunks_per_document, paragraphs))
+                paragraphs = []
+        if paragraphs:
+            paths.append(self._write(directory, start + len(paths) * chunks_per_document, paragraphs))
+        return paths
+
+    @staticmethod
+    def _write(directory: Path, number: int, paragraphs: List[str]) -> Path:
+        path = directory / f"doc_{number:08d}.txt"
+        path.write_text('\n\n'.join(paragraphs), encoding='utf-8')
+        return path
+
+def bulk_load(core: DocMemoryCore, corpus: SyntheticCorpus, model, count: int, start: int = 0,
+              batch_size: int = 10000, chunks_per_document: int = 10) -> int:
+    """Embed chunks with model and store them through DocMemoryCore.bulk_insert
+
+    Chunk IDs are derived from the corpus seed and chunk number, so loading a
+    range twice stores it once.
+    """
+    base_time = datetime(2024, 1, 1)
+    stored = 0
+    batch = []
+
+    def flush():
+        embeddings = model.encode([row[2] for row in batch])
+        return core.bulk_insert(batch, [row[0] for row in batch], embeddings)
+
+    for offset, (topic, text) in enumerate(corpus.chunks(count, start=start)):
+        number = start + offset
+        document = number // chunks_per_document
+        batch.append((
+            str(uuid.uuid5(uuid.NAMESPACE_OID, f"{corpus.seed}:{number}")), f"Document {document}", text,
+            f"/corpus/doc_{document * chunks_per_document:08d}.txt",
+            (base_time + timedelta(minutes=number)).isoformat(), "txt", f'["topic-{topic}"]', "{}",
+            f'{{"chunk_index": {number % chunks_per_document}}}', "", "[]", compute_content_hash(text)
+        ))
+        if len(batch) == batch_size:
+            stored += flush()
+            batch = []
+    if batch:
+        stored += flush()
+    return stored
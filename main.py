@@ -2,60 +2,244 @@
 DocMemory - Main Integration and Testing
 Complete system integration and testing
 """
+import hashlib
 import numpy as np
+import re
 from pathlib import Path
 import tempfile
 import os
-from typing import List
+import argparse
+import importlib.util
+import itertools
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 # Import all components
 from src.docmemory_core import DocMemoryCore, DocumentMemory
 from src.auto_save_load import DocMemoryAutoSystem
+from src.backup import BackupManager
+from src.corpus_transfer import DTYPES, FORMATS, export_corpus, import_corpus
 from src.document_processor import DocumentIngestionPipeline
 from src.search_engine import DocMemorySearchSystem
-
-try:
-    from sentence_transformers import SentenceTransformer
-except ImportError:
-    SentenceTransformer = None
+from src.embedding_scheduler import EmbeddingScheduler, PRIORITY_BULK, PRIORITY_INTERACTIVE
+from src.ingestion_jobs import IngestionJobQueue
+from src.directory_ingest import DirectoryIngestor, IngestStats, format_progress
+from src.directory_watcher import DirectoryWatcher
+from src.metrics import QUERY_EMBEDDING_SECONDS, registry as metrics_registry, resident_memory_bytes
+from src import memory_accounting, tracing
+from src.index_generations import (
+    GenerationReader, IndexPublisher, ROLE_READER, ROLE_STANDALONE, ROLE_WRITER, SERVING_ROLES
+)
+
+# sentence-transformers pulls in torch, so it is only imported when the model loads
+HAS_SENTENCE_TRANSFORMERS = importlib.util.find_spec("sentence_transformers") is not None
+if not HAS_SENTENCE_TRANSFORMERS:
     print("Warning: sentence-transformers not available. Using mock embeddings.")
 
 class MockEmbeddingModel:
-    """Mock embedding model for testing when sentence-transformers is not available"""
-    def __init__(self):
-        self.embedding_dim = 384
-
-    def encode(self, sentences):
-        """Generate mock embeddings for testing"""
-        embeddings = []
-        for sentence in sentences:
-            # Create deterministic embeddings based on sentence content
-            hash_val = hash(sentence) % (2**32)
-            embedding = np.frombuffer(hash_val.to_bytes(4, 'big') * 96, dtype=np.float32)[:self.embedding_dim]
-            embedding = embedding / np.linalg.norm(embedding)  # Normalize
-            embeddings.append(embedding)
-        return np.array(embeddings)
+    """Deterministic stand-in for sentence-transformers, used for tests and benchmarks
+
+    Each word gets a fixed random vector seeded from its SHA-256, and a text
+    embeds as the normalized sum of its words' vectors. Embeddings are
+    reproducible across processes, and texts sharing words score as similar,
+    so search results behave like a (very weak) real model's.
+    """
+    WORD_PATTERN = re.compile(r"\w+")
+    BATCH_SIZE = 64
+
+    def __init__(self, embedding_dim: int = 384, seed: int = 0, max_vocabulary: int = 100000):
+        self.embedding_dim = embedding_dim
+        self.seed = seed
+        self.max_vocabulary = max_vocabulary
+        self._rows = {}
+        self._vectors = np.empty((0, embedding_dim), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        digest = hashlib.sha256(f"{self.seed}:{word}".encode('utf-8')).digest()
+        return np.random.default_rng(int.from_bytes(digest[:8], 'little')).standard_normal(
+            self.embedding_dim, dtype=np.float32)
+
+    def _lookup(self, words: List[str]) -> tuple:
+        """Vocabulary rows of words, generating vectors for unseen ones"""
+        with self._lock:
+            if len(self._rows) > self.max_vocabulary:
+                self._rows = {}
+                self._vectors = self._vectors[:0]
+            new_words = [word for word in dict.fromkeys(words) if word not in self._rows]
+            if new_words:
+                start = len(self._rows)
+                for offset, word in enumerate(new_words):
+                    self._rows[word] = start + offset
+                self._vectors = np.concatenate([self._vectors, np.stack([self._word_vector(w) for w in new_words])])
+            return np.fromiter(map(self._rows.__getitem__, words), dtype=np.int64, count=len(words)), self._vectors
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        """Embed a batch of texts as an (n, embedding_dim) float32 array"""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        # A text without word characters embeds as a single word of itself
+        tokenized = [self.WORD_PATTERN.findall(sentence.lower()) or [sentence] for sentence in sentences]
+        counts = np.fromiter(map(len, tokenized), dtype=np.int64, count=len(tokenized))
+        rows, vectors = self._lookup(list(itertools.chain.from_iterable(tokenized)))
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        text_index = np.repeat(np.arange(len(tokenized)), counts)
+
+        # Per batch of texts, a (texts x distinct words) count matrix times
+        # those words' vectors sums every text's word vectors in one matmul
+        embeddings = np.empty((len(tokenized), self.embedding_dim), dtype=np.float32)
+        for start in range(0, len(tokenized), self.BATCH_SIZE):
+            end = min(start + self.BATCH_SIZE, len(tokenized))
+            words, local = np.unique(rows[bounds[start]:bounds[end]], return_inverse=True)
+            word_counts = np.bincount((text_index[bounds[start]:bounds[end]] - start) * len(words) + local,
+                                      minlength=(end - start) * len(words))
+            embeddings[start:end] = word_counts.reshape(end - start, len(words)).astype(np.float32) @ vectors[words]
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+
+    def memory_bytes(self) -> int:
+        """Word vectors and vocabulary generated so far"""
+        return self._vectors.nbytes + memory_accounting.sampled_bytes(
+            iter(self._rows), len(self._rows), sys.getsizeof) + sys.getsizeof(self._rows)
+
+class LazyEmbeddingModel:
+    """Embedding model that is loaded on first use or on a warm-up thread"""
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """Load the model once; concurrent callers wait for the same load"""
+        with self._lock:
+            if self._model is None:
+                start = time.perf_counter()
+                self._model = self._factory()
+                self.load_seconds = time.perf_counter() - start
+        return self._model
+
+    def load_in_background(self) -> threading.Thread:
+        """Start loading the model without blocking the caller"""
+        thread = threading.Thread(target=self.load, name="embedding-model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def encode(self, sentences, **kwargs):
+        return self.load().encode(sentences, **kwargs)
+
+    def memory_bytes(self) -> Optional[int]:
+        """Estimated size of the loaded model; 0 until it is loaded"""
+        return memory_accounting.model_bytes(self._model) if self._model is not None else 0
+
+    def __getattr__(self, name):
+        # Expose attributes of the loaded model (e.g. embedding dimension)
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+def load_sentence_transformer(model_name: str):
+    """Import sentence-transformers and load a model"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
 
 class DocMemorySystem:
     """Complete DocMemory system integrating all components"""
 
-    def __init__(self, storage_path: str = "./docmemory_storage/"):
+    def __init__(self,
+                 storage_path: str = "./docmemory_storage/",
+                 ingest_workers: int = 2,
+                 watch_directories: List[str] = None,
+                 preload_model: bool = True,
+                 role: str = ROLE_STANDALONE,
+                 index_sync_interval: float = 1.0,
+                 embedding_model: Any = None,
+                 trace_sample_rate: float = 0.0):
+        if role not in SERVING_ROLES:
+            raise ValueError(f"Unknown serving role: {role}")
+        self.role = role
+        self.read_only = role == ROLE_READER
+
+        # Share of searches run under cProfile and logged with their stage timings
+        self.trace_sample_rate = trace_sample_rate
+
         # Initialize core system with auto-save/load
-        self.docmemory = DocMemoryAutoSystem(storage_path)
+        self.docmemory = DocMemoryAutoSystem(storage_path, read_only=self.read_only)
+        core_memory = self.docmemory.core_memory
+        if role == ROLE_WRITER:
+            # Let search workers read while the writer commits
+            with core_memory.lock:
+                core_memory.conn.execute("PRAGMA journal_mode=WAL")
 
         # Initialize document processor
         self.processor = DocumentIngestionPipeline(self.docmemory)
 
         # Initialize search system
-        self.search_system = DocMemorySearchSystem(self.docmemory)
-
-        # Set up embedding model
-        if SentenceTransformer:
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.search_system = DocMemorySearchSystem(self.docmemory, read_only=self.read_only)
+
+        # Set up embedding model; loading happens on a warm-up thread or on first encode.
+        # A model passed in (such as MockEmbeddingModel for benchmarks) is used as is
+        if embedding_model is not None:
+            self.embedding_model_name = type(embedding_model).__name__
+            self.embedding_model = LazyEmbeddingModel(lambda: embedding_model)
+        elif HAS_SENTENCE_TRANSFORMERS:
+            self.embedding_model_name = 'all-MiniLM-L6-v2'
+            self.embedding_model = LazyEmbeddingModel(
+                lambda: load_sentence_transformer(self.embedding_model_name)
+            )
         else:
-            self.embedding_model = MockEmbeddingModel()
+            self.embedding_model_name = 'mock'
+            self.embedding_model = LazyEmbeddingModel(MockEmbeddingModel)
+        if preload_model:
+            self.embedding_model.load_in_background()
+
+        # Share one micro-batching scheduler between search queries and ingestion.
+        # Search workers never ingest, so they skip the embedding cache database
+        self.embedding_scheduler = EmbeddingScheduler(self.embedding_model)
+        self.processor.set_embedding_model(
+            self.embedding_scheduler.lane(PRIORITY_BULK),
+            model_name=self.embedding_model_name,
+            use_cache=not self.read_only
+        )
 
-        self.processor.set_embedding_model(self.embedding_model)
+        # Background ingestion; resumes jobs left queued by a previous run.
+        # Search workers only report on the jobs the writer process runs
+        self.ingestion_jobs = IngestionJobQueue(
+            self.docmemory.core_memory, self.processor, workers=ingest_workers, read_only=self.read_only
+        )
+        if ingest_workers > 0 and not self.read_only:
+            self.ingestion_jobs.start()
+
+        # Keep configured directories indexed as their files change
+        self.directory_watcher = None
+        if watch_directories and not self.read_only:
+            self.directory_watcher = self.watch_directories(watch_directories)
+
+        # Share the index between processes through published generations
+        index_directory = Path(storage_path) / "index_generations"
+        self.index_publisher = None
+        self.index_reader = None
+        if role == ROLE_WRITER:
+            self.index_publisher = IndexPublisher(core_memory, index_directory, interval=index_sync_interval)
+            self.index_publisher.start()
+        elif role == ROLE_READER:
+            self.index_reader = GenerationReader(core_memory, index_directory, poll_interval=index_sync_interval)
+            self.index_reader.start()
+
+        # Snapshots for backup and restore; the writer also takes them hourly
+        auto_save = self.docmemory.auto_save
+        self.backup_manager = auto_save.backup_manager if auto_save is not None else BackupManager(storage_path)
+
+        self.register_metrics()
 
         print(f"DocMemory system initialized with {self.docmemory.core_memory.get_document_count()} documents")
 
@@ -63,14 +247,16 @@ class DocMemorySystem:
                               file_path: str,
                               title: str = None,
                               tags: List[str] = None,
-                              custom_metadata: dict = None) -> List[str]:
+                              custom_metadata: dict = None,
+                              file_hash: str = None) -> List[str]:
         """Add a document file to the memory system"""
         try:
             doc_ids = self.processor.process_and_store_document(
                 file_path=file_path,
                 title=title,
                 tags=tags,
-                custom_metadata=custom_metadata
+                custom_metadata=custom_metadata,
+                file_hash=file_hash
             )
             print(f"Added {len(doc_ids)} document chunks from {file_path}")
             return doc_ids
@@ -78,13 +264,103 @@ class DocMemorySystem:
             print(f"Error adding document {file_path}: {e}")
             return []
 
+    def new_upload_path(self, suffix: str = "") -> Path:
+        """Durable spool location for an upload that will be ingested in the background"""
+        return self.ingestion_jobs.new_upload_path(suffix)
+
+    def enqueue_documents(self, files: List[dict]) -> str:
+        """Queue spooled files for background ingestion and return the job ID"""
+        return self.ingestion_jobs.enqueue(files)
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """Status and progress of a background ingestion job"""
+        return self.ingestion_jobs.get_job(job_id)
+
+    def supported_formats(self) -> List[str]:
+        """File extensions the ingestion pipeline can extract"""
+        return list(self.processor.processor.supported_formats)
+
+    def compute_file_hash(self, file_path: str) -> str:
+        """SHA-256 of a file's content, used to detect re-uploads"""
+        return self.processor.processor.compute_file_hash(file_path)
+
+    def find_documents_by_file_hash(self, file_hash: str) -> Optional[List[str]]:
+        """Chunk IDs already stored for a file with this content, if any"""
+        return self.docmemory.core_memory.find_file(file_hash)
+
+    def update_document_from_file(self,
+                                  file_path: str,
+                                  doc_ids: List[str],
+                                  title: str = None,
+                                  tags: List[str] = None) -> dict:
+        """Re-ingest a changed file, re-embedding only the chunks that changed"""
+        if self.read_only:
+            raise Exception("Search workers are read-only; send document updates to the writer process")
+        result = self.processor.update_document(
+            file_path=file_path,
+            doc_ids=doc_ids,
+            new_title=title,
+            new_tags=tags
+        )
+        return result
+
+    def ingest_directory(self,
+                         root: str,
+                         workers: int = 4,
+                         tags: List[str] = None,
+                         progress_callback: Optional[Callable[[IngestStats], None]] = None) -> IngestStats:
+        """Ingest a directory tree, resuming from the checkpoints of earlier runs"""
+        ingestor = DirectoryIngestor(self.docmemory.core_memory, self.processor, workers=workers)
+        return ingestor.ingest(root, tags=tags, progress_callback=progress_callback)
+
+    def watch_directories(self,
+                          directories: List[str],
+                          workers: int = 4,
+                          debounce: float = 2.0,
+                          use_inotify: bool = True) -> DirectoryWatcher:
+        """Sync directories and keep indexing their changes, both in the background"""
+        ingestor = DirectoryIngestor(self.docmemory.core_memory, self.processor, workers=workers)
+        watcher = DirectoryWatcher(ingestor, directories, debounce=debounce, use_inotify=use_inotify)
+        watcher.start()
+        return watcher
+
     def search(self,
                query: str,
                search_type: str = "hybrid",
                limit: int = 10) -> list:
         """Search documents"""
-        # Generate embedding for the query
-        query_embedding = self.embedding_model.encode([query])[0]
+        if self.trace_sample_rate and random.random() < self.trace_sample_rate:
+            explained = self.explain_search(query, search_type, limit, profile=True)
+            print(f"Traced {search_type} search for {query[:60]!r}: "
+                  f"{tracing.format_trace(explained['explain'])}")
+            return explained['results']
+        return self._search(query, search_type, limit)
+
+    def explain_search(self,
+                       query: str,
+                       search_type: str = "hybrid",
+                       limit: int = 10,
+                       profile: bool = False) -> Dict[str, Any]:
+        """Search and also return how the search ran
+
+        Returns {'results', 'explain'}. The explanation has the executed plan
+        (a tree of stages with their candidate counts and milliseconds), total
+        milliseconds per stage name, and counters such as documents loaded
+        one by one from SQLite. With profile, it also has the functions with
+        the most cumulative time under cProfile.
+        """
+        with tracing.trace("search", profile=profile) as trace:
+            results = self._search(query, search_type, limit)
+        explanation = trace.to_dict()
+        explanation['search_type'] = search_type
+        return {'results': results, 'explain': explanation}
+
+    def _search(self, query: str, search_type: str, limit: int) -> list:
+        # Generate embedding for the query ahead of queued ingestion batches
+        query_embedding = None
+        if search_type != "keyword":
+            with QUERY_EMBEDDING_SECONDS.time(), tracing.span("embed_query", model=self.embedding_model_name):
+                query_embedding = self.embedding_scheduler.encode([query], priority=PRIORITY_INTERACTIVE)[0]
 
         results = self.search_system.search(
             query=query,
@@ -92,8 +368,99 @@ class DocMemorySystem:
             search_type=search_type,
             limit=limit
         )
+        with tracing.span("record_query"):
+            self.search_system.record_query(query, search_type)
         return results
 
+    def search_stream(self,
+                      query: str,
+                      search_type: str = "hybrid",
+                      limit: int = 10) -> Iterator[Dict[str, Any]]:
+        """Search yielding the ranking first and then each result as it is ready
+
+        Events are {'type': 'ranking', 'results': [{'id', 'score'}]}, one
+        {'type': 'result', 'rank', 'result'} per hit and a closing
+        {'type': 'done'} with the count, ranking time, time to first result
+        and total time in milliseconds.
+        """
+        start = time.perf_counter()
+        query_embedding = None
+        if search_type != "keyword":
+            with QUERY_EMBEDDING_SECONDS.time():
+                query_embedding = self.embedding_scheduler.encode([query], priority=PRIORITY_INTERACTIVE)[0]
+
+        ranking_ms = None
+        first_result_ms = None
+        count = 0
+        for event in self.search_system.search_stream(
+            query=query,
+            query_embedding=query_embedding,
+            search_type=search_type,
+            limit=limit
+        ):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if event['type'] == 'ranking':
+                ranking_ms = elapsed_ms
+            elif event['type'] == 'result':
+                count += 1
+                if first_result_ms is None:
+                    first_result_ms = elapsed_ms
+            yield event
+
+        self.search_system.record_query(query, search_type)
+        yield {
+            'type': 'done',
+            'count': count,
+            'ranking_ms': ranking_ms,
+            'time_to_first_result_ms': first_result_ms,
+            'total_ms': (time.perf_counter() - start) * 1000
+        }
+
+    def warm_up(self, replay_queries: int = 0) -> dict:
+        """Load the model and touch the index and database so the first request is fast
+
+        Returns the seconds spent in each phase. With replay_queries, the most
+        frequent recent queries are run once to prime caches.
+        """
+        timings = {}
+
+        start = time.perf_counter()
+        self.embedding_model.load()
+        timings['model_load'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.embedding_scheduler.encode(["warm-up"], priority=PRIORITY_INTERACTIVE)
+        timings['encode'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        core_memory = self.docmemory.core_memory
+        with core_memory.lock:
+            index = core_memory.faiss_index
+            if index.ntotal > 0:
+                # Search with a stored vector so every page of the index is read once
+                index.search(index.reconstruct(0).reshape(1, -1), 1)
+        timings['index'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with core_memory.lock:
+            # Read every row once to pull the table into the page cache
+            core_memory.conn.execute("SELECT COUNT(*), SUM(LENGTH(content)) FROM document_memories").fetchone()
+        timings['database'] = time.perf_counter() - start
+
+        if replay_queries:
+            start = time.perf_counter()
+            for query, search_type in self.search_system.top_queries(replay_queries):
+                try:
+                    query_embedding = None
+                    if search_type != "keyword":
+                        query_embedding = self.embedding_scheduler.encode([query])[0]
+                    self.search_system.search(query=query, query_embedding=query_embedding, search_type=search_type)
+                except Exception as e:
+                    print(f"Warm-up query {query!r} failed: {e}")
+            timings['replay'] = time.perf_counter() - start
+
+        return timings
+
     def get_document(self, doc_id: str) -> DocumentMemory:
         """Get a specific document"""
         return self.docmemory.get_document(doc_id)
@@ -102,13 +469,117 @@ class DocMemorySystem:
         """Get the total number of documents"""
         return self.docmemory.core_memory.get_document_count()
 
+    def memory_report(self, project_chunks: Optional[int] = None) -> Dict[str, Any]:
+        """Estimated bytes per in-memory component, against the process RSS
+
+        Extends the store's report with the embedding model and the embedding
+        cache's SQLite page cache. With project_chunks, also projects the RSS
+        at that corpus size from the per-chunk cost, with and without every
+        chunk held in the (unbounded) document cache.
+        """
+        report = self.docmemory.core_memory.memory_report()
+        components = report['components']
+        components['embedding_model'] = {
+            'bytes': self.embedding_model.memory_bytes() or 0,
+            'loaded': self.embedding_model.loaded,
+            'name': self.embedding_model_name
+        }
+        embedding_cache = self.processor.embedding_cache
+        if embedding_cache is not None:
+            with embedding_cache.lock:
+                components['embedding_cache_page_cache'] = memory_accounting.sqlite_cache(embedding_cache.conn)
+        report['total_bytes'] = sum(component['bytes'] for component in components.values())
+        rss = resident_memory_bytes()
+        report['rss_bytes'] = rss
+        # Interpreter, libraries, allocator slack and anything not itemized
+        report['unaccounted_bytes'] = rss - report['total_bytes'] if rss is not None else None
+
+        if project_chunks is not None and rss is not None:
+            added = max(project_chunks - report['documents'], 0)
+            per_chunk = report['bytes_per_chunk'] or 0
+            per_entry = components['document_cache']['bytes_per_entry'] or 0
+            uncached = project_chunks - components['document_cache']['entries']
+            report['projection'] = {
+                'chunks': project_chunks,
+                'rss_bytes': round(rss + added * per_chunk),
+                'rss_bytes_all_cached': round(rss + added * per_chunk + max(uncached, 0) * per_entry)
+            }
+        return report
+
     def get_related_documents(self, doc_id: str, limit: int = 5) -> list:
         """Get documents related to a specific document"""
         return self.search_system.find_related_documents(doc_id, limit)
 
+    def register_metrics(self):
+        """Expose index size, cache hit rates, queue depths and the history size as gauges"""
+        core_memory = self.docmemory.core_memory
+        processor = self.processor
+        metrics_registry.gauge(
+            "docmemory_index_vectors", "Vectors in the search index by state",
+            lambda: {'live': len(core_memory.index_to_id), 'orphaned': core_memory.orphaned_vectors},
+            ("state",)
+        )
+        metrics_registry.gauge(
+            "docmemory_documents", "Stored document chunks", core_memory.get_document_count
+        )
+        metrics_registry.gauge(
+            "docmemory_embedding_cache_hit_ratio", "Fraction of chunk texts served from the embedding cache",
+            lambda: getattr(processor.embedding_model, 'hit_rate', None)
+        )
+
+        def ocr_hit_ratio():
+            engine = processor.processor.ocr_engine
+            if engine is None:
+                return 0.0
+            total = engine.cache_hits + engine.pages_recognised
+            return engine.cache_hits / total if total else 0.0
+
+        metrics_registry.gauge(
+            "docmemory_ocr_cache_hit_ratio", "Fraction of OCR pages served from the page cache", ocr_hit_ratio
+        )
+        metrics_registry.gauge(
+            "docmemory_embedding_queue_texts", "Texts waiting for the embedding model by lane",
+            self.embedding_scheduler.queue_depths, ("lane",)
+        )
+        metrics_registry.gauge(
+            "docmemory_ingestion_jobs", "Ingestion jobs by status",
+            lambda: {status: self.ingestion_jobs.count_jobs(status) for status in ("queued", "running")},
+            ("status",)
+        )
+        metrics_registry.gauge(
+            "docmemory_memory_bytes", "Estimated bytes held by each in-memory component",
+            lambda: {name: component['bytes'] for name, component in self.memory_report()['components'].items()},
+            ("component",)
+        )
+        metrics_registry.gauge(
+            "docmemory_search_history_entries", "Searches kept in the in-memory history",
+            lambda: len(self.search_system.search_engine.search_history)
+        )
+
+    def index_generation(self) -> Optional[int]:
+        """Index generation published (writer) or mapped (search worker)"""
+        if self.index_publisher is not None:
+            return self.index_publisher.generation
+        if self.index_reader is not None:
+            return self.index_reader.generation
+        return None
+
     def close(self):
         """Close the system gracefully"""
+        self.search_system.flush_query_log()
+        if self.index_reader is not None:
+            self.index_reader.stop()
+        if self.directory_watcher is not None:
+            self.directory_watcher.stop()
+        self.ingestion_jobs.stop()
+        if self.index_publisher is not None:
+            self.index_publisher.stop()
+        self.embedding_scheduler.shutdown()
         self.docmemory.close()
+        if self.processor.embedding_cache is not None:
+            self.processor.embedding_cache.close()
+        if self.processor.processor.ocr_engine is not None:
+            self.processor.processor.ocr_engine.close()
 
 def create_test_document():
     """Create a temporary test document"""
@@ -261,7 +732,138 @@ def demo_usage():
 
     docmemory_system.close()
 
-if __name__ == "__main__":
+def ingest_command(args):
+    """Bulk-load a directory tree, printing throughput and ETA"""
+    system = DocMemorySystem(args.storage, ingest_workers=0)
+    last_print = [0.0]
+
+    def report(stats: IngestStats):
+        now = time.monotonic()
+        if now - last_print[0] >= args.progress_interval or stats.files_done == stats.files_total:
+            last_print[0] = now
+            print(format_progress(stats))
+
+    try:
+        stats = system.ingest_directory(
+            args.directory,
+            workers=args.workers,
+            tags=args.tags.split(',') if args.tags else None,
+            progress_callback=report
+        )
+    finally:
+        system.close()
+
+    print(f"Ingested {args.directory} in {stats.elapsed:.1f}s: "
+          f"{stats.files_added} added, {stats.files_updated} updated, "
+          f"{stats.files_unchanged} unchanged, {stats.files_failed} failed, "
+          f"{stats.chunks_stored} chunks stored")
+    for path, error in stats.errors.items():
+        print(f"  {path}: {error}")
+    return 1 if stats.files_failed else 0
+
+def watch_command(args):
+    """Index directories continuously until interrupted"""
+    system = DocMemorySystem(args.storage, ingest_workers=0)
+    watcher = system.watch_directories(
+        args.directories,
+        workers=args.workers,
+        debounce=args.debounce,
+        use_inotify=not args.poll
+    )
+    system.directory_watcher = watcher
+    print(f"Watching {', '.join(watcher.directories)} with {type(watcher.backend).__name__}; Ctrl+C to stop")
+    try:
+        while watcher.thread and watcher.thread.is_alive():
+            watcher.thread.join(timeout=1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        system.close()
+    return 0
+
+def writer_command(args):
+    """Run the single writer process for multi-worker serving"""
+    system = DocMemorySystem(
+        args.storage,
+        ingest_workers=args.workers,
+        watch_directories=args.watch,
+        role=ROLE_WRITER,
+        index_sync_interval=args.publish_interval
+    )
+    print(f"Writer running on {args.storage}, publishing index generations; Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        system.close()
+    return 0
+
+def backup_command(args):
+    """Take an incremental snapshot of a (possibly live) storage directory"""
+    manager = BackupManager(
+        args.storage,
+        max_bytes_per_second=args.max_rate * 1024 * 1024 if args.max_rate else None
+    )
+    if args.list:
+        for manifest in manager.list_snapshots():
+            print(f"{manifest['id']}  {manifest['created_at']}  "
+                  f"{manifest['document_count']} documents, {manifest['vector_count']} vectors")
+        return 0
+
+    manifest = manager.create_snapshot(label=args.label)
+    stats = manifest['stats']
+    print(f"Snapshot {manifest['id']}: {manifest['document_count']} documents, "
+          f"{stats['blocks_written']}/{stats['blocks_total']} blocks new, "
+          f"{stats['bytes_written']} bytes written in {stats['seconds']}s")
+    if args.keep:
+        manager.prune(args.keep)
+    return 0
+
+def restore_command(args):
+    """Restore a snapshot, optionally rolled forward to a point in time"""
+    until = None
+    if args.until:
+        until = datetime.max if args.until == "latest" else datetime.fromisoformat(args.until)
+    manager = BackupManager(args.storage)
+    stats = manager.restore(snapshot_id=args.snapshot, target_path=args.target, until=until)
+    print(f"Restored snapshot {stats['snapshot_id']} into {stats['target_path']} "
+          f"in {stats['extract_seconds']}s, replayed {stats['records_replayed']} changes")
+    if 'previous_files' in stats:
+        print(f"Replaced files were moved to {stats['previous_files']}")
+    return 0
+
+def export_command(args):
+    """Export chunks and embeddings as shards for another environment"""
+    core = DocMemoryCore(args.storage, load_index=False)
+    try:
+        manifest = export_corpus(core, args.output, format=args.format, dtype=args.dtype,
+                                 shard_size=args.shard_size)
+    finally:
+        core.close()
+    print(f"Exported {manifest['document_count']} chunks ({manifest['vector_count']} embeddings) "
+          f"in {len(manifest['shards'])} shards to {args.output} in {manifest['seconds']}s")
+    return 0
+
+def import_command(args):
+    """Bulk-load an export into a store"""
+    core = DocMemoryCore(args.storage)
+    try:
+        stats = import_corpus(core, args.input)
+    finally:
+        core.close()
+    print(f"Imported {stats['documents_imported']} chunks ({stats['documents_skipped']} already present) "
+          f"in {stats['seconds']}s, {stats['chunks_per_second']} chunks/s")
+    if args.snapshot:
+        # Imports bypass the change log of a running server; snapshot so
+        # point-in-time restores after this moment include them
+        manifest = BackupManager(args.storage).create_snapshot(label="import")
+        print(f"Snapshot {manifest['id']} taken")
+    return 0
+
+def run_command(args):
+    """Run the self-tests and usage demo"""
     # Run tests first
     run_tests()
 
@@ -274,4 +876,82 @@ if __name__ == "__main__":
     print("- Auto-save and auto-load")
     print("- Document processing pipeline")
     print("- Advanced search algorithms")
-    print("- Complete integration and testing")
\ No newline at end of file
+    print("- Complete integration and testing")
+    return 0
+
+def cli(argv: List[str] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(prog="docmemory", description="DocMemory command line")
+    subcommands = parser.add_subparsers(dest="command")
+
+    ingest_parser = subcommands.add_parser("ingest", help="Ingest every supported file under a directory")
+    ingest_parser.add_argument("directory", help="Directory to walk")
+    ingest_parser.add_argument("--storage", default="./docmemory_storage/", help="Storage directory")
+    ingest_parser.add_argument("--workers", type=int, default=4, help="Parallel extraction workers")
+    ingest_parser.add_argument("--tags", help="Comma-separated tags for every file")
+    ingest_parser.add_argument("--progress-interval", type=float, default=1.0,
+                               help="Seconds between progress lines")
+    ingest_parser.set_defaults(handler=ingest_command)
+
+    watch_parser = subcommands.add_parser("watch", help="Keep directories indexed as files change")
+    watch_parser.add_argument("directories", nargs="+", help="Directories to watch")
+    watch_parser.add_argument("--storage", default="./docmemory_storage/", help="Storage directory")
+    watch_parser.add_argument("--workers", type=int, default=4, help="Parallel extraction workers")
+    watch_parser.add_argument("--debounce", type=float, default=2.0,
+                              help="Seconds of quiet before a batch of changes is indexed")
+    watch_parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    watch_parser.set_defaults(handler=watch_command)
+
+    writer_parser = subcommands.add_parser(
+        "writer", help="Ingest queued jobs and publish index generations for search workers"
+    )
+    writer_parser.add_argument("--storage", default="./docmemory_storage/", help="Storage directory")
+    writer_parser.add_argument("--workers", type=int, default=2, help="Ingestion job workers")
+    writer_parser.add_argument("--watch", nargs="*", default=None, help="Directories to keep indexed")
+    writer_parser.add_argument("--publish-interval", type=float, default=1.0,
+                               help="Seconds between checks for index changes to publish")
+    writer_parser.set_defaults(handler=writer_command)
+
+    backup_parser = subcommands.add_parser("backup", help="Take an incremental snapshot of the store")
+    backup_parser.add_argument("--storage", default="./docmemory_storage/", help="Storage directory")
+    backup_parser.add_argument("--label", help="Note stored with the snapshot")
+    backup_parser.add_argument("--keep", type=int, default=0,
+                               help="Prune to the newest N snapshots afterwards (0 keeps all)")
+    backup_parser.add_argument("--max-rate", type=float, default=64.0,
+                               help="Throttle in MiB/s of snapshot data (0 for unthrottled)")
+    backup_parser.add_argument("--list", action="store_true", help="List snapshots instead")
+    backup_parser.set_defaults(handler=backup_command)
+
+    restore_parser = subcommands.add_parser(
+        "restore", help="Restore a snapshot (stop the system first when restoring in place)"
+    )
+    restore_parser.add_argument("--storage", default="./docmemory_storage/",
+                                help="Storage directory holding the backups")
+    restore_parser.add_argument("--snapshot", help="Snapshot ID (default: newest before --until)")
+    restore_parser.add_argument("--until",
+                                help="Replay changes up to this ISO time, or 'latest' for all")
+    restore_parser.add_argument("--target", help="Restore into this directory instead of in place")
+    restore_parser.set_defaults(handler=restore_command)
+
+    export_parser = subcommands.add_parser("export", help="Export chunks and embeddings as shards")
+    export_parser.add_argument("output", help="Directory to write the export to")
+    export_parser.add_argument("--storage", default="./docmemory_storage/", help="Storage directory")
+    export_parser.add_argument("--format", choices=FORMATS, default="jsonl", help="Metadata shard format")
+    export_parser.add_argument("--dtype", choices=DTYPES, default="float16", help="Embedding precision")
+    export_parser.add_argument("--shard-size", type=int, default=100000, help="Chunks per shard")
+    export_parser.set_defaults(handler=export_command)
+
+    import_parser = subcommands.add_parser("import", help="Bulk-load an export into the store")
+    import_parser.add_argument("input", help="Directory written by export")
+    import_parser.add_argument("--storage", default="./docmemory_storage/", help="Storage directory")
+    import_parser.add_argument("--snapshot", action="store_true", help="Take a backup snapshot afterwards")
+    import_parser.set_defaults(handler=import_command)
+
+    test_parser = subcommands.add_parser("test", help="Run the self-tests and usage demo")
+    test_parser.set_defaults(handler=run_command)
+
+    args = parser.parse_args(argv)
+    return getattr(args, "handler", run_command)(args)
+
+if __name__ == "__main__":
+    raise SystemExit(cli())
@@ -8,19 +8,21 @@ import signal
 import json
 from pathlib import Path
 from datetime import datetime
-import zipfile
 import shutil
 from .docmemory_core import DocMemoryCore, DocumentMemory
+from .backup import BackupManager
 
 class AutoSaveManager:
     """Manages automatic saving of document memories"""
     
     def __init__(self, core_memory: DocMemoryCore, 
                  auto_save_interval: int = 300,  # 5 minutes
-                 backup_interval: int = 3600):   # 1 hour
+                 backup_interval: int = 3600,    # 1 hour
+                 backup_keep: int = 24):
         self.core_memory = core_memory
         self.auto_save_interval = auto_save_interval
         self.backup_interval = backup_interval
+        self.backup_keep = backup_keep
         
         # Threading for background operations
         self.save_lock = threading.Lock()
@@ -29,13 +31,19 @@ class AutoSaveManager:
         # Backup configuration
         self.backup_dir = core_memory.storage_path / "backups"
         self.backup_dir.mkdir(exist_ok=True)
+        self.backup_manager = BackupManager(core_memory.storage_path, conn=core_memory.conn,
+                                            lock=core_memory.lock, backup_dir=self.backup_dir)
+        core_memory.change_log = self.backup_manager.change_log
         
         # Start background threads
         self._start_background_processes()
         
         # Register cleanup handlers
         atexit.register(self.graceful_shutdown)
-        signal.signal(signal.SIGINT, self._signal_handler)
+        # Signal handlers can only be installed from the main thread (the API
+        # builds the system lazily inside a worker thread)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self._signal_handler)
     
     def _start_background_processes(self):
         """Start background threads for auto operations"""
@@ -76,35 +84,27 @@ class AutoSaveManager:
                 print(f"Auto-backup error: {e}")
     
     def _perform_auto_backup(self):
-        """Perform automatic backup of all data"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = self.backup_dir / f"docmemory_backup_{timestamp}.zip"
-        
+        """Take an incremental snapshot of the database and vector index"""
         try:
-            # Create backup by zipping the entire storage directory
-            with zipfile.ZipFile(backup_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in self.core_memory.storage_path.rglob("*"):
-                    if file_path.is_file() and "backups" not in str(file_path):
-                        arcname = file_path.relative_to(self.core_memory.storage_path.parent)
-                        zipf.write(file_path, arcname)
-            
-            print(f"Auto-backup completed: {backup_file.name}")
+            manifest = self.backup_manager.create_snapshot()
+            stats = manifest['stats']
+            print(f"Auto-backup completed: {manifest['id']} "
+                  f"({stats['blocks_written']}/{stats['blocks_total']} blocks new, "
+                  f"{stats['bytes_written']} bytes in {stats['seconds']}s)")
             
-            # Clean up old backups (keep only the 5 most recent)
             self._cleanup_old_backups()
             
         except Exception as e:
             print(f"Backup failed: {e}")
     
     def _cleanup_old_backups(self):
-        """Remove old backup files, keeping only the most recent ones"""
-        backups = sorted(self.backup_dir.glob("*.zip"), key=lambda x: x.stat().st_mtime, reverse=True)
-        for old_backup in backups[5:]:  # Keep only the 5 most recent backups
-            try:
-                old_backup.unlink()
-                print(f"Removed old backup: {old_backup.name}")
-            except Exception as e:
-                print(f"Error removing old backup {old_backup.name}: {e}")
+        """Drop snapshots beyond backup_keep and the blocks no snapshot still uses"""
+        try:
+            removed = self.backup_manager.prune(self.backup_keep)
+            if removed:
+                print(f"Removed {removed} unreferenced backup blocks")
+        except Exception as e:
+            print(f"Error pruning old backups: {e}")
     
     def graceful_shutdown(self):
         """Perform graceful shutdown operations"""
@@ -115,6 +115,7 @@ class AutoSaveManager:
         with self.save_lock:
             if self.core_memory.unsaved_changes:
                 print(f"Final save: {len(self.core_memory.unsaved_changes)} pending changes")
+        self.backup_manager.change_log.close()
         
         print("System shutdown completed.")
     
@@ -164,16 +165,21 @@ class AutoLoadManager:
 class DocMemoryAutoSystem:
     """Main system integrating core memory with auto-save/load"""
     
-    def __init__(self, storage_path: str = "./docmemory_storage/"):
-        # Initialize core memory system
-        self.core_memory = DocMemoryCore(storage_path)
+    def __init__(self, storage_path: str = "./docmemory_storage/", read_only: bool = False):
+        # Initialize core memory system; read-only search workers map the index
+        # published by the writer instead of loading it
+        self.core_memory = DocMemoryCore(storage_path, load_index=not read_only)
         
         # Initialize auto-load system
         self.auto_load = AutoLoadManager(self.core_memory, storage_path)
         self.auto_load.auto_load_system()
+        if read_only:
+            # Search workers share the writer's database; refuse any write to it
+            with self.core_memory.lock:
+                self.core_memory.conn.execute("PRAGMA query_only=ON")
         
-        # Initialize auto-save system
-        self.auto_save = AutoSaveManager(self.core_memory)
+        # Initialize auto-save system; backups are left to the writer
+        self.auto_save = None if read_only else AutoSaveManager(self.core_memory)
         
         print(f"DocMemory system initialized at: {storage_path}")
         print(f"Current document count: {self.core_memory.get_document_count()}")
@@ -187,7 +193,8 @@ class DocMemoryAutoSystem:
                      tags: list = None,
                      metadata: dict = None,
                      summary: str = "",
-                     page_numbers: list = None) -> str:
+                     page_numbers: list = None,
+                     content_hash: str = None) -> str:
         """Add a document with automatic persistence"""
         doc_id = self.core_memory.store_document(
             content=content,
@@ -198,7 +205,8 @@ class DocMemoryAutoSystem:
             tags=tags,
             metadata=metadata,
             summary=summary,
-            page_numbers=page_numbers
+            page_numbers=page_numbers,
+            content_hash=content_hash
         )
         
         # Mark as potentially needing backup
@@ -215,5 +223,6 @@ class DocMemoryAutoSystem:
     
     def close(self):
         """Close the system gracefully"""
-        self.auto_save.graceful_shutdown()
+        if self.auto_save is not None:
+            self.auto_save.graceful_shutdown()
         self.core_memory.close()
\ No newline at end of file
@@ -0,0 +1,502 @@
+"""
+DocMemory - Backups
+Consistent online snapshots stored incrementally in a content-addressed block store,
+with a change log for point-in-time recovery
+"""
+import base64
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DATABASE_FILE = "document_memories.db"
+VECTORS_FILE = "index/vectors.npy"
+IDS_FILE = "index/ids.json"
+STATE_FILE = "system_state.json"
+
+class Throttle:
+    """Caps the rate of a byte stream by sleeping between blocks
+    
+    Sleeping also hands the GIL back to request threads while a backup runs.
+    """
+    
+    def __init__(self, max_bytes_per_second: Optional[float] = None):
+        self.max_bytes_per_second = max_bytes_per_second
+        self.started_at = time.monotonic()
+        self.bytes_done = 0
+    
+    def consume(self, count: int):
+        self.bytes_done += count
+        if not self.max_bytes_per_second:
+            return
+        ahead = self.bytes_done / self.max_bytes_per_second - (time.monotonic() - self.started_at)
+        if ahead > 0:
+            time.sleep(ahead)
+
+def _encode_param(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'b64': base64.b64encode(bytes(value)).decode('ascii')}
+    return value
+
+def _decode_param(value):
+    if isinstance(value, dict):
+        return base64.b64decode(value['b64'])
+    return value
+
+class ChangeLog:
+    """Append-only log of committed document writes
+    
+    Each commit of document rows is one JSON line holding its SQL statements
+    and parameters, a sequence number and a timestamp. Replaying the lines
+    after a snapshot's position rolls the snapshot forward to any later
+    moment. Segments are started after each snapshot so they can be dropped
+    along with the snapshots that no longer need them. The timeline ID
+    changes when a restore rewrites history in place, so records from the
+    abandoned timeline are never replayed onto the new one.
+    """
+    
+    def __init__(self, directory: Path, segment_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        
+        timeline_path = self.directory / "timeline"
+        try:
+            with open(timeline_path, 'x') as f:
+                f.write(uuid.uuid4().hex)
+        except FileExistsError:
+            pass
+        self.timeline = timeline_path.read_text().strip()
+        self.seq = self.last_seq()
+    
+    def segments(self) -> List[Tuple[int, Path]]:
+        """(first sequence number, path) of every segment, oldest first"""
+        return sorted((int(path.stem), path) for path in self.directory.glob("*.jsonl"))
+    
+    def last_seq(self) -> int:
+        """Sequence number of the last complete record on disk"""
+        segments = self.segments()
+        if not segments:
+            return 0
+        start, path = segments[-1]
+        with open(path, 'rb') as f:
+            return start + f.read().count(b'\n') - 1
+    
+    def append(self, statements: Sequence[Tuple[str, tuple]]):
+        """Record one committed transaction"""
+        with self.lock:
+            self.seq += 1
+            record = {
+                'seq': self.seq,
+                'ts': datetime.now().isoformat(),
+                'statements': [[statement, [_encode_param(value) for value in params]]
+                               for statement, params in statements]
+            }
+            if self.file is None or self.file.tell() >= self.segment_bytes:
+                self._close_file()
+                self.file = open(self.directory / f"{self.seq:012d}.jsonl", 'a')
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+    
+    def rotate(self):
+        """Start a new segment with the next record"""
+        with self.lock:
+            self._close_file()
+    
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+    
+    def close(self):
+        self.rotate()
+    
+    def read(self, after_seq: int = 0, until: datetime = None) -> Iterator[Dict]:
+        """Records after after_seq, stopping at the first one later than until"""
+        segments = self.segments()
+        for position, (start, path) in enumerate(segments):
+            if position + 1 < len(segments) and segments[position + 1][0] <= after_seq + 1:
+                continue
+            with open(path) as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # torn final write
+                    record = json.loads(line)
+                    if record['seq'] <= after_seq:
+                        continue
+                    if until is not None and datetime.fromisoformat(record['ts']) > until:
+                        return
+                    yield record
+    
+    def prune(self, up_to_seq: int) -> int:
+        """Delete segments holding only records at or before up_to_seq"""
+        segments = self.segments()
+        removed = 0
+        for (start, path), (next_start, _) in zip(segments, segments[1:]):
+            if next_start - 1 <= up_to_seq:
+                path.unlink()
+                removed += 1
+        return removed
+
+class BlockStore:
+    """Deduplicated file blocks addressed by their SHA-256
+    
+    A block is stored zlib-compressed ("z" prefix) or as is ("r" prefix);
+    float vectors barely compress, so they are not worth the CPU.
+    """
+    
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+    
+    def put(self, data: bytes, compress: bool = True) -> tuple:
+        """Store a block unless it is already present; returns (digest, stored_bytes)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if path.exists():
+            return digest, 0
+        path.parent.mkdir(exist_ok=True)
+        payload = b'z' + zlib.compress(data, 1) if compress else b'r' + data
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+        return digest, len(payload)
+    
+    def get(self, digest: str) -> bytes:
+        with open(self.path(digest), 'rb') as f:
+            payload = f.read()
+        data = zlib.decompress(payload[1:]) if payload[:1] == b'z' else payload[1:]
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise Exception(f"Backup block {digest} is corrupt")
+        return data
+    
+    def digests(self) -> List[str]:
+        return [path.name for path in self.directory.glob("*/*") if not path.name.endswith('.tmp')]
+
+class BackupManager:
+    """Takes snapshots of the document database and vector index while serving
+    
+    The database is copied with the SQLite online backup API from the live
+    connection, a few pages per step. The core lock is held only during a
+    step, and writes made through the same connection between steps are
+    carried into the copy by SQLite, so the snapshot is consistent without
+    pausing ingestion for the whole copy. The vector index is exported from
+    that same copy, which puts it at exactly the same point in time.
+    
+    Both files are cut into fixed-size blocks kept in a content-addressed
+    store, so each snapshot only writes the blocks that changed since any
+    earlier one. A snapshot is a small JSON manifest listing its blocks.
+    Copy steps and block writes are throttled to bound the IO and CPU taken
+    from the serving process. restore() rolls a snapshot forward with the
+    change log to any later point in time.
+    """
+    
+    def __init__(self, storage_path: str, conn: sqlite3.Connection = None, lock=None,
+                 backup_dir: str = None, block_size: int = 64 * 1024,
+                 pages_per_step: int = 1024, step_sleep: float = 0.01,
+                 max_bytes_per_second: Optional[float] = 64 * 1024 * 1024):
+        self.storage_path = Path(storage_path)
+        self.db_path = self.storage_path / DATABASE_FILE
+        self.conn = conn
+        self.lock = lock or threading.RLock()
+        self.backup_dir = Path(backup_dir) if backup_dir else self.storage_path / "backups"
+        self.snapshot_dir = self.backup_dir / "snapshots"
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.blocks = BlockStore(self.backup_dir / "blocks")
+        self.change_log = ChangeLog(self.backup_dir / "changelog")
+        self.block_size = block_size
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_bytes_per_second = max_bytes_per_second
+    
+    def _copy_database(self, target_path: Path) -> Tuple[int, datetime]:
+        """Online copy of the live database, releasing the lock between steps
+        
+        Returns the change log position and time the copy is consistent with.
+        """
+        source = self.conn or sqlite3.connect(self.db_path)
+        target = sqlite3.connect(target_path)
+        
+        def between_steps(status, remaining, total):
+            self.lock.release()
+            try:
+                time.sleep(self.step_sleep)
+            finally:
+                self.lock.acquire()
+        
+        try:
+            with self.lock:
+                source.backup(target, pages=self.pages_per_step, progress=between_steps)
+                # Still under the lock, so no commit lands between the copy and this read
+                return self.change_log.last_seq(), datetime.now()
+        finally:
+            target.close()
+            if source is not self.conn:
+                source.close()
+    
+    @staticmethod
+    def export_index(db_path: Path, directory: Path, batch_size: int = 10000) -> int:
+        """Write the normalized embedding matrix and its document IDs
+        
+        Rows are exported in rowid order, so new embeddings land at the end of
+        the file and leave the blocks of earlier snapshots unchanged.
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM document_embeddings").fetchone()[0]
+            first = conn.execute("SELECT embedding FROM document_embeddings LIMIT 1").fetchone()
+            dim = len(first[0]) // 4 if first else 0
+            vectors = np.lib.format.open_memmap(directory / "vectors.npy", mode='w+',
+                                                dtype=np.float32, shape=(count, dim))
+            ids = []
+            cursor = conn.execute("SELECT id, embedding FROM document_embeddings ORDER BY rowid")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                batch = np.frombuffer(b''.join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), dim)
+                norms = np.linalg.norm(batch, axis=1, keepdims=True)
+                vectors[len(ids):len(ids) + len(rows)] = batch / np.where(norms == 0, 1, norms)
+                ids.extend(row[0] for row in rows)
+            vectors.flush()
+            del vectors
+        finally:
+            conn.close()
+        with open(directory / "ids.json", 'w') as f:
+            json.dump(ids, f)
+        return count
+    
+    def _store_file(self, path: Path, throttle: Throttle, stats: Dict, compress: bool = True) -> Dict:
+        """Cut a file into blocks and store the new ones"""
+        digests = []
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(self.block_size)
+                if not data:
+                    break
+                digest, stored = self.blocks.put(data, compress)
+                digests.append(digest)
+                stats['blocks_total'] += 1
+                if stored:
+                    stats['blocks_written'] += 1
+                    stats['bytes_written'] += stored
+                throttle.consume(len(data))
+        return {'size': path.stat().st_size, 'block_size': self.block_size, 'blocks': digests}
+    
+    def create_snapshot(self, label: str = None) -> Dict:
+        """Take a consistent snapshot and return its manifest"""
+        started = time.perf_counter()
+        created_at = datetime.now()
+        snapshot_id = created_at.strftime("%Y%m%d_%H%M%S_%f")
+        stats = {'blocks_total': 0, 'blocks_written': 0, 'bytes_written': 0}
+        throttle = Throttle(self.max_bytes_per_second)
+        
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as temp_dir:
+            temp_dir = Path(temp_dir)
+            (temp_dir / "index").mkdir()
+            log_seq, consistent_at = self._copy_database(temp_dir / DATABASE_FILE)
+            self.change_log.rotate()
+            vector_count = self.export_index(temp_dir / DATABASE_FILE, temp_dir / "index")
+            
+            conn = sqlite3.connect(temp_dir / DATABASE_FILE)
+            try:
+                document_count = conn.execute("SELECT COUNT(*) FROM document_memories").fetchone()[0]
+            finally:
+                conn.close()
+            
+            files = {name: self._store_file(temp_dir / name, throttle, stats, compress=name != VECTORS_FILE)
+                     for name in (DATABASE_FILE, VECTORS_FILE, IDS_FILE)}
+            if (self.storage_path / STATE_FILE).exists():
+                files[STATE_FILE] = self._store_file(self.storage_path / STATE_FILE, throttle, stats)
+        
+        manifest = {
+            'id': snapshot_id,
+            'label': label,
+            'created_at': created_at.isoformat(),
+            'consistent_at': consistent_at.isoformat(),
+            'log_seq': log_seq,
+            'timeline': self.change_log.timeline,
+            'document_count': document_count,
+            'vector_count': vector_count,
+            'files': files,
+            'stats': {**stats, 'seconds': round(time.perf_counter() - started, 3)}
+        }
+        temp_path = self.snapshot_dir / f"{snapshot_id}.json.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self.snapshot_dir / f"{snapshot_id}.json")
+        return manifest
+    
+    def list_snapshots(self) -> List[Dict]:
+        """Manifests of all snapshots, oldest first"""
+        manifests = []
+        for path in sorted(self.snapshot_dir.glob("*.json")):
+            with open(path) as f:
+                manifests.append(json.load(f))
+        return manifests
+    
+    def get_snapshot(self, snapshot_id: str) -> Optional[Dict]:
+        path = self.snapshot_dir / f"{snapshot_id}.json"
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def extract(self, snapshot_id: str, target_dir: str) -> Dict:
+        """Reassemble the files of a snapshot under target_dir"""
+        manifest = self.get_snapshot(snapshot_id)
+        if manifest is None:
+            raise Exception(f"Backup snapshot {snapshot_id} not found")
+        target_dir = Path(target_dir)
+        for name, entry in manifest['files'].items():
+            path = target_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'wb') as f:
+                for digest in entry['blocks']:
+                    f.write(self.blocks.get(digest))
+        return manifest
+    
+    def prune(self, keep: int = 24) -> int:
+        """Delete all but the newest keep snapshots and the blocks only they used"""
+        snapshots = self.list_snapshots()
+        for manifest in snapshots[:-keep] if keep else snapshots:
+            (self.snapshot_dir / f"{manifest['id']}.json").unlink()
+        
+        referenced = set()
+        for manifest in self.list_snapshots():
+            for entry in manifest['files'].values():
+                referenced.update(entry['blocks'])
+        
+        removed = 0
+        for digest in self.blocks.digests():
+            if digest not in referenced:
+                self.blocks.path(digest).unlink()
+                removed += 1
+        
+        kept = [m for m in self.list_snapshots() if m.get('timeline') == self.change_log.timeline]
+        if kept:
+            self.change_log.prune(min(m['log_seq'] for m in kept))
+        return removed
+    
+    def find_snapshot(self, until: datetime = None) -> Optional[Dict]:
+        """Newest snapshot consistent at or before until (the newest of all without it)"""
+        candidates = [m for m in self.list_snapshots()
+                      if until is None or datetime.fromisoformat(m['consistent_at']) <= until]
+        return candidates[-1] if candidates else None
+    
+    def restore(self, snapshot_id: str = None, target_path: str = None,
+                until: datetime = None) -> Dict:
+        """Restore a snapshot into target_path (in place when not given)
+        
+        With until, the newest snapshot before that time is chosen unless
+        snapshot_id is given, and the change log is replayed up to it. The
+        restored vector index is written to index/, which DocMemoryCore
+        loads on its next start instead of re-reading every embedding. The
+        system using the storage must be stopped for an in-place restore;
+        the files it replaces are kept in a pre_restore_* directory.
+        """
+        manifest = self.get_snapshot(snapshot_id) if snapshot_id else self.find_snapshot(until)
+        if manifest is None:
+            raise Exception(f"No backup snapshot {'with ID ' + snapshot_id if snapshot_id else 'to restore'}")
+        
+        in_place = target_path is None or Path(target_path).resolve() == self.storage_path.resolve()
+        target = self.storage_path if in_place else Path(target_path)
+        target.mkdir(parents=True, exist_ok=True)
+        stats = {'snapshot_id': manifest['id'], 'target_path': str(target), 'records_replayed': 0}
+        
+        started = time.perf_counter()
+        if in_place:
+            stats['previous_files'] = str(self._set_aside_current_files())
+        elif (target / DATABASE_FILE).exists():
+            raise Exception(f"{target} already holds a DocMemory database")
+        self.extract(manifest['id'], target)
+        stats['extract_seconds'] = round(time.perf_counter() - started, 3)
+        
+        if until is not None:
+            started = time.perf_counter()
+            if manifest.get('timeline') == self.change_log.timeline:
+                stats['records_replayed'] = self._replay(target, manifest['log_seq'], until)
+            else:
+                print(f"Change log starts a new timeline after snapshot {manifest['id']}; nothing to replay")
+            stats['replay_seconds'] = round(time.perf_counter() - started, 3)
+        
+        if in_place:
+            # The restored state is a new timeline; later writes must not be
+            # replayed onto snapshots taken before the restore
+            self.change_log.close()
+            shutil.move(str(self.change_log.directory), stats['previous_files'])
+            self.change_log = ChangeLog(self.backup_dir / "changelog")
+        return stats
+    
+    def _set_aside_current_files(self) -> Path:
+        """Move the files a restore replaces out of the storage directory"""
+        aside = self.storage_path / f"pre_restore_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        aside.mkdir()
+        for name in (DATABASE_FILE, DATABASE_FILE + "-wal", DATABASE_FILE + "-shm", STATE_FILE, "index"):
+            if (self.storage_path / name).exists():
+                shutil.move(str(self.storage_path / name), str(aside / name))
+        return aside
+    
+    def _replay(self, target: Path, after_seq: int, until: datetime) -> int:
+        """Apply change log records to a restored snapshot and patch its index"""
+        conn = sqlite3.connect(target / DATABASE_FILE)
+        touched = set()
+        replayed = 0
+        try:
+            for record in self.change_log.read(after_seq, until):
+                for statement, params in record['statements']:
+                    params = [_decode_param(value) for value in params]
+                    conn.execute(statement, params)
+                    if "document_embeddings" in statement:
+                        touched.update(value for value in params if isinstance(value, str))
+                replayed += 1
+            conn.commit()
+            if touched:
+                self._patch_index(conn, target / "index", touched)
+        finally:
+            conn.close()
+        return replayed
+    
+    @staticmethod
+    def _patch_index(conn: sqlite3.Connection, directory: Path, touched: set):
+        """Bring the snapshot's vectors up to date for embeddings the replay changed"""
+        with open(directory / "ids.json") as f:
+            ids = json.load(f)
+        vectors = np.load(directory / "vectors.npy", mmap_mode='r')
+        
+        keep = np.array([doc_id not in touched for doc_id in ids], dtype=bool)
+        touched = sorted(touched)
+        rows = []
+        for start in range(0, len(touched), 500):
+            batch = touched[start:start + 500]
+            rows.extend(conn.execute(
+                f"SELECT id, embedding FROM document_embeddings WHERE id IN ({','.join('?' for _ in batch)})",
+                batch
+            ).fetchall())
+        
+        dim = len(rows[0][1]) // 4 if rows else vectors.shape[1]
+        added = np.frombuffer(b''.join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), dim)
+        norms = np.linalg.norm(added, axis=1, keepdims=True)
+        kept = vectors[keep] if keep.any() else np.empty((0, dim), dtype=np.float32)
+        patched = np.concatenate([kept, added / np.where(norms == 0, 1, norms)])
+        del vectors
+        np.save(directory / "vectors.npy", patched)
+        with open(directory / "ids.json", 'w') as f:
+            json.dump([doc_id for doc_id, kept in zip(ids, keep) if kept] + [row[0] for row in rows], f)
@@ -0,0 +1,201 @@
+"""
+DocMemory - Corpus Transfer
+Columnar bulk export and import of stored chunks and their embeddings
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from operator import itemgetter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .docmemory_core import DocMemoryCore, STORED_COLUMNS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ("jsonl", "parquet")
+DTYPES = ("float16", "float32")
+MANIFEST_FILE = "manifest.json"
+FILES_FILE = "files.jsonl"
+
+# Each metadata row also names its row in the shard's vector array (-1 when
+# the chunk shares the embedding of an identical chunk)
+VECTOR_COLUMN = "vector"
+EXPORT_COLUMNS = STORED_COLUMNS + (VECTOR_COLUMN,)
+
+def _require_parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("pyarrow is required for Parquet export and import. Install it or use --format jsonl.")
+    return pyarrow, pyarrow.parquet
+
+def _dumps_line(row: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(row) + b"\n"
+    return json.dumps(row, ensure_ascii=False).encode('utf-8') + b"\n"
+
+def _loads_line(line: bytes) -> Dict:
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+def write_metadata(path: Path, columns: Dict[str, list], format: str):
+    """Write one shard of metadata columns as JSONL or Parquet"""
+    if format == "parquet":
+        pyarrow, parquet = _require_parquet()
+        parquet.write_table(pyarrow.table(columns), path)
+        return
+    names = list(columns)
+    with open(path, 'wb') as f:
+        for values in zip(*columns.values()):
+            f.write(_dumps_line(dict(zip(names, values))))
+
+def read_metadata(path: Path, format: str) -> List[tuple]:
+    """Read one shard of metadata as row tuples in EXPORT_COLUMNS order"""
+    if format == "parquet":
+        _, parquet = _require_parquet()
+        columns = parquet.read_table(path, columns=list(EXPORT_COLUMNS)).to_pydict()
+        return list(zip(*(columns[name] for name in EXPORT_COLUMNS)))
+    row_values = itemgetter(*EXPORT_COLUMNS)
+    with open(path, 'rb') as f:
+        return [row_values(_loads_line(line)) for line in f]
+
+def export_corpus(core: DocMemoryCore, output_dir: str, format: str = "jsonl",
+                  dtype: str = "float16", shard_size: int = 100000,
+                  progress_callback: Optional[Callable[[int], None]] = None) -> Dict:
+    """Export every chunk as metadata shards plus one contiguous vector array per shard
+    
+    Rows are streamed through the core's keyset iterator, so memory use is
+    bounded by the shard size and the store keeps serving meanwhile (chunks
+    written during the export may or may not be included). Returns the
+    manifest, which is written last and so marks a complete export.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown vector dtype: {dtype}")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    shards = []
+    exported = 0
+    
+    columns = {name: [] for name in EXPORT_COLUMNS}
+    blobs = []
+    
+    def flush():
+        number = len(shards)
+        metadata_name = f"shard-{number:05d}.{format}"
+        vectors_name = f"shard-{number:05d}.npy"
+        vectors = np.frombuffer(b''.join(blobs), dtype=np.float32).reshape(len(blobs), core.embedding_dim)
+        np.save(output_dir / vectors_name, vectors.astype(dtype))
+        write_metadata(output_dir / metadata_name, columns, format)
+        shards.append({'metadata': metadata_name, 'vectors': vectors_name,
+                       'rows': len(columns['id']), 'vector_rows': len(blobs)})
+        for values in columns.values():
+            values.clear()
+        blobs.clear()
+    
+    for rows in core.iter_rows(batch_size=min(shard_size, 10000), with_embeddings=True):
+        for row in rows:
+            for name in STORED_COLUMNS:
+                columns[name].append(row[name])
+            if row['embedding'] is None:
+                columns[VECTOR_COLUMN].append(-1)
+            else:
+                columns[VECTOR_COLUMN].append(len(blobs))
+                blobs.append(row['embedding'])
+            if len(columns['id']) >= shard_size:
+                flush()
+        exported += len(rows)
+        if progress_callback:
+            progress_callback(exported)
+    if columns['id'] or not shards:
+        flush()
+    
+    with core.lock:
+        files = [dict(row) for row in core.conn.execute("SELECT * FROM document_files")]
+    with open(output_dir / FILES_FILE, 'wb') as f:
+        for row in files:
+            f.write(_dumps_line(row))
+    
+    manifest = {
+        'format_version': 1,
+        'format': format,
+        'dtype': dtype,
+        'dim': core.embedding_dim,
+        'exported_at': datetime.now().isoformat(),
+        'document_count': exported,
+        'vector_count': sum(shard['vector_rows'] for shard in shards),
+        'file_count': len(files),
+        'shards': shards,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+    with open(output_dir / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def import_corpus(core: DocMemoryCore, input_dir: str,
+                  progress_callback: Optional[Callable[[int], None]] = None) -> Dict:
+    """Bulk-load an export: one transaction and one vector index add per shard
+    
+    Chunks whose ID is already stored are skipped, so an interrupted import
+    can be run again.
+    """
+    input_dir = Path(input_dir)
+    with open(input_dir / MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    if manifest['dim'] != core.embedding_dim:
+        raise Exception(f"Export has {manifest['dim']}-dimensional embeddings, this store uses {core.embedding_dim}")
+    
+    def load_shard(shard: Dict):
+        rows = read_metadata(input_dir / shard['metadata'], manifest['format'])
+        vectors = np.load(input_dir / shard['vectors']).astype(np.float32)
+        if manifest['dtype'] != 'float32':
+            # Undo the rounding of reduced-precision vectors
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+        
+        # Vector rows are numbered in row order, skipping chunks without one
+        embedding_ids = [row[0] for row in rows if row[-1] >= 0]
+        if len(embedding_ids) != len(vectors):
+            raise Exception(f"{shard['vectors']} holds {len(vectors)} vectors for {len(embedding_ids)} chunks")
+        return [row[:-1] for row in rows], embedding_ids, vectors
+    
+    started = time.perf_counter()
+    read = imported = 0
+    shards = manifest['shards']
+    # Parse the next shard while SQLite (which releases the GIL) inserts this one
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        pending = reader.submit(load_shard, shards[0]) if shards else None
+        for position in range(len(shards)):
+            rows, embedding_ids, vectors = pending.result()
+            if position + 1 < len(shards):
+                pending = reader.submit(load_shard, shards[position + 1])
+            
+            imported += core.bulk_insert(rows, embedding_ids, vectors)
+            read += len(rows)
+            if progress_callback:
+                progress_callback(read)
+    
+    files_path = input_dir / FILES_FILE
+    if files_path.exists():
+        with open(files_path, 'rb') as f:
+            files = [_loads_line(line) for line in f]
+        core.register_files([(row['file_hash'], row['source_file'], row['title'],
+                              row['document_ids'], row['timestamp']) for row in files])
+    
+    seconds = time.perf_counter() - started
+    return {
+        'documents_read': read,
+        'documents_imported': imported,
+        'documents_skipped': read - imported,
+        'seconds': round(seconds, 3),
+        'chunks_per_second': round(read / seconds) if seconds else None
+    }
@@ -0,0 +1,268 @@
+"""
+DocMemory - Directory Ingestion
+Resumable bulk ingestion of a directory tree with per-file checkpoints
+"""
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+@dataclass
+class IngestStats:
+    """Counters for one directory ingestion run"""
+    files_total: int = 0
+    files_done: int = 0
+    files_unchanged: int = 0
+    files_added: int = 0
+    files_updated: int = 0
+    files_failed: int = 0
+    chunks_stored: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    errors: Dict[str, str] = field(default_factory=dict)
+    
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+    
+    @property
+    def files_per_second(self) -> float:
+        return self.files_done / self.elapsed if self.elapsed > 0 else 0.0
+    
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated time left, once throughput is known"""
+        rate = self.files_per_second
+        if not rate:
+            return None
+        return (self.files_total - self.files_done) / rate
+
+def format_progress(stats: IngestStats) -> str:
+    """One-line progress summary with throughput and ETA"""
+    eta = stats.eta_seconds
+    eta_text = time.strftime('%H:%M:%S', time.gmtime(eta)) if eta is not None else '--:--:--'
+    chunk_rate = stats.chunks_stored / stats.elapsed if stats.elapsed > 0 else 0.0
+    return (f"[{stats.files_done}/{stats.files_total}] "
+            f"{stats.files_per_second:.1f} files/s, {chunk_rate:.1f} chunks/s, "
+            f"{stats.files_failed} failed, ETA {eta_text}")
+
+class DirectoryIngestor:
+    """Ingests a directory tree, checkpointing every file in the document database
+    
+    Each ingested file is recorded with its size, mtime, content hash and
+    chunk IDs as soon as it is stored. On the next run files whose size and
+    mtime are unchanged are skipped without reading them, files whose bytes
+    are unchanged only get their mtime refreshed, and changed files go through
+    the incremental update path. An interrupted run therefore resumes where
+    it stopped.
+    """
+    
+    def __init__(self, core_memory, pipeline, workers: int = 4, batch_size: int = 64):
+        self.core_memory = core_memory
+        self.pipeline = pipeline
+        self.workers = workers
+        self.batch_size = batch_size
+        self._init_table()
+    
+    def _init_table(self):
+        """Create the checkpoint table in the document database"""
+        with self.core_memory.lock:
+            self.core_memory.conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    file_hash TEXT,
+                    document_ids TEXT,
+                    updated_at TEXT
+                )
+            ''')
+            self.core_memory.conn.commit()
+    
+    def scan(self, root: str) -> List[Path]:
+        """Supported files under root, in a stable order"""
+        formats = self.pipeline.processor.supported_formats
+        found = []
+        for directory, subdirectories, filenames in os.walk(root):
+            subdirectories.sort()
+            for filename in sorted(filenames):
+                if Path(filename).suffix.lower() in formats:
+                    found.append(Path(directory, filename).resolve())
+        return found
+    
+    def get_checkpoint(self, path: str) -> Optional[Dict]:
+        """Stored checkpoint of a file, if it was ingested before"""
+        with self.core_memory.lock:
+            row = self.core_memory.conn.execute(
+                "SELECT * FROM ingest_checkpoints WHERE path = ?", (str(path),)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'path': row['path'],
+            'size': row['size'],
+            'mtime_ns': row['mtime_ns'],
+            'file_hash': row['file_hash'],
+            'document_ids': json.loads(row['document_ids'] or '[]')
+        }
+    
+    def _save_checkpoint(self, path: str, file_hash: str, document_ids: List[str], stat=None):
+        """Record a file as ingested"""
+        stat = stat or os.stat(path)
+        with self.core_memory.lock:
+            self.core_memory.conn.execute('''
+                INSERT OR REPLACE INTO ingest_checkpoints
+                (path, size, mtime_ns, file_hash, document_ids, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+            ''', (str(path), stat.st_size, stat.st_mtime_ns, file_hash,
+                  json.dumps(document_ids), datetime.now().isoformat()))
+            self.core_memory.conn.commit()
+    
+    def _shares_chunks(self, path: str, doc_ids: List[str]) -> bool:
+        """Whether anything besides this file references any of its stored chunks
+        
+        Identical content is deduplicated onto the chunks already stored for
+        it, so the chunks of a watched file may belong to another checkpointed
+        file or to a file registered by an upload (document_files rows whose
+        source is not this path). Those must not be rewritten or deleted.
+        """
+        ids = json.dumps(list(doc_ids))
+        with self.core_memory.lock:
+            conn = self.core_memory.conn
+            for table, owner_column in (('ingest_checkpoints', 'path'), ('document_files', 'source_file')):
+                row = conn.execute(f'''
+                    SELECT 1 FROM {table}, json_each({table}.document_ids) AS chunk
+                    WHERE {table}.{owner_column} != ? AND chunk.value IN (SELECT value FROM json_each(?))
+                    LIMIT 1
+                ''', (str(path), ids)).fetchone()
+                if row is not None:
+                    return True
+        return False
+    
+    def ingest_paths(self,
+                     paths: List[Path],
+                     tags: List[str] = None,
+                     stats: IngestStats = None,
+                     progress_callback: Optional[Callable[[IngestStats], None]] = None) -> IngestStats:
+        """Bring the given files up to date with their checkpoints"""
+        stats = stats or IngestStats()
+        stats.files_total += len(paths)
+        hash_file = self.pipeline.processor.compute_file_hash
+        
+        def done(path, error: str = None):
+            stats.files_done += 1
+            if error:
+                stats.files_failed += 1
+                stats.errors[str(path)] = error
+            if progress_callback:
+                progress_callback(stats)
+        
+        # Sort files into unchanged, changed and new without re-reading unchanged ones
+        new_files = []
+        changed_files = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                checkpoint = self.get_checkpoint(path)
+                if checkpoint and (checkpoint['size'], checkpoint['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                    stats.files_unchanged += 1
+                    done(path)
+                    continue
+                
+                file_hash = hash_file(path)
+                if checkpoint and checkpoint['file_hash'] == file_hash:
+                    # Touched but identical; just refresh the checkpoint
+                    self._save_checkpoint(path, file_hash, checkpoint['document_ids'], stat)
+                    stats.files_unchanged += 1
+                    done(path)
+                elif checkpoint and checkpoint['document_ids'] and not self._shares_chunks(path, checkpoint['document_ids']):
+                    changed_files.append((path, checkpoint['document_ids']))
+                else:
+                    # New, or its chunks are shared: store the new content as chunks
+                    # of its own and leave the shared ones to their other owners
+                    new_files.append((path, file_hash))
+            except Exception as e:
+                done(path, str(e))
+        
+        # Changed files re-embed only the chunks that changed
+        for path, doc_ids in changed_files:
+            result = self.pipeline.update_document(str(path), doc_ids, new_tags=tags)
+            if result['success']:
+                self._save_checkpoint(path, hash_file(path), result['document_ids'])
+                stats.files_updated += 1
+                stats.chunks_stored += result['added']
+                done(path)
+            else:
+                done(path, result['error'])
+        
+        # New files go through the parallel batch pipeline, checkpointed one by one
+        hashes = {str(path): file_hash for path, file_hash in new_files}
+        
+        def file_done(file_path: str, doc_ids: List[str], error: Optional[str]):
+            if error:
+                done(file_path, error)
+                return
+            self._save_checkpoint(file_path, hashes[file_path], doc_ids)
+            stats.files_added += 1
+            stats.chunks_stored += len(doc_ids)
+            done(file_path)
+        
+        batch_paths = list(hashes)
+        for start in range(0, len(batch_paths), self.batch_size):
+            batch = batch_paths[start:start + self.batch_size]
+            self.pipeline.batch_process_documents(
+                batch,
+                tags_by_file={file_path: tags for file_path in batch} if tags else None,
+                hashes_by_file=hashes,
+                max_workers=self.workers,
+                file_callback=file_done
+            )
+        
+        return stats
+    
+    def remove_paths(self, paths: List[str]) -> int:
+        """Delete the chunks of removed files or directories and forget their checkpoints
+        
+        Chunks still referenced by another checkpointed file or by an upload
+        are kept; only this file's reference to them is dropped. Returns the
+        number of files removed.
+        """
+        removed = 0
+        core_memory = self.core_memory
+        with core_memory.lock:
+            for path in paths:
+                path = str(Path(path).resolve())
+                prefix = path.rstrip(os.sep) + os.sep
+                rows = core_memory.conn.execute('''
+                    SELECT path, file_hash, document_ids FROM ingest_checkpoints
+                    WHERE path = ? OR substr(path, 1, ?) = ?
+                ''', (path, len(prefix), prefix)).fetchall()
+                for row in rows:
+                    core_memory.conn.execute("DELETE FROM ingest_checkpoints WHERE path = ?", (row['path'],))
+                    core_memory.conn.commit()
+                    doc_ids = json.loads(row['document_ids'] or '[]')
+                    if not self._shares_chunks(row['path'], doc_ids):
+                        for doc_id in doc_ids:
+                            core_memory.delete_document(doc_id)
+                    removed += 1
+        return removed
+    
+    def prune(self, root: str) -> int:
+        """Remove checkpointed files under root that no longer exist on disk"""
+        prefix = str(Path(root).resolve()).rstrip(os.sep) + os.sep
+        with self.core_memory.lock:
+            rows = self.core_memory.conn.execute(
+                "SELECT path FROM ingest_checkpoints WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        missing = [row['path'] for row in rows if not os.path.exists(row['path'])]
+        return self.remove_paths(missing) if missing else 0
+    
+    def ingest(self,
+               root: str,
+               tags: List[str] = None,
+               progress_callback: Optional[Callable[[IngestStats], None]] = None) -> IngestStats:
+        """Walk a directory and ingest every new or changed supported file"""
+        if not Path(root).is_dir():
+            raise ValueError(f"Not a directory: {root}")
+        return self.ingest_paths(self.scan(root), tags=tags, progress_callback=progress_callback)
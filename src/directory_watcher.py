@@ -0,0 +1,285 @@
+"""
+DocMemory - Directory Watcher
+Continuous incremental indexing of directories via inotify or polling
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .directory_ingest import DirectoryIngestor
+
+# Event kinds reported by the backends
+EVENT_CHANGED = "changed"
+EVENT_DELETED = "deleted"
+EVENT_RESCAN = "rescan"
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+class InotifyBackend:
+    """Recursive directory watch on top of Linux inotify, loaded through ctypes"""
+    
+    def __init__(self, directories: List[str]):
+        library = ctypes.util.find_library('c')
+        self.libc = ctypes.CDLL(library or 'libc.so.6', use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this platform")
+        
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        
+        self.roots = [str(Path(directory).resolve()) for directory in directories]
+        self.watches: Dict[int, str] = {}
+        for root in self.roots:
+            self._watch_tree(root)
+    
+    def _watch_tree(self, root: str) -> List[str]:
+        """Watch a directory and its subdirectories, returning the files found in them"""
+        files = []
+        for directory, subdirectories, filenames in os.walk(root):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = directory
+            files.extend(os.path.join(directory, filename) for filename in filenames)
+        return files
+    
+    def poll(self, timeout: float) -> List[Tuple[str, str]]:
+        """Wait up to timeout seconds and return (kind, path) events"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + name_length
+            
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; fall back to a full resync
+                events.extend((EVENT_RESCAN, root) for root in self.roots)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # A directory copied or moved in may already contain files
+                    events.extend((EVENT_CHANGED, file_path) for file_path in self._watch_tree(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    events.append((EVENT_DELETED, path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                events.append((EVENT_CHANGED, path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append((EVENT_DELETED, path))
+        
+        return events
+    
+    def close(self):
+        os.close(self.fd)
+
+class PollingBackend:
+    """Portable fallback that diffs (size, mtime) snapshots of the tree"""
+    
+    def __init__(self, directories: List[str], interval: float = 5.0):
+        self.roots = [str(Path(directory).resolve()) for directory in directories]
+        self.interval = interval
+        self.snapshot = self._scan()
+        self.next_scan = time.monotonic() + interval
+    
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for root in self.roots:
+            for directory, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(directory, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+    
+    def poll(self, timeout: float) -> List[Tuple[str, str]]:
+        """Rescan once the interval has passed and return (kind, path) events"""
+        wait = self.next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(wait, 0))
+        self.next_scan = time.monotonic() + self.interval
+        
+        current = self._scan()
+        events = [(EVENT_CHANGED, path) for path, state in current.items() if self.snapshot.get(path) != state]
+        events.extend((EVENT_DELETED, path) for path in self.snapshot if path not in current)
+        self.snapshot = current
+        return events
+    
+    def close(self):
+        pass
+
+class DirectoryWatcher:
+    """Keeps the store in sync with watched directories
+    
+    File events are coalesced per path (the last event wins) and flushed as
+    one batch once no new event has arrived for debounce seconds, or once the
+    oldest pending event is max_delay seconds old. Changed files go through
+    DirectoryIngestor.ingest_paths, so new files use the parallel batch path
+    and modified ones the incremental update path; deleted files and
+    directories have their chunks removed.
+    """
+    
+    def __init__(self, ingestor: DirectoryIngestor, directories: List[str],
+                 debounce: float = 2.0, max_delay: float = 30.0,
+                 poll_interval: float = 5.0, use_inotify: bool = True):
+        self.ingestor = ingestor
+        self.directories = [str(Path(directory).resolve()) for directory in directories]
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.supported_formats = ingestor.pipeline.processor.supported_formats
+        
+        self.backend = None
+        if use_inotify:
+            try:
+                self.backend = InotifyBackend(self.directories)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}); falling back to polling")
+        if self.backend is None:
+            self.backend = PollingBackend(self.directories, interval=poll_interval)
+        
+        self.pending: Dict[str, str] = {}
+        self.first_event_at: Optional[float] = None
+        self.last_event_at: Optional[float] = None
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        
+        # Statistics
+        self.batches_flushed = 0
+        self.failed_batches = 0
+    
+    def sync(self):
+        """Catch up with changes made while the watcher was not running"""
+        for directory in self.directories:
+            self.ingestor.prune(directory)
+            self.ingestor.ingest(directory)
+    
+    def add_events(self, events: List[Tuple[str, str]]):
+        """Coalesce events into the pending batch"""
+        now = time.monotonic()
+        for kind, path in events:
+            if kind == EVENT_CHANGED and Path(path).suffix.lower() not in self.supported_formats:
+                continue
+            self.pending[path] = kind
+            if self.first_event_at is None:
+                self.first_event_at = now
+            self.last_event_at = now
+    
+    def flush_due(self) -> bool:
+        """Whether the pending batch should be processed now"""
+        if not self.pending:
+            return False
+        now = time.monotonic()
+        return now - self.last_event_at >= self.debounce or now - self.first_event_at >= self.max_delay
+    
+    def flush(self):
+        """Process every pending event as one batch
+        
+        If processing fails the batch is queued again (behind any newer event
+        for the same path) and retried after the debounce delay.
+        """
+        pending, self.pending = self.pending, {}
+        self.first_event_at = self.last_event_at = None
+        if not pending:
+            return
+        
+        try:
+            self._process(pending)
+        except Exception:
+            self.failed_batches += 1
+            now = time.monotonic()
+            self.pending = {**pending, **self.pending}
+            self.first_event_at = self.first_event_at or now
+            self.last_event_at = now
+            raise
+        self.batches_flushed += 1
+    
+    def _process(self, pending: Dict[str, str]):
+        if EVENT_RESCAN in pending.values():
+            self.sync()
+            return
+        
+        changed = [Path(path) for path, kind in pending.items() if kind == EVENT_CHANGED and os.path.isfile(path)]
+        deleted = [path for path, kind in pending.items() if kind == EVENT_DELETED or not os.path.exists(path)]
+        
+        if deleted:
+            self.ingestor.remove_paths(deleted)
+        if changed:
+            stats = self.ingestor.ingest_paths(changed)
+            print(f"Indexed {len(changed)} changed files "
+                  f"({stats.files_added} added, {stats.files_updated} updated, {stats.files_failed} failed)")
+    
+    def run_once(self, timeout: float = 0.5):
+        """Collect events for up to timeout seconds and flush if the batch is due"""
+        self.add_events(self.backend.poll(timeout))
+        if self.flush_due():
+            self.flush()
+    
+    def _run(self):
+        # Catch up first; on failure the rescan is retried like any failed batch
+        try:
+            self.sync()
+        except Exception as e:
+            print(f"Directory watcher sync failed, retrying: {e}")
+            self.add_events([(EVENT_RESCAN, directory) for directory in self.directories])
+        while self.running:
+            try:
+                self.run_once(min(self.debounce, 0.5))
+            except Exception as e:
+                print(f"Directory watcher error: {e}")
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Directory watcher could not flush {len(self.pending)} pending events: {e}")
+    
+    def start(self):
+        """Sync the directories and watch them, both on a background thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="directory-watcher", daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout: float = 10.0):
+        """Flush pending events and stop watching"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+        self.backend.close()
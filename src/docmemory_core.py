@@ -4,15 +4,21 @@ Core Memory Management Implementation
 """
 import os
 import json
+import hashlib
 import pickle
+import shutil
+import threading
 import uuid
+from functools import wraps
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterator, List, Optional, Any, Union
 import numpy as np
 import sqlite3
 import faiss
 from dataclasses import dataclass, field
+from . import memory_accounting, tracing
+from .metrics import SQLITE_COMMIT_SECONDS
 
 @dataclass
 class DocumentMemory:
@@ -29,17 +35,53 @@ class DocumentMemory:
     metadata: Dict[str, Any] = field(default_factory=dict)  # additional document metadata
     summary: str = ""
     page_numbers: List[int] = field(default_factory=list)  # if from multi-page doc
+    content_hash: str = ""  # SHA-256 of content, shared by identical chunks
+
+@dataclass
+class DocumentFields:
+    """Fields of a stored chunk used to filter and rerank search candidates"""
+    id: str
+    title: str
+    source_file: str
+    timestamp: datetime
+    document_type: str
+    tags: List[str]
+    metadata: Dict[str, Any]
+
+def synchronized(method):
+    """Serialize access to the shared SQLite connection and FAISS index"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# Columns of document_memories, in the order exports and bulk inserts use
+STORED_COLUMNS = ('id', 'title', 'content', 'source_file', 'timestamp', 'document_type', 'tags',
+                  'relationships', 'metadata', 'summary', 'page_numbers', 'content_hash')
+
+def compute_content_hash(content: str) -> str:
+    """SHA-256 fingerprint of chunk content"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 class DocMemoryCore:
     """Core memory management system for documents"""
     
-    def __init__(self, storage_path: str = "./docmemory_storage/"):
+    def __init__(self, storage_path: str = "./docmemory_storage/", load_index: bool = True):
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
         
+        # Re-entrant lock so background workers can share this instance
+        self.lock = threading.RLock()
+        
+        # Document writes are appended here after each commit when backups
+        # are enabled, for point-in-time recovery (see backup.ChangeLog)
+        self.change_log = None
+        self.pending_changes = []
+        
         # Initialize storage components
         self._init_database()
-        self._init_vector_index()
+        self._init_vector_index(load_index)
         
         # Memory stores
         self.document_memories = {}  # In-memory cache for active documents
@@ -48,7 +90,7 @@ class DocMemoryCore:
     def _init_database(self):
         """Initialize SQLite database for metadata storage"""
         self.db_path = self.storage_path / "document_memories.db"
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Enable column access by name
         
         cursor = self.conn.cursor()
@@ -78,10 +120,59 @@ class DocMemoryCore:
             )
         ''')
         
-        self.conn.commit()
+        # Uploaded files by SHA-256 so a re-upload maps back to its stored chunks
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS document_files (
+                file_hash TEXT PRIMARY KEY,
+                source_file TEXT,
+                title TEXT,
+                document_ids TEXT,
+                timestamp TEXT
+            )
+        ''')
+        
+        self._migrate_content_hash(cursor)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_document_memories_content_hash
+            ON document_memories (content_hash)
+        ''')
+        
+        self._commit()
+    
+    def _commit(self):
+        """Commit the document database, recording how long it took"""
+        with SQLITE_COMMIT_SECONDS.time():
+            self.conn.commit()
+        if self.pending_changes:
+            changes, self.pending_changes = self.pending_changes, []
+            if self.change_log is not None:
+                self.change_log.append(changes)
     
-    def _init_vector_index(self):
-        """Initialize FAISS vector index for similarity search"""
+    def _execute_logged(self, cursor: sqlite3.Cursor, statement: str, params: tuple = ()):
+        """Execute a document write, queueing it for the change log"""
+        cursor.execute(statement, params)
+        if self.change_log is not None:
+            self.pending_changes.append((statement, params))
+    
+    def _migrate_content_hash(self, cursor: sqlite3.Cursor):
+        """Add and backfill the content_hash column on databases created before it existed"""
+        columns = [row['name'] for row in cursor.execute("PRAGMA table_info(document_memories)")]
+        if 'content_hash' in columns:
+            return
+        
+        cursor.execute("ALTER TABLE document_memories ADD COLUMN content_hash TEXT")
+        rows = cursor.execute("SELECT id, content FROM document_memories").fetchall()
+        cursor.executemany(
+            "UPDATE document_memories SET content_hash = ? WHERE id = ?",
+            [(compute_content_hash(row['content'] or ""), row['id']) for row in rows]
+        )
+    
+    def _init_vector_index(self, load_index: bool = True):
+        """Initialize FAISS vector index for similarity search
+        
+        Search workers pass load_index=False and map a published index
+        generation instead of loading every embedding from SQLite.
+        """
         self.embedding_dim = 384  # Using smaller dimension for efficiency
         self.faiss_index = faiss.IndexFlatIP(self.embedding_dim)  # Inner product (cosine similarity)
         
@@ -89,8 +180,58 @@ class DocMemoryCore:
         self.id_to_index = {}  # document_id -> FAISS index
         self.index_to_id = {}  # FAISS index -> document_id
         
-        # Load existing embeddings if they exist
-        self._load_existing_embeddings()
+        # Vectors of deleted or superseded documents still held by FAISS
+        self.orphaned_vectors = 0
+        self.min_orphans_before_compaction = 1000
+        self.max_orphan_ratio = 0.1
+        
+        # Bumped on every change to the index so publishers can tell it changed
+        self.index_version = 0
+        # Bumped when existing vectors move to new positions, as on compaction.
+        # Within one epoch vectors are only appended, never rewritten
+        self.index_epoch = 0
+        
+        # Load the index a restore persisted, or rebuild it from the database
+        if load_index and not self._load_persisted_index():
+            self._load_existing_embeddings()
+    
+    def _load_persisted_index(self) -> bool:
+        """Load vectors left in index/ by a snapshot restore
+        
+        The files are removed once read: they only match the database until
+        the next write, so later starts rebuild from SQLite as usual.
+        """
+        directory = self.storage_path / "index"
+        vectors_path = directory / "vectors.npy"
+        ids_path = directory / "ids.json"
+        if not vectors_path.exists() or not ids_path.exists():
+            return False
+        
+        try:
+            with open(ids_path) as f:
+                ids = json.load(f)
+            vectors = np.load(vectors_path, mmap_mode='r')
+            count = self.conn.execute("SELECT COUNT(*) FROM document_embeddings").fetchone()[0]
+            if len(ids) != count or (count and vectors.shape != (count, self.embedding_dim)):
+                print(f"Ignoring persisted index: {len(ids)} vectors for {count} stored embeddings")
+                return False
+            
+            batch_size = 65536
+            for start in range(0, count, batch_size):
+                self.faiss_index.add(np.ascontiguousarray(vectors[start:start + batch_size], dtype=np.float32))
+            self.id_to_index = {doc_id: position for position, doc_id in enumerate(ids)}
+            self.index_to_id = dict(enumerate(ids))
+            del vectors
+            print(f"Loaded {count} vectors from the restored index")
+            return True
+        except Exception as e:
+            print(f"Could not load persisted index: {e}")
+            self.faiss_index.reset()
+            self.id_to_index = {}
+            self.index_to_id = {}
+            return False
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
     
     def _load_existing_embeddings(self):
         """Load existing embeddings from database to FAISS index"""
@@ -114,6 +255,7 @@ class DocMemoryCore:
             self.index_to_id[index_counter] = doc_id
             index_counter += 1
     
+    @synchronized
     def store_document(self, 
                      content: str, 
                      title: str, 
@@ -123,10 +265,20 @@ class DocMemoryCore:
                      tags: List[str] = None,
                      metadata: Dict[str, Any] = None,
                      summary: str = "",
-                     page_numbers: List[int] = None) -> str:
-        """Store a document in memory system"""
+                     page_numbers: List[int] = None,
+                     content_hash: str = None) -> str:
+        """Store a document in memory system
+        
+        Chunks with identical content share one stored embedding and FAISS vector.
+        """
         
         doc_id = str(uuid.uuid4())
+        content_hash = content_hash or compute_content_hash(content)
+        
+        # Reuse the embedding of an identical chunk that is already stored
+        owner_id = self._find_embedding_owner(content_hash)
+        if owner_id is not None:
+            embedding = self._load_embedding(owner_id)
         
         # Normalize embedding
         embedding = embedding / np.linalg.norm(embedding)
@@ -144,14 +296,16 @@ class DocMemoryCore:
             relationships={},
             metadata=metadata or {},
             summary=summary,
-            page_numbers=page_numbers or []
+            page_numbers=page_numbers or [],
+            content_hash=content_hash
         )
         
         # Store in database
         self._store_in_database(doc_memory)
         
-        # Store embedding in vector database
-        self._store_embedding(doc_id, embedding)
+        # Store embedding in vector database unless an identical chunk already owns one
+        if owner_id is None:
+            self._store_embedding(doc_id, embedding)
         
         # Add to in-memory cache
         self.document_memories[doc_id] = doc_memory
@@ -163,10 +317,10 @@ class DocMemoryCore:
         """Store document metadata in SQLite database"""
         cursor = self.conn.cursor()
         
-        cursor.execute('''
+        self._execute_logged(cursor, '''
             INSERT OR REPLACE INTO document_memories 
-            (id, title, content, source_file, timestamp, document_type, tags, relationships, metadata, summary, page_numbers)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (id, title, content, source_file, timestamp, document_type, tags, relationships, metadata, summary, page_numbers, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             doc_memory.id,
             doc_memory.title,
@@ -178,10 +332,11 @@ class DocMemoryCore:
             json.dumps(doc_memory.relationships),
             json.dumps(doc_memory.metadata),
             doc_memory.summary,
-            json.dumps(doc_memory.page_numbers)
+            json.dumps(doc_memory.page_numbers),
+            doc_memory.content_hash or compute_content_hash(doc_memory.content)
         ))
         
-        self.conn.commit()
+        self._commit()
     
     def _store_embedding(self, doc_id: str, embedding: np.ndarray):
         """Store document embedding in vector database"""
@@ -190,28 +345,185 @@ class DocMemoryCore:
         # Convert numpy array to bytes
         embedding_bytes = embedding.astype(np.float32).tobytes()
         
-        cursor.execute('''
+        self._execute_logged(cursor, '''
             INSERT OR REPLACE INTO document_embeddings 
             (id, embedding) VALUES (?, ?)
         ''', (doc_id, embedding_bytes))
         
-        self.conn.commit()
+        self._commit()
         
         # Update FAISS index
         embedding_normalized = embedding / np.linalg.norm(embedding)
-        faiss_index = len(self.index_to_id)
+        faiss_index = self.faiss_index.ntotal
+        
+        # A re-stored embedding supersedes the vector previously mapped to this document
+        previous_index = self.id_to_index.get(doc_id)
+        if previous_index is not None:
+            self.index_to_id.pop(previous_index, None)
+            self.orphaned_vectors += 1
         
         self.faiss_index.add(embedding_normalized.reshape(1, -1))
         self.id_to_index[doc_id] = faiss_index
         self.index_to_id[faiss_index] = doc_id
+        self.index_version += 1
+        
+        if previous_index is not None:
+            self._compact_index_if_needed()
     
+    def _find_embedding_owner(self, content_hash: str) -> Optional[str]:
+        """Find the document whose stored embedding is shared by chunks with this hash"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT m.id FROM document_memories m
+            JOIN document_embeddings e ON e.id = m.id
+            WHERE m.content_hash = ?
+            LIMIT 1
+        ''', (content_hash,))
+        row = cursor.fetchone()
+        return row['id'] if row else None
+    
+    def _load_embedding(self, doc_id: str) -> Optional[np.ndarray]:
+        """Load a stored embedding by the ID of the document that owns it"""
+        tracing.count("embedding_loads")
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT embedding FROM document_embeddings WHERE id = ?', (doc_id,))
+        row = cursor.fetchone()
+        return np.frombuffer(row['embedding'], dtype=np.float32) if row else None
+    
+    @synchronized
+    def get_embeddings_by_hash(self, content_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Look up stored embeddings for chunk content hashes in bulk"""
+        embeddings = {}
+        unique_hashes = list(dict.fromkeys(content_hashes))
+        cursor = self.conn.cursor()
+        
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[start:start + 500]
+            placeholders = ','.join('?' for _ in batch)
+            cursor.execute(f'''
+                SELECT m.content_hash, e.embedding FROM document_memories m
+                JOIN document_embeddings e ON e.id = m.id
+                WHERE m.content_hash IN ({placeholders})
+            ''', batch)
+            for row in cursor.fetchall():
+                embeddings[row['content_hash']] = np.frombuffer(row['embedding'], dtype=np.float32)
+        
+        return embeddings
+    
+    @synchronized
+    def find_file(self, file_hash: str) -> Optional[List[str]]:
+        """Return the stored chunk IDs of a previously ingested file, if any"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT document_ids FROM document_files WHERE file_hash = ?', (file_hash,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        doc_ids = json.loads(row['document_ids'])
+        placeholders = ','.join('?' for _ in doc_ids)
+        cursor.execute(f'SELECT COUNT(*) FROM document_memories WHERE id IN ({placeholders})', doc_ids)
+        if not doc_ids or cursor.fetchone()[0] != len(doc_ids):
+            # Some chunks were deleted since, so the file has to be ingested again
+            self._execute_logged(cursor, 'DELETE FROM document_files WHERE file_hash = ?', (file_hash,))
+            self._commit()
+            return None
+        
+        return doc_ids
+    
+    @synchronized
+    def register_file(self, file_hash: str, doc_ids: List[str], source_file: str = "", title: str = ""):
+        """Remember which chunks were stored for a file's content"""
+        cursor = self.conn.cursor()
+        self._execute_logged(cursor, '''
+            INSERT OR REPLACE INTO document_files
+            (file_hash, source_file, title, document_ids, timestamp) VALUES (?, ?, ?, ?, ?)
+        ''', (file_hash, source_file, title, json.dumps(doc_ids), datetime.now().isoformat()))
+        self._commit()
+    
+    @synchronized
+    def register_files(self, rows: List[tuple]):
+        """Insert exported document_files rows (file_hash, source_file, title, document_ids, timestamp)"""
+        cursor = self.conn.cursor()
+        for row in rows:
+            self._execute_logged(cursor, '''
+                INSERT OR REPLACE INTO document_files
+                (file_hash, source_file, title, document_ids, timestamp) VALUES (?, ?, ?, ?, ?)
+            ''', row)
+        self._commit()
+    
+    def _compact_index_if_needed(self):
+        """Compact the index once orphaned vectors pass the configured threshold"""
+        threshold = max(self.min_orphans_before_compaction,
+                        int(self.faiss_index.ntotal * self.max_orphan_ratio))
+        if self.orphaned_vectors >= threshold:
+            self.compact_index()
+    
+    @synchronized
+    def compact_index(self):
+        """Rebuild the FAISS index without vectors of deleted or superseded documents"""
+        live_indices = sorted(self.index_to_id)
+        
+        new_index = faiss.IndexFlatIP(self.embedding_dim)
+        if live_indices:
+            # Reuse the already normalized vectors instead of reloading them from SQLite
+            vectors = self.faiss_index.reconstruct_n(0, self.faiss_index.ntotal)
+            new_index.add(np.ascontiguousarray(vectors[live_indices]))
+        
+        index_to_id = {}
+        for new_position, old_position in enumerate(live_indices):
+            index_to_id[new_position] = self.index_to_id[old_position]
+        
+        self.faiss_index = new_index
+        self.index_to_id = index_to_id
+        self.id_to_index = {doc_id: position for position, doc_id in index_to_id.items()}
+        self.orphaned_vectors = 0
+        self.index_version += 1
+        self.index_epoch += 1
+    
+    @synchronized
+    def get_ranking_fields(self, doc_ids: List[str]) -> Dict[str, Union[DocumentMemory, DocumentFields]]:
+        """Filter and rerank fields of stored documents, read in one query per 500 IDs
+        
+        Cached documents are returned as they are. The others are read
+        without their content or embedding and are not cached, so ranking
+        candidates does not load documents that are never returned.
+        """
+        fields = {doc_id: self.document_memories[doc_id] for doc_id in doc_ids if doc_id in self.document_memories}
+        missing = [doc_id for doc_id in doc_ids if doc_id not in fields]
+        cursor = self.conn.cursor()
+        for start in range(0, len(missing), 500):
+            batch = missing[start:start + 500]
+            placeholders = ','.join('?' for _ in batch)
+            cursor.execute(f'''
+                SELECT id, title, source_file, timestamp, document_type, tags, metadata
+                FROM document_memories WHERE id IN ({placeholders})
+            ''', batch)
+            for row in cursor.fetchall():
+                fields[row['id']] = DocumentFields(
+                    id=row['id'],
+                    title=row['title'],
+                    source_file=row['source_file'],
+                    timestamp=datetime.fromisoformat(row['timestamp']),
+                    document_type=row['document_type'],
+                    tags=json.loads(row['tags']) if row['tags'] else [],
+                    metadata=json.loads(row['metadata']) if row['metadata'] else {}
+                )
+        return fields
+    
+    @synchronized
     def retrieve_document(self, doc_id: str) -> Optional[DocumentMemory]:
         """Retrieve a document from memory"""
         # Check in-memory cache first
         if doc_id in self.document_memories:
+            tracing.count("document_cache_hits")
             return self.document_memories[doc_id]
         
-        # Load from database
+        # Load from database; explained searches count these one-by-one loads
+        with tracing.counted("document_loads"):
+            return self._load_document(doc_id)
+    
+    def _load_document(self, doc_id: str) -> Optional[DocumentMemory]:
         cursor = self.conn.cursor()
         cursor.execute('''
             SELECT * FROM document_memories WHERE id = ?
@@ -221,13 +533,13 @@ class DocMemoryCore:
         if not row:
             return None
         
-        # Load embedding from database
-        cursor.execute('SELECT embedding FROM document_embeddings WHERE id = ?', (doc_id,))
-        embedding_row = cursor.fetchone()
-        
-        if embedding_row:
-            embedding = np.frombuffer(embedding_row['embedding'], dtype=np.float32)
-        else:
+        # Load embedding from database, falling back to the one shared by identical chunks
+        embedding = self._load_embedding(doc_id)
+        if embedding is None and row['content_hash']:
+            owner_id = self._find_embedding_owner(row['content_hash'])
+            if owner_id is not None:
+                embedding = self._load_embedding(owner_id)
+        if embedding is None:
             embedding = np.zeros(self.embedding_dim, dtype=np.float32)
         
         # Build document memory object
@@ -243,13 +555,15 @@ class DocMemoryCore:
             relationships=json.loads(row['relationships']) if row['relationships'] else {},
             metadata=json.loads(row['metadata']) if row['metadata'] else {},
             summary=row['summary'],
-            page_numbers=json.loads(row['page_numbers']) if row['page_numbers'] else []
+            page_numbers=json.loads(row['page_numbers']) if row['page_numbers'] else [],
+            content_hash=row['content_hash'] or ""
         )
         
         # Cache in memory
         self.document_memories[doc_id] = doc_memory
         return doc_memory
     
+    @synchronized
     def update_document(self, doc_id: str, **kwargs) -> bool:
         """Update an existing document"""
         doc = self.retrieve_document(doc_id)
@@ -278,25 +592,52 @@ class DocMemoryCore:
         
         return True
     
+    @synchronized
     def delete_document(self, doc_id: str) -> bool:
         """Delete a document from memory system"""
         cursor = self.conn.cursor()
         
+        # Find an identical chunk that should inherit a shared embedding
+        cursor.execute('''
+            SELECT other.id FROM document_memories doc
+            JOIN document_memories other ON other.content_hash = doc.content_hash AND other.id != doc.id
+            WHERE doc.id = ?
+            LIMIT 1
+        ''', (doc_id,))
+        heir = cursor.fetchone()
+        
         # Delete from both tables
-        cursor.execute("DELETE FROM document_memories WHERE id = ?", (doc_id,))
-        cursor.execute("DELETE FROM document_embeddings WHERE id = ?", (doc_id,))
+        self._execute_logged(cursor, "DELETE FROM document_memories WHERE id = ?", (doc_id,))
+        if heir:
+            self._execute_logged(cursor, "UPDATE document_embeddings SET id = ? WHERE id = ?", (heir['id'], doc_id))
+        else:
+            self._execute_logged(cursor, "DELETE FROM document_embeddings WHERE id = ?", (doc_id,))
         
-        self.conn.commit()
+        self._commit()
         
         # Remove from in-memory cache and unsaved changes
         self.document_memories.pop(doc_id, None)
         self.unsaved_changes.pop(doc_id, None)
         
-        # TODO: Update FAISS index and mappings (this is complex with FAISS)
-        # For now, we'll rebuild the index when needed
+        # Hand the shared FAISS vector over to the identical chunk
+        if heir and doc_id in self.id_to_index:
+            faiss_index = self.id_to_index.pop(doc_id)
+            self.id_to_index[heir['id']] = faiss_index
+            self.index_to_id[faiss_index] = heir['id']
+            self.index_version += 1
+            return True
+        
+        # Unmap the FAISS vector; it is dropped at the next index compaction
+        faiss_index = self.id_to_index.pop(doc_id, None)
+        if faiss_index is not None:
+            self.index_to_id.pop(faiss_index, None)
+            self.orphaned_vectors += 1
+            self.index_version += 1
+            self._compact_index_if_needed()
         
         return True
     
+    @synchronized
     def get_all_documents(self) -> List[DocumentMemory]:
         """Get all documents (use with caution - loads all into memory)"""
         cursor = self.conn.cursor()
@@ -310,12 +651,125 @@ class DocMemoryCore:
         
         return docs
     
+    @synchronized
+    def bulk_insert(self, rows: List[tuple], embedding_ids: List[str], embeddings: np.ndarray) -> int:
+        """Insert exported rows in one transaction and add their vectors in one batch
+        
+        rows are document_memories tuples in STORED_COLUMNS order and
+        embeddings the normalized vectors of embedding_ids. Rows whose ID is
+        already stored are skipped. Returns the number of rows inserted.
+        """
+        cursor = self.conn.cursor()
+        ids = [row[0] for row in rows]
+        existing = set()
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            cursor.execute(
+                f"SELECT id FROM document_memories WHERE id IN ({','.join('?' for _ in batch)})", batch
+            )
+            existing.update(row[0] for row in cursor.fetchall())
+        if existing:
+            rows = [row for row in rows if row[0] not in existing]
+            keep = [doc_id not in existing for doc_id in embedding_ids]
+            embedding_ids = [doc_id for doc_id, kept in zip(embedding_ids, keep) if kept]
+            embeddings = embeddings[np.array(keep, dtype=bool)]
+        if not rows:
+            return 0
+        
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        memory_statement = f'''
+            INSERT INTO document_memories ({', '.join(STORED_COLUMNS)})
+            VALUES ({', '.join('?' for _ in STORED_COLUMNS)})
+        '''
+        embedding_statement = "INSERT INTO document_embeddings (id, embedding) VALUES (?, ?)"
+        embedding_rows = [(doc_id, vector.tobytes()) for doc_id, vector in zip(embedding_ids, embeddings)]
+        cursor.executemany(memory_statement, rows)
+        cursor.executemany(embedding_statement, embedding_rows)
+        if self.change_log is not None:
+            self.pending_changes.extend((memory_statement, row) for row in rows)
+            self.pending_changes.extend((embedding_statement, row) for row in embedding_rows)
+        self._commit()
+        
+        start = self.faiss_index.ntotal
+        self.faiss_index.add(embeddings)
+        for position, doc_id in enumerate(embedding_ids, start):
+            self.id_to_index[doc_id] = position
+            self.index_to_id[position] = doc_id
+        self.index_version += 1
+        return len(rows)
+    
+    def iter_rows(self, batch_size: int = 10000, with_embeddings: bool = False,
+                  after_id: str = "") -> Iterator[List[sqlite3.Row]]:
+        """Stream stored rows in ID order, one batch per query
+        
+        Pages by keyset (id > last seen id) rather than OFFSET, so every batch
+        costs the same and the lock is only held while a batch is read.
+        With embeddings, rows carry the stored float32 bytes, or None for
+        chunks that share the embedding of an identical chunk.
+        """
+        if with_embeddings:
+            query = '''
+                SELECT m.*, e.embedding FROM document_memories m
+                LEFT JOIN document_embeddings e ON e.id = m.id
+                WHERE m.id > ? ORDER BY m.id LIMIT ?
+            '''
+        else:
+            query = "SELECT * FROM document_memories WHERE id > ? ORDER BY id LIMIT ?"
+        
+        while True:
+            with self.lock:
+                rows = self.conn.execute(query, (after_id, batch_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1]['id']
+    
+    @synchronized
+    def memory_report(self, sample_size: int = memory_accounting.SAMPLE_SIZE) -> Dict[str, Any]:
+        """Estimated bytes held in memory by each component of the store
+        
+        The ID mappings and the document cache are measured on a sample of
+        sample_size entries, so a report costs about the same at any corpus
+        size and can be polled. bytes_per_chunk covers only the components
+        that grow with the corpus; the SQLite page cache is bounded by its
+        limit instead.
+        """
+        documents = self.get_document_count()
+        index = memory_accounting.index_bytes(self.faiss_index)
+        components = {
+            'faiss_index': index,
+            'id_mappings': {
+                'bytes': memory_accounting.mapping_bytes(self.id_to_index, self.index_to_id, sample_size),
+                'entries': len(self.id_to_index)
+            },
+            # Unbounded: every document retrieved since startup stays cached
+            'document_cache': {
+                'bytes': memory_accounting.sampled_bytes(
+                    iter(self.document_memories.values()), len(self.document_memories), sample_size=sample_size
+                ),
+                'entries': len(self.document_memories)
+            },
+            'sqlite_page_cache': memory_accounting.sqlite_cache(self.conn)
+        }
+        cache = components['document_cache']
+        cache['bytes_per_entry'] = round(cache['bytes'] / cache['entries'], 1) if cache['entries'] else None
+        growing = components['faiss_index']['bytes'] + components['id_mappings']['bytes']
+        return {
+            'documents': documents,
+            'vectors': index['vectors'],
+            'components': components,
+            'total_bytes': sum(component['bytes'] for component in components.values()),
+            'bytes_per_chunk': round(growing / documents, 1) if documents else None
+        }
+    
+    @synchronized
     def get_document_count(self) -> int:
         """Get count of stored documents"""
         cursor = self.conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM document_memories")
         return cursor.fetchone()[0]
     
+    @synchronized
     def close(self):
         """Close database connection"""
         if hasattr(self, 'conn'):
@@ -2,36 +2,20 @@
 DocMemory - Document Processing Pipeline
 Handles various document formats and content extraction
 """
+import csv
+import io
 import os
 import tempfile
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Callable, Optional
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 import hashlib
-
-try:
-    import PyPDF2
-    from pdfminer.high_level import extract_text as pdf_extract_text
-except ImportError:
-    PyPDF2 = None
-    pdf_extract_text = None
-
-try:
-    from docx import Document
-except ImportError:
-    Document = None
-
-try:
-    import pandas as pd
-except ImportError:
-    pd = None
-
-try:
-    from PIL import Image
-    import pytesseract
-except ImportError:
-    Image = None
-    pytesseract = None
+from .embedding_cache import EmbeddingCache, CachedEmbeddingModel
+from .metrics import CHUNKING_SECONDS, EXTRACTION_SECONDS
+from .ocr import OCREngine
 
 @dataclass
 class DocumentChunk:
@@ -54,10 +38,22 @@ class DocumentProcessor:
             '.rtf': self._process_txt,  # Treat RTF as text for simplicity
             '.odt': self._process_txt,  # Treat ODT as text for simplicity
         }
+        for extension in ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.gif', '.webp'):
+            self.supported_formats[extension] = self._process_image
+        
+        # OCR for images and PDF pages with fewer characters of text than this.
+        # The engine and its page cache at ocr_cache_path are created on first use
+        self.ocr_engine = None
+        self.ocr_cache_path = None
+        self.ocr_engine_lock = threading.Lock()
+        self.ocr_min_chars = 20
         
         # Maximum chunk size in characters
         self.max_chunk_size = 1000
         self.chunk_overlap = 100
+        
+        # Token budget for formats chunked by record (CSV row groups)
+        self.max_chunk_tokens = 256
         self.default_title = "Untitled Document"
     
     def process_document(self, file_path: str, title: str = None) -> List[DocumentChunk]:
@@ -72,32 +68,87 @@ class DocumentProcessor:
         if title is None:
             title = file_path.stem
         
-        # Process document based on format
+        # Process document based on format; structured formats return their own chunks
         process_func = self.supported_formats[extension]
-        content = process_func(file_path)
+        with EXTRACTION_SECONDS.time(extension[1:]):
+            content = process_func(file_path)
         
-        # Create chunks from content
-        chunks = self._create_chunks(content, title)
+        if isinstance(content, list):
+            chunks = content
+            total_size = sum(len(chunk.content) for chunk in chunks)
+        else:
+            # Create chunks from content
+            with CHUNKING_SECONDS.time():
+                chunks = self._create_chunks(content, title)
+            total_size = len(content)
         
-        # Add metadata to each chunk
+        # Add metadata to each chunk, keeping format-specific fields
         for i, chunk in enumerate(chunks):
             chunk.metadata = {
                 'source_file': str(file_path),
                 'document_type': extension[1:],  # Remove the dot
                 'chunk_count': len(chunks),
-                'total_size': len(content),
-                'title': title
+                'total_size': total_size,
+                'title': title,
+                'content_hash': self.compute_content_hash(chunk.content),
+                **(chunk.metadata or {})
             }
         
         return chunks
     
+    @staticmethod
+    def compute_content_hash(content: str) -> str:
+        """Fingerprint chunk content so unchanged chunks can be recognised"""
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def compute_file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+        """Fingerprint a file's bytes without loading it into memory at once"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
     def _process_pdf(self, file_path: Path) -> str:
-        """Process PDF files"""
+        """Process PDF files
+        
+        Pages without a usable text layer are rasterized and sent through OCR.
+        """
+        pages = self._extract_pdf_pages(file_path)
+        
+        scanned = [number for number, text in enumerate(pages, 1) if len(text.strip()) < self.ocr_min_chars]
+        if scanned:
+            try:
+                for number, text in self.get_ocr_engine().recognise_pdf_pages(file_path, scanned).items():
+                    pages[number - 1] = text
+            except Exception as e:
+                if len(scanned) == len(pages):
+                    raise Exception(f"PDF has no text layer and OCR failed: {e}")
+                print(f"OCR skipped for {len(scanned)} pages of {file_path}: {e}")
+        
+        return '\n'.join(page.strip() for page in pages if page.strip())
+    
+    def _extract_pdf_pages(self, file_path: Path) -> List[str]:
+        """Text layer of each PDF page"""
+        # Format libraries are imported on first use to keep startup fast
+        try:
+            from pdfminer.high_level import extract_text as pdf_extract_text
+        except ImportError:
+            pdf_extract_text = None
+        try:
+            import PyPDF2
+        except ImportError:
+            PyPDF2 = None
+        
         if pdf_extract_text:
             try:
-                # Try pdfminer first (better text extraction)
+                # Try pdfminer first (better text extraction); pages end with a form feed
                 text = pdf_extract_text(str(file_path))
-                return text.strip()
+                pages = text.split('\f')
+                if len(pages) > 1 and not pages[-1].strip():
+                    pages.pop()
+                return pages
             except Exception:
                 pass
         
@@ -106,19 +157,33 @@ class DocumentProcessor:
             try:
                 with open(file_path, 'rb') as file:
                     reader = PyPDF2.PdfReader(file)
-                    text = ""
-                    for page in reader.pages:
-                        text += page.extract_text() + "\n"
-                    return text.strip()
+                    return [page.extract_text() or "" for page in reader.pages]
             except Exception as e:
                 print(f"Error processing PDF with PyPDF2: {e}")
         
         # If neither library works, raise an error
         raise Exception("Failed to process PDF document. Install PyPDF2 or pdfminer.six.")
     
+    def _process_image(self, file_path: Path) -> str:
+        """Process image files with OCR"""
+        try:
+            with open(file_path, 'rb') as file:
+                return self.get_ocr_engine().recognise([file.read()])[0].strip()
+        except Exception as e:
+            raise Exception(f"Error processing image file: {e}")
+    
+    def get_ocr_engine(self) -> OCREngine:
+        """OCR engine used for scanned pages, created on first use"""
+        with self.ocr_engine_lock:
+            if self.ocr_engine is None:
+                self.ocr_engine = OCREngine(self.ocr_cache_path)
+            return self.ocr_engine
+    
     def _process_docx(self, file_path: Path) -> str:
         """Process DOCX files"""
-        if Document is None:
+        try:
+            from docx import Document
+        except ImportError:
             raise Exception("docx library not available. Install python-docx to process DOCX files.")
         
         try:
@@ -146,19 +211,79 @@ class DocumentProcessor:
         except Exception as e:
             raise Exception(f"Error processing text file: {e}")
     
-    def _process_csv(self, file_path: Path) -> str:
-        """Process CSV files"""
-        if pd is None:
-            raise Exception("pandas library not available. Install pandas to process CSV files.")
+    def _process_csv(self, file_path: Path) -> List[DocumentChunk]:
+        """Process CSV files into row-group chunks
         
+        Rows are streamed with the csv module and grouped until the token
+        budget is reached. Every chunk repeats the header line and records the
+        1-based data row range it covers, and rows are never split. Rows are
+        written back as standard CSV, so cells holding commas or quotes stay
+        quoted, and blank rows are skipped but still counted in the ranges.
+        """
         try:
-            df = pd.read_csv(file_path)
-            # Convert to string representation
-            text = df.to_string(index=False)
-            return text.strip()
+            with open(file_path, 'r', encoding='utf-8-sig', errors='replace', newline='') as file:
+                sample = file.read(64 * 1024)
+                file.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample) if sample else csv.excel
+                except csv.Error:
+                    dialect = csv.excel
+                
+                buffer = io.StringIO()
+                writer = csv.writer(buffer, lineterminator='')
+                
+                def serialize(row: List[str]) -> str:
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerow([cell.strip() for cell in row])
+                    return buffer.getvalue()
+                
+                reader = csv.reader(file, dialect)
+                header = next(reader, None)
+                if header is None:
+                    return []
+                header_line = serialize(header)
+                header_tokens = self.estimate_tokens(header_line)
+                
+                chunks = []
+                lines = []
+                tokens = header_tokens
+                row_start = row_end = 0
+                
+                def flush():
+                    chunks.append(DocumentChunk(
+                        content='\n'.join([header_line, *lines]),
+                        page_number=1,
+                        chunk_index=len(chunks),
+                        metadata={'row_start': row_start, 'row_end': row_end}
+                    ))
+                
+                for row_number, row in enumerate(reader, 1):
+                    if not any(cell.strip() for cell in row):
+                        continue
+                    line = serialize(row)
+                    line_tokens = self.estimate_tokens(line)
+                    if lines and tokens + line_tokens > self.max_chunk_tokens:
+                        flush()
+                        lines = []
+                        tokens = header_tokens
+                    if not lines:
+                        row_start = row_number
+                    lines.append(line)
+                    tokens += line_tokens
+                    row_end = row_number
+                
+                if lines:
+                    flush()
+                return chunks
         except Exception as e:
             raise Exception(f"Error processing CSV file: {e}")
     
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token count for subword tokenizers (about four characters per token)"""
+        return max(1, len(text) // 4)
+    
     def _process_html(self, file_path: Path) -> str:
         """Process HTML files"""
         try:
@@ -211,6 +336,9 @@ class DocumentProcessor:
                 # If no good breaking point found, use the overlap point
                 if break_point == end:
                     break_point = max(search_start, start + 50)  # Ensure minimum chunk size
+            else:
+                # Last chunk takes the rest of the content
+                break_point = len(content)
             
             chunk_content = content[start:break_point].strip()
             if chunk_content:  # Only add non-empty chunks
@@ -232,37 +360,104 @@ class DocumentIngestionPipeline:
         self.docmemory_system = docmemory_system
         self.processor = DocumentProcessor()
         
+        # Recognised page text is cached next to the document database
+        self.processor.ocr_cache_path = docmemory_system.core_memory.storage_path / "ocr_cache.db"
+        
         # Embedding model placeholder (will be set externally)
         self.embedding_model = None
+        self.embedding_cache = None
     
-    def set_embedding_model(self, model):
-        """Set the embedding model for processing"""
-        self.embedding_model = model
+    def set_embedding_model(self, model, model_name: str = None, use_cache: bool = True):
+        """Set the embedding model for processing
+        
+        The model is wrapped in a persistent embedding cache stored next to the
+        document database, so text that was embedded before is never re-encoded.
+        """
+        if not use_cache:
+            self.embedding_model = model
+            return
+        
+        if self.embedding_cache is None:
+            cache_path = self.docmemory_system.core_memory.storage_path / "embedding_cache.db"
+            self.embedding_cache = EmbeddingCache(cache_path)
+        self.embedding_model = CachedEmbeddingModel(model, self.embedding_cache, model_name)
     
     def process_and_store_document(self, 
                                    file_path: str, 
                                    title: str = None,
                                    tags: List[str] = None,
-                                   custom_metadata: Dict[str, Any] = None) -> List[str]:
-        """Process a document and store it in DocMemory"""
+                                   custom_metadata: Dict[str, Any] = None,
+                                   file_hash: str = None,
+                                   progress_callback: Optional[Callable[[int, int], None]] = None) -> List[str]:
+        """Process a document and store it in DocMemory
+        
+        A file whose content was ingested before returns the existing chunk IDs
+        without extraction or embedding. progress_callback, if given, is called
+        with (chunks_stored, chunks_total) as chunks are stored.
+        """
         if self.embedding_model is None:
             raise ValueError("Embedding model must be set before processing documents")
         
+        core_memory = self.docmemory_system.core_memory
+        file_hash = file_hash or self.processor.compute_file_hash(file_path)
+        existing_ids = core_memory.find_file(file_hash)
+        if existing_ids is not None:
+            print(f"Skipped {file_path}: identical content already stored as {len(existing_ids)} chunks")
+            return existing_ids
+        
         # Process the document
         chunks = self.processor.process_document(file_path, title)
         
         # Store each chunk as a separate memory
-        stored_ids = []
+        stored_ids = self._store_chunks(chunks, tags, custom_metadata, progress_callback)
+        core_memory.register_file(file_hash, stored_ids, str(file_path), title or Path(file_path).stem)
         
-        for chunk in chunks:
-            # Generate embedding for the chunk content
-            embedding = self.embedding_model.encode([chunk.content])[0]
-            
-            # Create metadata combining document metadata and chunk info
-            metadata = {**chunk.metadata}
-            if custom_metadata:
-                metadata.update(custom_metadata)
-            
+        print(f"Successfully processed and stored {len(stored_ids)} document chunks from {file_path}")
+        return stored_ids
+    
+    def _embed_chunks(self, chunks: List[DocumentChunk]) -> List[Any]:
+        """Generate embeddings for several chunks with a single encode call
+        
+        Chunks whose content is already stored reuse that embedding, and
+        identical chunks within the batch are encoded only once.
+        """
+        if not chunks:
+            return []
+        
+        hashes = [chunk.metadata['content_hash'] for chunk in chunks]
+        embeddings_by_hash = self.docmemory_system.core_memory.get_embeddings_by_hash(hashes)
+        
+        missing = {}
+        for content_hash, chunk in zip(hashes, chunks):
+            if content_hash not in embeddings_by_hash:
+                missing.setdefault(content_hash, chunk.content)
+        
+        if missing:
+            encoded = self.embedding_model.encode(list(missing.values()))
+            embeddings_by_hash.update(zip(missing.keys(), encoded))
+        
+        return [embeddings_by_hash[content_hash] for content_hash in hashes]
+    
+    def _chunk_metadata(self, chunk: DocumentChunk, custom_metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Combine document metadata and chunk info"""
+        metadata = {**chunk.metadata}
+        if custom_metadata:
+            metadata.update(custom_metadata)
+        return metadata
+    
+    def _store_chunks(self, 
+                      chunks: List[DocumentChunk],
+                      tags: List[str] = None,
+                      custom_metadata: Dict[str, Any] = None,
+                      progress_callback: Optional[Callable[[int, int], None]] = None) -> List[str]:
+        """Embed chunks and store each one as a separate memory"""
+        if progress_callback:
+            progress_callback(0, len(chunks))
+        
+        embeddings = self._embed_chunks(chunks)
+        
+        stored_ids = []
+        for chunk, embedding in zip(chunks, embeddings):
             # Store in DocMemory
             doc_id = self.docmemory_system.add_document(
                 content=chunk.content,
@@ -271,38 +466,103 @@ class DocumentIngestionPipeline:
                 embedding=embedding,
                 document_type=chunk.metadata['document_type'],
                 tags=tags or [],
-                metadata=metadata,
+                metadata=self._chunk_metadata(chunk, custom_metadata),
                 summary="",  # Will be generated later if needed
-                page_numbers=[chunk.page_number]
+                page_numbers=[chunk.page_number],
+                content_hash=chunk.metadata['content_hash']
             )
             
             stored_ids.append(doc_id)
+            if progress_callback:
+                progress_callback(len(stored_ids), len(chunks))
         
-        print(f"Successfully processed and stored {len(stored_ids)} document chunks from {file_path}")
         return stored_ids
     
     def batch_process_documents(self, 
                                 file_paths: List[str],
                                 tags_by_file: Dict[str, List[str]] = None,
-                                metadata_by_file: Dict[str, Dict[str, Any]] = None) -> Dict[str, List[str]]:
-        """Process multiple documents at once"""
+                                metadata_by_file: Dict[str, Dict[str, Any]] = None,
+                                titles_by_file: Dict[str, str] = None,
+                                hashes_by_file: Dict[str, str] = None,
+                                max_workers: int = 4,
+                                progress_callback: Optional[Callable[[int, int], None]] = None,
+                                file_callback: Optional[Callable[[str, List[str], Optional[str]], None]] = None) -> Dict[str, List[str]]:
+        """Process multiple documents at once
+        
+        Files are fingerprinted first so content that is already stored, or
+        repeated within the batch, is never extracted twice. Extraction and
+        chunking run on a pool of max_workers threads while the calling thread
+        embeds and stores each file as soon as it is ready. progress_callback
+        receives (chunks_stored, chunks_total) across the whole batch and
+        file_callback receives (file_path, document_ids, error) per file.
+        """
+        if self.embedding_model is None:
+            raise ValueError("Embedding model must be set before processing documents")
+        
+        core_memory = self.docmemory_system.core_memory
         results = {}
+        errors = {}
+        progress = {'stored': 0, 'total': 0}
         
+        def finish(file_path: str, stored_ids: List[str], error: str = None):
+            results[file_path] = stored_ids
+            if error:
+                errors[file_path] = error
+            if file_callback:
+                file_callback(file_path, stored_ids, error)
+        
+        # Fingerprint files and drop content that is already stored or repeated
+        pending = {}
+        repeated = []
         for file_path in file_paths:
             try:
-                tags = tags_by_file.get(file_path) if tags_by_file else None
-                metadata = metadata_by_file.get(file_path) if metadata_by_file else None
-                
-                stored_ids = self.process_and_store_document(
-                    file_path=file_path,
-                    tags=tags,
-                    custom_metadata=metadata
-                )
-                
-                results[file_path] = stored_ids
+                file_hash = (hashes_by_file or {}).get(file_path) or self.processor.compute_file_hash(file_path)
             except Exception as e:
                 print(f"Error processing {file_path}: {e}")
-                results[file_path] = []
+                finish(file_path, [], str(e))
+                continue
+            
+            existing_ids = core_memory.find_file(file_hash)
+            if existing_ids is not None:
+                finish(file_path, existing_ids)
+            elif file_hash in pending:
+                repeated.append((file_path, file_hash))
+            else:
+                pending[file_hash] = file_path
+        
+        def report(stored: int, total: int):
+            if progress_callback:
+                progress_callback(progress['stored'] + stored, progress['total'] + total)
+        
+        # Extract in parallel, embed and store in completion order
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                executor.submit(self.processor.process_document, file_path,
+                                (titles_by_file or {}).get(file_path)): (file_hash, file_path)
+                for file_hash, file_path in pending.items()
+            }
+            for future in as_completed(futures):
+                file_hash, file_path = futures[future]
+                try:
+                    chunks = future.result()
+                    stored_ids = self._store_chunks(
+                        chunks,
+                        (tags_by_file or {}).get(file_path),
+                        (metadata_by_file or {}).get(file_path),
+                        report
+                    )
+                    title = (titles_by_file or {}).get(file_path) or Path(file_path).stem
+                    core_memory.register_file(file_hash, stored_ids, str(file_path), title)
+                    progress['stored'] += len(stored_ids)
+                    progress['total'] += len(stored_ids)
+                    finish(file_path, stored_ids)
+                except Exception as e:
+                    print(f"Error processing {file_path}: {e}")
+                    finish(file_path, [], str(e))
+        
+        # Files repeated within the batch share the first copy's chunks
+        for file_path, file_hash in repeated:
+            finish(file_path, results[pending[file_hash]], errors.get(pending[file_hash]))
         
         return results
     
@@ -310,29 +570,87 @@ class DocumentIngestionPipeline:
                         file_path: str,
                         doc_ids: List[str],
                         new_title: str = None,
-                        new_tags: List[str] = None) -> bool:
-        """Update an existing document with new content"""
+                        new_tags: List[str] = None) -> Dict[str, Any]:
+        """Update an existing document with new content
+        
+        Chunks are matched against the stored ones by content hash: unchanged
+        chunks keep their IDs and embeddings, only new or edited chunks are
+        embedded, and chunks that no longer appear in the file are deleted.
+        """
+        core_memory = self.docmemory_system.core_memory
         try:
+            if self.embedding_model is None:
+                raise ValueError("Embedding model must be set before processing documents")
+            
+            # Index the currently stored chunks by content hash
+            old_docs = [doc for doc in (core_memory.retrieve_document(doc_id) for doc_id in doc_ids) if doc]
+            old_by_hash = defaultdict(deque)
+            for doc in old_docs:
+                content_hash = doc.metadata.get('content_hash') or self.processor.compute_content_hash(doc.content)
+                old_by_hash[content_hash].append(doc)
+            
+            # Keep the existing title and tags unless new ones are given
+            if new_title is None and old_docs:
+                new_title = old_docs[0].title
+            if new_tags is None and old_docs:
+                new_tags = old_docs[0].tags
+            
             # Process the updated document
             chunks = self.processor.process_document(file_path, new_title)
             
-            # For now, we'll delete old chunks and add new ones
-            # In a more sophisticated system, we might want to match and update specific chunks
-            for doc_id in doc_ids:
-                self.docmemory_system.core_memory.delete_document(doc_id)
+            # Match new chunks against stored ones (duplicates are matched one to one)
+            kept = {}
+            new_chunks = []
+            for position, chunk in enumerate(chunks):
+                candidates = old_by_hash.get(chunk.metadata['content_hash'])
+                if candidates:
+                    kept[position] = candidates.popleft()
+                else:
+                    new_chunks.append(chunk)
             
-            # Process and store the new content
-            new_doc_ids = self.process_and_store_document(
-                file_path=file_path,
-                title=new_title,
-                tags=new_tags
-            )
+            # Refresh metadata of unchanged chunks without touching their embeddings
+            for position, doc in kept.items():
+                chunk = chunks[position]
+                core_memory.update_document(
+                    doc.id,
+                    title=chunk.metadata.get('title', doc.title),
+                    tags=new_tags or [],
+                    metadata={**doc.metadata, **chunk.metadata},
+                    page_numbers=[chunk.page_number]
+                )
             
-            print(f"Successfully updated document: {file_path}")
-            return True
+            # Embed and store only the chunks that changed or are new
+            added_ids = iter(self._store_chunks(new_chunks, new_tags))
+            
+            # Delete chunks that are no longer part of the document
+            removed_ids = [doc.id for remaining in old_by_hash.values() for doc in remaining]
+            for doc_id in removed_ids:
+                core_memory.delete_document(doc_id)
+            
+            document_ids = [kept[position].id if position in kept else next(added_ids)
+                            for position in range(len(chunks))]
+            core_memory.register_file(self.processor.compute_file_hash(file_path), document_ids,
+                                      str(file_path), new_title or Path(file_path).stem)
+            
+            print(f"Successfully updated document: {file_path} "
+                  f"({len(new_chunks)} added, {len(kept)} kept, {len(removed_ids)} removed)")
+            return {
+                'success': True,
+                'document_ids': document_ids,
+                'added': len(new_chunks),
+                'kept': len(kept),
+                'removed': len(removed_ids)
+            }
         except Exception as e:
             print(f"Error updating document {file_path}: {e}")
-            return False
+            return {
+                'success': False,
+                'error': str(e),
+                'document_ids': list(doc_ids),
+                'added': 0,
+                'kept': 0,
+                'removed': 0
+            }
 
 # Example usage
 if __name__ == "__main__":
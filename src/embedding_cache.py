@@ -0,0 +1,186 @@
+"""
+DocMemory - Embedding Cache
+Persistent on-disk cache of embeddings keyed by (model, text hash)
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+class EmbeddingCache:
+    """SQLite-backed store of embeddings with size-bounded LRU eviction
+    
+    Reads only note when an entry was used; the last_used updates are
+    written in one transaction once flush_every entries are pending or
+    flush_interval seconds have passed, before an eviction, and on close.
+    """
+    
+    def __init__(self, db_path: str, max_entries: int = 500_000,
+                 flush_every: int = 1000, flush_interval: float = 30.0):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used
+            ON embedding_cache (last_used)
+        ''')
+        self.conn.commit()
+        
+        # Monotonic access clock used for LRU ordering
+        row = self.conn.execute("SELECT MAX(last_used) FROM embedding_cache").fetchone()
+        self.clock = row[0] or 0
+        self.entry_count = self.conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        
+        # (model, text hash) -> access clock of reads not yet written
+        self.pending_uses: Dict[Tuple[str, str], int] = {}
+        self.last_flush = time.monotonic()
+    
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Cache key for a piece of text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def get_many(self, model: str, text_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached embeddings for the given hashes, marking them as recently used"""
+        found = {}
+        unique_hashes = list(dict.fromkeys(text_hashes))
+        
+        with self.lock:
+            self.clock += 1
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[start:start + 500]
+                placeholders = ','.join('?' for _ in batch)
+                rows = self.conn.execute(f'''
+                    SELECT text_hash, embedding FROM embedding_cache
+                    WHERE model = ? AND text_hash IN ({placeholders})
+                ''', [model, *batch]).fetchall()
+                for text_hash, embedding in rows:
+                    found[text_hash] = np.frombuffer(embedding, dtype=np.float32)
+            
+            for text_hash in found:
+                self.pending_uses[(model, text_hash)] = self.clock
+            if (len(self.pending_uses) >= self.flush_every
+                    or time.monotonic() - self.last_flush >= self.flush_interval):
+                self._flush_uses()
+                self.conn.commit()
+        
+        return found
+    
+    def _flush_uses(self):
+        """Write pending last_used updates; the caller holds the lock and commits"""
+        if self.pending_uses:
+            self.conn.executemany(
+                "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(clock, model, text_hash) for (model, text_hash), clock in self.pending_uses.items()]
+            )
+            self.pending_uses = {}
+        self.last_flush = time.monotonic()
+    
+    def flush(self):
+        """Write pending last_used updates now"""
+        with self.lock:
+            self._flush_uses()
+            self.conn.commit()
+    
+    def put_many(self, model: str, embeddings: Dict[str, np.ndarray]):
+        """Store embeddings and evict the least recently used ones beyond max_entries"""
+        if not embeddings:
+            return
+        
+        with self.lock:
+            self.clock += 1
+            before = self.conn.total_changes
+            self.conn.executemany('''
+                INSERT OR IGNORE INTO embedding_cache (model, text_hash, embedding, last_used)
+                VALUES (?, ?, ?, ?)
+            ''', [(model, text_hash, np.asarray(embedding, dtype=np.float32).tobytes(), self.clock)
+                  for text_hash, embedding in embeddings.items()])
+            self.entry_count += self.conn.total_changes - before
+            
+            if self.entry_count > self.max_entries:
+                # Evict by up-to-date recency
+                self._flush_uses()
+                self._evict(self.entry_count - self.max_entries)
+            self.conn.commit()
+    
+    def _evict(self, count: int):
+        """Drop the least recently used entries"""
+        self.conn.execute('''
+            DELETE FROM embedding_cache WHERE rowid IN (
+                SELECT rowid FROM embedding_cache ORDER BY last_used ASC LIMIT ?
+            )
+        ''', (count,))
+        self.entry_count -= count
+    
+    def __len__(self) -> int:
+        return self.entry_count
+    
+    def close(self):
+        """Write pending updates and close the cache database"""
+        with self.lock:
+            self._flush_uses()
+            self.conn.commit()
+            self.conn.close()
+
+class CachedEmbeddingModel:
+    """Wraps an embedding model so repeated texts are served from the cache"""
+    
+    def __init__(self, model, cache: EmbeddingCache, model_name: Optional[str] = None):
+        self.model = model
+        self.cache = cache
+        self.model_name = model_name or getattr(model, 'model_name', None) or type(model).__name__
+        self.hits = 0
+        self.misses = 0
+    
+    def encode(self, sentences: List[str], **kwargs) -> np.ndarray:
+        """Encode sentences, calling the wrapped model only for cache misses"""
+        sentences = list(sentences)
+        hashes = [self.cache.hash_text(sentence) for sentence in sentences]
+        embeddings = self.cache.get_many(self.model_name, hashes)
+        
+        missing = {}
+        for text_hash, sentence in zip(hashes, sentences):
+            if text_hash in embeddings:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing.setdefault(text_hash, sentence)
+        
+        if missing:
+            # One batched encode call for everything that was not cached
+            encoded = np.asarray(self.model.encode(list(missing.values()), **kwargs), dtype=np.float32)
+            new_embeddings = dict(zip(missing.keys(), encoded))
+            self.cache.put_many(self.model_name, new_embeddings)
+            embeddings.update(new_embeddings)
+        
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([embeddings[text_hash] for text_hash in hashes])
+    
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of encoded texts served from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def __getattr__(self, name):
+        # Expose attributes of the wrapped model (e.g. embedding dimension)
+        return getattr(self.model, name)
@@ -0,0 +1,191 @@
+"""
+DocMemory - Embedding Scheduler
+Dynamic micro-batching of embedding requests shared across callers
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+import numpy as np
+from .metrics import EMBEDDING_BATCH_SECONDS, EMBEDDING_BATCH_SIZE
+
+# Priority lanes, drained in this order
+PRIORITY_INTERACTIVE = 0  # search queries
+PRIORITY_BULK = 1         # document ingestion
+
+@dataclass
+class _EmbeddingRequest:
+    """One caller's encode request, possibly split into several pieces"""
+    future: Future
+    size: int
+    remaining: int
+    results: Dict[int, np.ndarray] = field(default_factory=dict)
+
+@dataclass
+class _Piece:
+    """A slice of a request that fits into a single batch"""
+    request: _EmbeddingRequest
+    offset: int
+    texts: List[str]
+    enqueued_at: float
+
+class EmbeddingScheduler:
+    """Collects encode requests for a few milliseconds and runs them as one batch
+    
+    Requests are queued per priority lane. A single worker thread waits until
+    max_batch_size texts are pending or the oldest one has waited max_wait_ms,
+    fills the batch from the interactive lane first, calls the model once and
+    resolves each caller's future with its slice of the result. Large bulk
+    requests are split into batch-sized pieces so interactive queries can be
+    scheduled in between them.
+    """
+    
+    def __init__(self, model, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 encode_kwargs: Dict[str, Any] = None):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.encode_kwargs = encode_kwargs or {}
+        
+        self.lanes = {PRIORITY_INTERACTIVE: deque(), PRIORITY_BULK: deque()}
+        self.pending_texts = 0
+        self.condition = threading.Condition()
+        self.running = True
+        
+        # Statistics
+        self.batches_run = 0
+        self.texts_encoded = 0
+        
+        self.worker = threading.Thread(target=self._worker_loop, name="embedding-scheduler", daemon=True)
+        self.worker.start()
+    
+    def submit(self, sentences: List[str], priority: int = PRIORITY_BULK) -> Future:
+        """Queue texts for embedding and return a future resolving to their vectors"""
+        sentences = list(sentences)
+        future = Future()
+        if not sentences:
+            future.set_result(np.zeros((0, 0), dtype=np.float32))
+            return future
+        
+        request = _EmbeddingRequest(future=future, size=len(sentences), remaining=0)
+        now = time.monotonic()
+        pieces = [
+            _Piece(request, offset, sentences[offset:offset + self.max_batch_size], now)
+            for offset in range(0, len(sentences), self.max_batch_size)
+        ]
+        request.remaining = len(pieces)
+        
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("Embedding scheduler has been shut down")
+            self.lanes[priority].extend(pieces)
+            self.pending_texts += len(sentences)
+            self.condition.notify()
+        
+        return future
+    
+    def encode(self, sentences: List[str], priority: int = PRIORITY_INTERACTIVE, **kwargs) -> np.ndarray:
+        """Blocking encode through the shared batcher"""
+        return self.submit(sentences, priority).result()
+    
+    async def encode_async(self, sentences: List[str], priority: int = PRIORITY_INTERACTIVE) -> np.ndarray:
+        """Awaitable encode through the shared batcher"""
+        return await asyncio.wrap_future(self.submit(sentences, priority))
+    
+    def lane(self, priority: int) -> 'EmbeddingLane':
+        """Model-like view that submits every encode call at a fixed priority"""
+        return EmbeddingLane(self, priority)
+    
+    def queue_depths(self) -> Dict[str, int]:
+        """Number of texts waiting in each lane"""
+        with self.condition:
+            return {
+                'interactive': sum(len(piece.texts) for piece in self.lanes[PRIORITY_INTERACTIVE]),
+                'bulk': sum(len(piece.texts) for piece in self.lanes[PRIORITY_BULK])
+            }
+    
+    def _take_batch(self) -> List[_Piece]:
+        """Pop pieces for the next batch, interactive lane first"""
+        batch = []
+        batch_size = 0
+        for priority in (PRIORITY_INTERACTIVE, PRIORITY_BULK):
+            lane = self.lanes[priority]
+            while lane and batch_size + len(lane[0].texts) <= self.max_batch_size:
+                piece = lane.popleft()
+                batch.append(piece)
+                batch_size += len(piece.texts)
+        self.pending_texts -= batch_size
+        return batch
+    
+    def _worker_loop(self):
+        """Form batches and run them until shut down"""
+        while True:
+            with self.condition:
+                while self.running and self.pending_texts == 0:
+                    self.condition.wait()
+                if not self.running and self.pending_texts == 0:
+                    return
+                
+                # Wait for a full batch or until the oldest piece has waited long enough
+                oldest = min(lane[0].enqueued_at for lane in self.lanes.values() if lane)
+                deadline = oldest + self.max_wait
+                while self.running and self.pending_texts < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                
+                batch = self._take_batch()
+            
+            self._run_batch(batch)
+    
+    def _run_batch(self, batch: List[_Piece]):
+        """Encode one batch and fan the results back to the callers"""
+        texts = [text for piece in batch for text in piece.texts]
+        EMBEDDING_BATCH_SIZE.observe(len(texts))
+        try:
+            with EMBEDDING_BATCH_SECONDS.time():
+                embeddings = np.asarray(self.model.encode(texts, **self.encode_kwargs), dtype=np.float32)
+        except Exception as e:
+            for piece in batch:
+                if not piece.request.future.done():
+                    piece.request.future.set_exception(e)
+            return
+        
+        self.batches_run += 1
+        self.texts_encoded += len(texts)
+        
+        position = 0
+        for piece in batch:
+            request = piece.request
+            request.results[piece.offset] = embeddings[position:position + len(piece.texts)]
+            position += len(piece.texts)
+            request.remaining -= 1
+            if request.remaining == 0 and not request.future.done():
+                ordered = [request.results[offset] for offset in sorted(request.results)]
+                request.future.set_result(np.concatenate(ordered))
+    
+    def shutdown(self):
+        """Finish queued work and stop the worker thread"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.worker.join(timeout=5)
+
+class EmbeddingLane:
+    """Embedding model interface bound to one scheduler priority"""
+    
+    def __init__(self, scheduler: EmbeddingScheduler, priority: int):
+        self.scheduler = scheduler
+        self.priority = priority
+    
+    def encode(self, sentences: List[str], **kwargs) -> np.ndarray:
+        """Encode through the scheduler at this lane's priority"""
+        return self.scheduler.submit(sentences, self.priority).result()
+    
+    def __getattr__(self, name):
+        # Expose attributes of the underlying model (e.g. embedding dimension)
+        return getattr(self.scheduler.model, name)
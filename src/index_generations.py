@@ -0,0 +1,410 @@
+"""
+DocMemory - Index Generations
+Published snapshots of the vector index shared by search worker processes
+"""
+import bisect
+import itertools
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+CURRENT_FILE = "CURRENT"
+
+# Serving roles: one process does everything, or one writer publishes
+# generations that several read-only search workers map
+ROLE_STANDALONE = "standalone"
+ROLE_WRITER = "writer"
+ROLE_READER = "reader"
+SERVING_ROLES = (ROLE_STANDALONE, ROLE_WRITER, ROLE_READER)
+
+def generation_name(generation: int) -> str:
+    return f"gen-{generation:08d}"
+
+def read_current(directory: Path) -> Optional[Dict]:
+    """Manifest of the latest published generation, if any"""
+    try:
+        with open(Path(directory) / CURRENT_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+class MappedIndex:
+    """Exact inner-product index over read-only memory-mapped vector segments
+    
+    Mirrors the parts of faiss.IndexFlatIP used by the search engine (ntotal,
+    search, reconstruct, reconstruct_n), so it can stand in for the in-memory
+    index. Positions run through the segments in order. The matrices are
+    never copied: every process mapping the same segment file shares its
+    pages through the OS page cache.
+    """
+    
+    def __init__(self, segments, dim: Optional[int] = None):
+        if isinstance(segments, np.ndarray):
+            segments = [segments]
+        self.segments: List[np.ndarray] = list(segments)
+        self.d = dim if dim is not None else self.segments[0].shape[1]
+        # Position of the first row of each segment
+        self.offsets = [0]
+        for segment in self.segments:
+            self.offsets.append(self.offsets[-1] + segment.shape[0])
+    
+    @property
+    def ntotal(self) -> int:
+        return self.offsets[-1]
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(segment.nbytes for segment in self.segments)
+    
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k scores and row positions per query, padded with -1 like FAISS"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.d)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        count = min(k, self.ntotal)
+        if count == 0:
+            return scores, indices
+        
+        # Top k of each segment, then the top k of those candidates
+        candidate_scores, candidate_indices = [], []
+        for offset, segment in zip(self.offsets, self.segments):
+            segment_count = min(count, segment.shape[0])
+            if segment_count == 0:
+                continue
+            similarities = queries @ segment.T
+            top = np.argpartition(-similarities, segment_count - 1, axis=1)[:, :segment_count]
+            candidate_scores.append(np.take_along_axis(similarities, top, axis=1))
+            candidate_indices.append(top + offset)
+        similarities = np.concatenate(candidate_scores, axis=1)
+        positions = np.concatenate(candidate_indices, axis=1)
+        
+        top = np.argpartition(-similarities, count - 1, axis=1)[:, :count]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        indices[:, :count] = np.take_along_axis(np.take_along_axis(positions, top, axis=1), order, axis=1)
+        scores[:, :count] = np.take_along_axis(top_scores, order, axis=1)
+        return scores, indices
+    
+    def reconstruct(self, position: int) -> np.ndarray:
+        segment = bisect.bisect_right(self.offsets, position) - 1
+        return np.array(self.segments[segment][position - self.offsets[segment]])
+    
+    def reconstruct_n(self, start: int, count: int) -> np.ndarray:
+        end = min(start + count, self.ntotal)
+        parts = []
+        for offset, segment in zip(self.offsets, self.segments):
+            low, high = max(start, offset), min(end, offset + segment.shape[0])
+            if low < high:
+                parts.append(segment[low - offset:high - offset])
+        if not parts:
+            return np.zeros((0, self.d), dtype=np.float32)
+        return np.concatenate(parts)
+
+def write_atomic(path: Path, write):
+    """Write a file under a temporary name and rename it into place"""
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, 'wb') as f:
+        write(f)
+    os.replace(temporary, path)
+
+class IndexPublisher:
+    """Writes generations of the writer's vector index for search workers
+    
+    A generation is a list of immutable segments, each a .npy matrix of
+    consecutive index rows next to a JSON list of their document IDs, plus
+    the positions whose document changed since their segment was written.
+    Publishing only writes the rows appended since the last generation, and
+    copies them under the core lock at most copy_batch rows at a time, so
+    ingestion never waits on a copy of the whole index. Segments are merged
+    when the newest grows to half its predecessor, which keeps their number
+    logarithmic in the index size; a compaction renumbers every row and
+    starts a fresh set of segments.
+    
+    Files are written under temporary names and renamed into place before
+    the CURRENT manifest is atomically replaced, so a reader never sees a
+    partial generation. Files of the last keep generations stay on disk; an
+    older file that a reader still has mapped remains readable until it is
+    unmapped.
+    """
+    
+    def __init__(self, core_memory, directory: str, interval: float = 1.0, keep: int = 3,
+                 copy_batch: int = 65536):
+        self.core_memory = core_memory
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self.keep = keep
+        self.copy_batch = copy_batch
+        
+        current = read_current(self.directory)
+        self.generation = current['generation'] if current else 0
+        self.published_version = None
+        
+        # Segments of the published rows and the IDs the readers resolve them
+        # to. Rebuilt from scratch by this process's first publish
+        self.epoch = None
+        self.segments: List[Dict] = []
+        self.published_ids: Dict[int, str] = {}
+        self.published_rows = 0
+        # Files referenced by each of the last keep generations
+        self.history: List[set] = []
+        
+        self.running = False
+        self.wakeup = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+    
+    def _snapshot(self) -> Optional[Tuple[int, int, int, Dict[int, str], Optional[np.ndarray]]]:
+        """Index version, epoch, row count, ID map and the rows not yet published
+        
+        The ID map is copied under the core lock; the new rows follow in
+        copy_batch slices, each under its own acquisition. Rows below the
+        recorded count never change within an epoch, so the slices stay
+        consistent with the map. Returns None if a compaction renumbered the
+        rows meanwhile; the next publish starts over.
+        """
+        core_memory = self.core_memory
+        with core_memory.lock:
+            version = core_memory.index_version
+            epoch = core_memory.index_epoch
+            rows = core_memory.faiss_index.ntotal
+            index_to_id = dict(core_memory.index_to_id)
+        
+        start = self.published_rows if epoch == self.epoch else 0
+        if start == rows:
+            return version, epoch, rows, index_to_id, None
+        
+        vectors = np.empty((rows - start, core_memory.embedding_dim), dtype=np.float32)
+        for low in range(start, rows, self.copy_batch):
+            count = min(self.copy_batch, rows - low)
+            with core_memory.lock:
+                if core_memory.index_epoch != epoch:
+                    return None
+                vectors[low - start:low - start + count] = core_memory.faiss_index.reconstruct_n(low, count)
+        return version, epoch, rows, index_to_id, vectors
+    
+    def _write_segment(self, name: str, start: int, vectors: np.ndarray, ids: List[Optional[str]]) -> Dict:
+        write_atomic(self.directory / f"{name}.npy", lambda f: np.save(f, vectors))
+        write_atomic(self.directory / f"{name}.ids.json", lambda f: f.write(json.dumps(ids).encode()))
+        return {'name': name, 'start': start, 'count': len(ids)}
+    
+    def _merge_tail(self, name: str, index_to_id: Dict[int, str]):
+        """Merge the newest segments while the last is at least half the one before
+        
+        The merged segment takes the current IDs of its rows, so positions
+        deleted or reassigned since their segment was written stop needing
+        an override.
+        """
+        merges = 0
+        while len(self.segments) >= 2 and self.segments[-2]['count'] <= 2 * self.segments[-1]['count']:
+            first, second = self.segments[-2], self.segments[-1]
+            vectors = np.concatenate([
+                np.load(self.directory / f"{segment['name']}.npy", mmap_mode='r')
+                for segment in (first, second)
+            ])
+            start = first['start']
+            ids = [index_to_id.get(position) for position in range(start, start + len(vectors))]
+            merges += 1
+            merged = self._write_segment(f"{name}-m{merges}", start, vectors, ids)
+            self.segments[-2:] = [merged]
+            for position, doc_id in enumerate(ids, start):
+                if doc_id is None:
+                    self.published_ids.pop(position, None)
+                else:
+                    self.published_ids[position] = doc_id
+    
+    def publish(self, force: bool = False) -> Optional[int]:
+        """Write a new generation if the index changed since the last one"""
+        if not force and self.published_version == self.core_memory.index_version:
+            return None
+        
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return None
+        version, epoch, rows, index_to_id, vectors = snapshot
+        generation = self.generation + 1
+        name = generation_name(generation).replace("gen-", "seg-")
+        
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self.segments = []
+            self.published_ids = {}
+            self.published_rows = 0
+        if vectors is not None:
+            start = self.published_rows
+            ids = [index_to_id.get(position) for position in range(start, rows)]
+            self.segments.append(self._write_segment(name, start, vectors, ids))
+            self.published_ids.update(
+                (position, doc_id) for position, doc_id in enumerate(ids, start) if doc_id is not None
+            )
+            self.published_rows = rows
+            self._merge_tail(name, index_to_id)
+        
+        # Positions whose document was deleted or moved since their segment was written
+        overrides = {position: doc_id for position, doc_id in index_to_id.items() - self.published_ids.items()}
+        overrides.update((position, None) for position in self.published_ids.keys() - index_to_id.keys())
+        overrides_name = f"{generation_name(generation)}.overrides.json"
+        write_atomic(self.directory / overrides_name,
+                     lambda f: f.write(json.dumps({str(position): doc_id for position, doc_id in overrides.items()}).encode()))
+        
+        manifest = {
+            'generation': generation,
+            'segments': self.segments,
+            'overrides': overrides_name,
+            'rows': rows,
+            'count': len(index_to_id),
+            'dim': int(self.core_memory.embedding_dim),
+            'published_at': datetime.now().isoformat()
+        }
+        write_atomic(self.directory / CURRENT_FILE, lambda f: f.write(json.dumps(manifest).encode()))
+        
+        self.generation = generation
+        self.published_version = version
+        files = {overrides_name}
+        for segment in self.segments:
+            files.update((f"{segment['name']}.npy", f"{segment['name']}.ids.json"))
+        self.history = (self.history + [files])[-self.keep:]
+        self._prune()
+        return generation
+    
+    def _prune(self):
+        """Remove files no generation among the last keep refers to"""
+        kept = set().union(*self.history)
+        for path in itertools.chain(self.directory.glob("gen-*"), self.directory.glob("seg-*")):
+            if path.name in kept or path.name.endswith(".tmp"):
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                # Still open on a platform that forbids unlinking it
+                continue
+    
+    def _run(self):
+        while self.running:
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Index publish error: {e}")
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+    
+    def start(self):
+        """Publish the current index and then every change, on a background thread"""
+        if self.running:
+            return
+        self.publish(force=True)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="index-publisher", daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout: float = 10.0):
+        """Stop publishing after writing any final change"""
+        self.running = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+        self.publish()
+
+class GenerationReader:
+    """Keeps a search worker's index on the latest published generation
+    
+    The generation's segments are memory-mapped read-only and swapped into
+    the core under its lock, so a search sees either the old or the new
+    generation in full. Cached documents are dropped on every swap since the
+    writer may have updated or deleted them.
+    """
+    
+    def __init__(self, core_memory, directory: str, poll_interval: float = 1.0):
+        self.core_memory = core_memory
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self.generation = 0
+        self.segment_cache: Dict[str, Tuple[np.ndarray, List[Optional[str]]]] = {}
+        
+        self.running = False
+        self.wakeup = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        
+        # Statistics
+        self.swaps = 0
+    
+    def refresh(self) -> bool:
+        """Map the latest generation if it is newer than the current one"""
+        current = read_current(self.directory)
+        if current is None or current['generation'] == self.generation:
+            return False
+        
+        try:
+            segments, index_to_id = [], {}
+            for segment in current['segments']:
+                vectors, ids = self._load_segment(segment['name'])
+                segments.append(vectors)
+                index_to_id.update(
+                    (position, doc_id) for position, doc_id in enumerate(ids, segment['start']) if doc_id is not None
+                )
+            with open(self.directory / current['overrides']) as f:
+                overrides = json.load(f)
+        except FileNotFoundError:
+            # Superseded and pruned while we read the manifest; pick up the next one
+            return False
+        
+        for position, doc_id in overrides.items():
+            if doc_id is None:
+                index_to_id.pop(int(position), None)
+            else:
+                index_to_id[int(position)] = doc_id
+        # Segments dropped from the manifest are unmapped with the old index
+        names = {segment['name'] for segment in current['segments']}
+        self.segment_cache = {name: cached for name, cached in self.segment_cache.items() if name in names}
+        
+        index = MappedIndex(segments, dim=current['dim'])
+        id_to_index = {doc_id: position for position, doc_id in index_to_id.items()}
+        core_memory = self.core_memory
+        with core_memory.lock:
+            core_memory.faiss_index = index
+            core_memory.index_to_id = index_to_id
+            core_memory.id_to_index = id_to_index
+            core_memory.orphaned_vectors = index.ntotal - len(index_to_id)
+            core_memory.document_memories.clear()
+        
+        self.generation = current['generation']
+        self.swaps += 1
+        return True
+    
+    def _load_segment(self, name: str) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """Mapped vectors and row IDs of a segment; segments never change once written"""
+        if name not in self.segment_cache:
+            vectors = np.load(self.directory / f"{name}.npy", mmap_mode='r')
+            with open(self.directory / f"{name}.ids.json") as f:
+                self.segment_cache[name] = (vectors, json.load(f))
+        return self.segment_cache[name]
+    
+    def _run(self):
+        while self.running:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Index refresh error: {e}")
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+    
+    def start(self):
+        """Map the current generation and follow new ones on a background thread"""
+        if self.running:
+            return
+        self.refresh()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="index-reader", daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        self.running = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
@@ -0,0 +1,270 @@
+"""
+DocMemory - Background Ingestion Jobs
+Durable job queue and worker pool for document ingestion
+"""
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+class IngestionJobQueue:
+    """Queue of ingestion jobs stored in the document database
+    
+    Uploaded files are spooled into the storage directory and a job row is
+    committed before the caller gets its job ID, so queued work survives a
+    restart. A pool of worker threads claims queued jobs one at a time and
+    runs each as one batch through the ingestion pipeline, recording progress
+    in chunks and results per file.
+    
+    A read_only queue, as in a search worker, only reports on the jobs the
+    writer process runs; it neither creates the table nor queues files.
+    """
+    
+    def __init__(self, core_memory, pipeline, workers: int = 2,
+                 poll_interval: float = 1.0, progress_interval: float = 0.5,
+                 extract_workers: int = 4, read_only: bool = False):
+        self.core_memory = core_memory
+        self.read_only = read_only
+        self.pipeline = pipeline
+        self.workers = workers
+        self.extract_workers = extract_workers
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        
+        # Durable spool directory for uploaded files waiting to be ingested
+        self.upload_dir = core_memory.storage_path / "uploads"
+        
+        self.running = False
+        self.wakeup = threading.Event()
+        self.threads: List[threading.Thread] = []
+        
+        if not read_only:
+            self.upload_dir.mkdir(exist_ok=True)
+            self._init_table()
+    
+    def _init_table(self):
+        """Create the job table in the document database"""
+        with self.core_memory.lock:
+            self.core_memory.conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    files TEXT NOT NULL,
+                    results TEXT,
+                    files_processed INTEGER DEFAULT 0,
+                    chunks_processed INTEGER DEFAULT 0,
+                    chunks_total INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT,
+                    updated_at TEXT
+                )
+            ''')
+            self.core_memory.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status
+                ON ingestion_jobs (status, created_at)
+            ''')
+            self.core_memory.conn.commit()
+    
+    def new_upload_path(self, suffix: str = "") -> Path:
+        """Unique path in the spool directory for an incoming upload"""
+        return self.upload_dir / f"{uuid.uuid4().hex}{suffix}"
+    
+    def enqueue(self, files: List[Dict[str, Any]]) -> str:
+        """Queue files for ingestion and return the job ID
+        
+        Each entry needs a 'path' and may carry 'filename', 'title', 'tags',
+        'metadata' and 'file_hash'.
+        """
+        if self.read_only:
+            raise Exception("Search workers are read-only; send uploads to the writer process")
+        job_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        with self.core_memory.lock:
+            self.core_memory.conn.execute('''
+                INSERT INTO ingestion_jobs (id, status, files, results, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (job_id, JOB_QUEUED, json.dumps(files), json.dumps({}), now, now))
+            self.core_memory.conn.commit()
+        
+        self.wakeup.set()
+        return job_id
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state and progress of a job"""
+        with self.core_memory.lock:
+            row = self.core_memory.conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        
+        files = json.loads(row['files'])
+        return {
+            'job_id': row['id'],
+            'status': row['status'],
+            'files_total': len(files),
+            'files_processed': row['files_processed'],
+            'chunks_processed': row['chunks_processed'],
+            'chunks_total': row['chunks_total'],
+            'results': json.loads(row['results']) if row['results'] else {},
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+    
+    def count_jobs(self, status: str) -> int:
+        """Number of jobs in a given state"""
+        with self.core_memory.lock:
+            return self.core_memory.conn.execute(
+                "SELECT COUNT(*) FROM ingestion_jobs WHERE status = ?", (status,)
+            ).fetchone()[0]
+    
+    def start(self):
+        """Requeue jobs interrupted by a restart and start the worker pool"""
+        if self.running or self.read_only:
+            return
+        
+        with self.core_memory.lock:
+            self.core_memory.conn.execute(
+                "UPDATE ingestion_jobs SET status = ? WHERE status = ?", (JOB_QUEUED, JOB_RUNNING)
+            )
+            self.core_memory.conn.commit()
+        
+        self.running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers after their current job"""
+        self.running = False
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join(timeout=timeout)
+        self.threads = []
+    
+    def _claim_next_job(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running"""
+        with self.core_memory.lock:
+            conn = self.core_memory.conn
+            row = conn.execute('''
+                SELECT id, files FROM ingestion_jobs
+                WHERE status = ?
+                ORDER BY created_at, rowid
+                LIMIT 1
+            ''', (JOB_QUEUED,)).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE ingestion_jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (JOB_RUNNING, datetime.now().isoformat(), row['id'])
+            )
+            conn.commit()
+        return {'id': row['id'], 'files': json.loads(row['files'])}
+    
+    def _worker_loop(self):
+        """Process queued jobs until stopped"""
+        while self.running:
+            job = self._claim_next_job()
+            if job is None:
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+                continue
+            
+            try:
+                self._run_job(job)
+            except Exception as e:
+                print(f"Ingestion job {job['id']} failed: {e}")
+                self._update_job(job['id'], status=JOB_FAILED, error=str(e))
+                for entry in job['files']:
+                    self._discard_upload(entry['path'])
+    
+    def _run_job(self, job: Dict[str, Any]):
+        """Ingest every file of a job through the batch pipeline, recording progress"""
+        job_id = job['id']
+        entries = {entry['path']: entry for entry in job['files']}
+        
+        # Result keys are file names, made unique within the job
+        names = {}
+        for position, entry in enumerate(job['files']):
+            name = entry.get('filename') or Path(entry['path']).name
+            if name in names.values():
+                name = f"{name} ({position + 1})"
+            names[entry['path']] = name
+        
+        results = {}
+        progress = {'chunks_processed': 0, 'chunks_total': 0, 'last_write': 0.0}
+        
+        def report(stored: int, total: int):
+            progress['chunks_processed'] = stored
+            progress['chunks_total'] = total
+            now = time.monotonic()
+            if now - progress['last_write'] >= self.progress_interval:
+                progress['last_write'] = now
+                self._update_job(job_id, chunks_processed=stored, chunks_total=total)
+        
+        def file_done(file_path: str, doc_ids: List[str], error: Optional[str]):
+            if error:
+                print(f"Error ingesting {names[file_path]} in job {job_id}: {error}")
+                results[names[file_path]] = {'document_ids': [], 'count': 0, 'error': error}
+            else:
+                results[names[file_path]] = {'document_ids': doc_ids, 'count': len(doc_ids)}
+            self._discard_upload(file_path)
+            self._update_job(
+                job_id,
+                results=json.dumps(results),
+                files_processed=len(results),
+                chunks_processed=progress['chunks_processed'],
+                chunks_total=progress['chunks_total']
+            )
+        
+        self.pipeline.batch_process_documents(
+            list(entries),
+            tags_by_file={path: entry.get('tags') for path, entry in entries.items()},
+            metadata_by_file={path: entry.get('metadata') for path, entry in entries.items()},
+            titles_by_file={path: entry.get('title') for path, entry in entries.items()},
+            hashes_by_file={path: entry.get('file_hash') for path, entry in entries.items()},
+            max_workers=self.extract_workers,
+            progress_callback=report,
+            file_callback=file_done
+        )
+        
+        failed = all('error' in result for result in results.values()) and bool(results)
+        self._update_job(
+            job_id,
+            status=JOB_FAILED if failed else JOB_COMPLETED,
+            error="All files failed to ingest" if failed else None,
+            chunks_processed=progress['chunks_processed'],
+            chunks_total=progress['chunks_total']
+        )
+    
+    def _discard_upload(self, path: str):
+        """Remove a spooled upload once its file is done, ingested or failed
+        
+        Failed files are not retried, so a kept spool file would only leak;
+        the job result records the error.
+        """
+        path = Path(path)
+        if path.parent == self.upload_dir and path.exists():
+            path.unlink()
+    
+    def _update_job(self, job_id: str, **fields):
+        """Write job fields and bump updated_at"""
+        fields['updated_at'] = datetime.now().isoformat()
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self.core_memory.lock:
+            self.core_memory.conn.execute(
+                f"UPDATE ingestion_jobs SET {assignments} WHERE id = ?",
+                [*fields.values(), job_id]
+            )
+            self.core_memory.conn.commit()
@@ -0,0 +1,86 @@
+"""
+DocMemory - Memory Accounting
+Cheap byte estimates for the in-memory structures of a store, for sizing instances
+"""
+import itertools
+import sqlite3
+import sys
+from typing import Any, Dict, Optional
+import numpy as np
+
+# Entries measured per container; the rest are extrapolated from their mean
+SAMPLE_SIZE = 64
+
+def object_bytes(value: Any) -> int:
+    """Size of an object plus its attributes and their direct items
+    
+    Goes one level into lists, dicts and array buffers, which covers the
+    cached DocumentMemory objects without walking arbitrary object graphs.
+    """
+    size = sys.getsizeof(value)
+    attributes = getattr(value, '__dict__', None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        size += sum(object_bytes(item) for item in attributes.values())
+    elif isinstance(value, np.ndarray):
+        # getsizeof counts the buffer only when the array owns it
+        if value.base is not None and not isinstance(value.base, np.ndarray):
+            size += sys.getsizeof(value.base)
+        elif value.base is not None:
+            size += value.nbytes
+    elif isinstance(value, dict):
+        size += sum(sys.getsizeof(key) + sys.getsizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+def sampled_bytes(values, count: int, measure=object_bytes, sample_size: int = SAMPLE_SIZE) -> int:
+    """Estimated total size of count values, measuring at most sample_size of them"""
+    # The first entries stand in for the rest: seeking further into a dict
+    # iterator costs time proportional to the distance
+    sample = list(itertools.islice(values, sample_size))
+    if not sample:
+        return 0
+    return round(sum(map(measure, sample)) / len(sample) * count)
+
+def mapping_bytes(id_to_index: Dict[str, int], index_to_id: Dict[int, str],
+                  sample_size: int = SAMPLE_SIZE) -> int:
+    """Both ID mapping dicts; their keys and values are the same str and int objects"""
+    def entry_bytes(item):
+        doc_id, position = item
+        return sys.getsizeof(doc_id) + sys.getsizeof(position)
+    
+    return (sys.getsizeof(id_to_index) + sys.getsizeof(index_to_id)
+            + sampled_bytes(iter(id_to_index.items()), len(id_to_index), entry_bytes, sample_size))
+
+def index_bytes(index) -> Dict[str, Any]:
+    """Vector storage of a FAISS index, or of the memory-mapped MappedIndex"""
+    if hasattr(index, 'segments'):
+        # Pages of the mapped files are shared by every process mapping them
+        return {'bytes': int(index.nbytes), 'vectors': int(index.ntotal), 'mapped': True}
+    code_size = getattr(index, 'code_size', index.d * 4)
+    return {'bytes': int(index.ntotal * code_size), 'vectors': int(index.ntotal), 'mapped': False}
+
+def sqlite_cache(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Page cache limit of a connection and the most of it the database can fill
+    
+    SQLite does not report how much of its cache is in use, so the estimate
+    is the smaller of the limit and the database size: the cache only holds
+    pages that have been read, and at most every page once.
+    """
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    # A negative cache_size is a limit in KiB rather than in pages
+    limit = -cache_size * 1024 if cache_size < 0 else cache_size * page_size
+    database = page_size * page_count
+    return {'bytes': min(limit, database), 'limit_bytes': limit, 'database_bytes': database}
+
+def model_bytes(model: Any) -> Optional[int]:
+    """Parameters and buffers of a torch model, or the model's own memory_bytes()"""
+    if hasattr(model, 'memory_bytes'):
+        return model.memory_bytes()
+    if callable(getattr(model, 'parameters', None)):
+        tensors = itertools.chain(model.parameters(), model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    return None
@@ -0,0 +1,188 @@
+"""
+DocMemory - Metrics
+Low-overhead latency histograms and gauges in the Prometheus text format
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans sub-millisecond index lookups up to multi-second extractions
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value not in (float('inf'), float('-inf')) else ("+Inf" if value > 0 else "-Inf")
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination
+    
+    observe() costs a bisect and three additions under a lock, so it is
+    cheap enough for per-chunk and per-query hot paths.
+    """
+    
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.series: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, value: float, *label_values: str):
+        position = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+    
+    @contextmanager
+    def time(self, *label_values: str):
+        """Observe the wall time of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+    
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """Count and sum of every series"""
+        with self.lock:
+            return {labels: {'count': series[2], 'sum': series[1]} for labels, series in self.series.items()}
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series_items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self.series.items()]
+        for labels, counts, total, count in sorted(series_items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + ("+Inf" if bound == float('inf') else repr(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+class Gauge:
+    """Value read at scrape time from a callback
+    
+    The callback returns a number, or a dict of label value tuples to numbers
+    for labelled gauges. Returning None skips the gauge.
+    """
+    
+    def __init__(self, name: str, documentation: str, callback: Callable[[], object],
+                 label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.label_names = tuple(label_names)
+    
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception as e:
+            print(f"Metric {self.name} failed: {e}")
+            return []
+        if value is None:
+            return []
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        values = value if isinstance(value, dict) else {(): value}
+        for labels, number in sorted(values.items()):
+            labels = labels if isinstance(labels, tuple) else (labels,)
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(number)}")
+        return lines
+
+class MetricsRegistry:
+    """Named histograms and gauges rendered together for a /metrics scrape"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, object] = {}
+    
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = Histogram(name, documentation, label_names, buckets)
+            return self.metrics[name]
+    
+    def gauge(self, name: str, documentation: str, callback: Callable[[], object],
+              label_names: Sequence[str] = ()) -> Gauge:
+        """Register a gauge, replacing one with the same name (e.g. from a rebuilt system)"""
+        gauge = Gauge(name, documentation, callback, label_names)
+        with self.lock:
+            self.metrics[name] = gauge
+        return gauge
+    
+    def get(self, name: str):
+        return self.metrics.get(name)
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            metrics = [self.metrics[name] for name in sorted(self.metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+def resident_memory_bytes() -> Optional[int]:
+    """Current RSS of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # No procfs; fall back to the peak, which is all getrusage reports
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+# Process-wide registry shared by every component
+registry = MetricsRegistry()
+
+# Stage latencies
+QUERY_EMBEDDING_SECONDS = registry.histogram(
+    "docmemory_query_embedding_seconds", "Time to embed a search query")
+INDEX_SEARCH_SECONDS = registry.histogram(
+    "docmemory_index_search_seconds", "Time spent in the vector index search")
+HYDRATION_SECONDS = registry.histogram(
+    "docmemory_hydration_seconds", "Time to load the returned documents of a search")
+RERANK_SECONDS = registry.histogram(
+    "docmemory_rerank_seconds", "Time to rerank search results")
+KEYWORD_SEARCH_SECONDS = registry.histogram(
+    "docmemory_keyword_search_seconds", "Time for the full-text keyword query")
+SEARCH_SECONDS = registry.histogram(
+    "docmemory_search_seconds", "End-to-end search time", ("search_type",))
+EXTRACTION_SECONDS = registry.histogram(
+    "docmemory_extraction_seconds", "Text extraction time per document", ("format",))
+CHUNKING_SECONDS = registry.histogram(
+    "docmemory_chunking_seconds", "Time to split extracted text into chunks")
+EMBEDDING_BATCH_SECONDS = registry.histogram(
+    "docmemory_embedding_batch_seconds", "Model time per embedding batch")
+EMBEDDING_BATCH_SIZE = registry.histogram(
+    "docmemory_embedding_batch_size", "Texts per embedding batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+SQLITE_COMMIT_SECONDS = registry.histogram(
+    "docmemory_sqlite_commit_seconds", "Time per commit of the document database")
+
+registry.gauge("docmemory_process_resident_memory_bytes", "Resident memory of this process",
+               resident_memory_bytes)
@@ -0,0 +1,184 @@
+"""
+DocMemory - OCR
+Text recognition for scanned pages and images with a page-level cache
+"""
+import hashlib
+import io
+import multiprocessing
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+def ocr_image_bytes(data: bytes, lang: str = 'eng') -> str:
+    """Run tesseract on an encoded image (every frame of multi-page TIFFs)"""
+    # Imported in the worker on first use; pytesseract pulls in pandas
+    try:
+        from PIL import Image, ImageSequence
+        import pytesseract
+    except ImportError:
+        raise Exception("pytesseract and Pillow are required for OCR. Install them and the tesseract binary.")
+    
+    with Image.open(io.BytesIO(data)) as image:
+        pages = [pytesseract.image_to_string(frame.convert('RGB'), lang=lang)
+                 for frame in ImageSequence.Iterator(image)]
+    return '\n'.join(page.strip() for page in pages).strip()
+
+class OCRCache:
+    """SQLite store of recognised text keyed by page-image hash"""
+    
+    def __init__(self, db_path: Optional[str] = None):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path) if db_path else ':memory:', check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                image_hash TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (image_hash, lang)
+            )
+        ''')
+        self.conn.commit()
+    
+    def get_many(self, image_hashes: List[str], lang: str) -> Dict[str, str]:
+        """Cached text for the given hashes"""
+        found = {}
+        unique_hashes = list(dict.fromkeys(image_hashes))
+        with self.lock:
+            for start in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[start:start + 500]
+                placeholders = ','.join('?' for _ in batch)
+                rows = self.conn.execute(f'''
+                    SELECT image_hash, text FROM ocr_cache
+                    WHERE lang = ? AND image_hash IN ({placeholders})
+                ''', [lang, *batch]).fetchall()
+                found.update(rows)
+        return found
+    
+    def put(self, image_hash: str, lang: str, text: str):
+        """Remember the text recognised for a page image"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (image_hash, lang, text) VALUES (?, ?, ?)",
+                (image_hash, lang, text)
+            )
+            self.conn.commit()
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class OCREngine:
+    """Recognises page images on a bounded pool of tesseract worker processes
+    
+    Every page image is hashed first and looked up in the cache, so a page is
+    only ever recognised once no matter how often its document is retried or
+    re-ingested. Workers are started lazily with the spawn method, which is
+    safe from the ingestion threads. max_workers=0 runs OCR in the calling
+    thread. Scanned PDFs are rasterized page_window pages at a time, so a
+    long scan never holds more than one window of page images.
+    """
+    
+    def __init__(self, cache_path: Optional[str] = None, max_workers: int = 2,
+                 lang: str = 'eng', dpi: int = 300,
+                 ocr_function: Callable[[bytes, str], str] = ocr_image_bytes,
+                 page_window: int = 8):
+        self.cache = OCRCache(cache_path)
+        self.max_workers = max_workers
+        self.page_window = page_window
+        self.lang = lang
+        self.dpi = dpi
+        self.ocr_function = ocr_function
+        self.executor = None
+        self.executor_lock = threading.Lock()
+        
+        # Statistics
+        self.pages_recognised = 0
+        self.cache_hits = 0
+    
+    @staticmethod
+    def hash_image(data: bytes) -> str:
+        """Cache key for a page image"""
+        return hashlib.sha256(data).hexdigest()
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self.executor_lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self.executor
+    
+    def recognise(self, images: List[bytes]) -> List[str]:
+        """Text of each encoded page image, in order"""
+        hashes = [self.hash_image(image) for image in images]
+        texts = self.cache.get_many(hashes, self.lang)
+        self.cache_hits += sum(1 for image_hash in hashes if image_hash in texts)
+        
+        missing = {}
+        for image_hash, image in zip(hashes, images):
+            if image_hash not in texts:
+                missing.setdefault(image_hash, image)
+        
+        if missing:
+            if self.max_workers > 0:
+                executor = self._get_executor()
+                futures = {image_hash: executor.submit(self.ocr_function, image, self.lang)
+                           for image_hash, image in missing.items()}
+                results = {image_hash: future.result() for image_hash, future in futures.items()}
+            else:
+                results = {image_hash: self.ocr_function(image, self.lang)
+                           for image_hash, image in missing.items()}
+            
+            for image_hash, text in results.items():
+                self.cache.put(image_hash, self.lang, text)
+                self.pages_recognised += 1
+            texts.update(results)
+        
+        return [texts[image_hash] for image_hash in hashes]
+    
+    def recognise_pdf_pages(self, file_path: Path, page_numbers: List[int]) -> Dict[int, str]:
+        """Text of the given 1-based PDF pages, rasterized and recognised one window at a time"""
+        texts = {}
+        for start in range(0, len(page_numbers), self.page_window):
+            window = page_numbers[start:start + self.page_window]
+            images = self.rasterize_pdf_pages(file_path, window)
+            texts.update(zip(window, self.recognise([images[number] for number in window])))
+        return texts
+    
+    def rasterize_pdf_pages(self, file_path: Path, page_numbers: List[int]) -> Dict[int, bytes]:
+        """Render the given 1-based PDF pages to PNG bytes"""
+        try:
+            import fitz  # PyMuPDF
+        except ImportError:
+            fitz = None
+        try:
+            from pdf2image import convert_from_path
+        except ImportError:
+            convert_from_path = None
+        
+        if fitz is not None:
+            with fitz.open(str(file_path)) as document:
+                return {number: document[number - 1].get_pixmap(dpi=self.dpi).tobytes('png')
+                        for number in page_numbers}
+        
+        if convert_from_path is not None:
+            rendered = {}
+            for number in page_numbers:
+                image = convert_from_path(str(file_path), dpi=self.dpi, first_page=number, last_page=number)[0]
+                buffer = io.BytesIO()
+                image.save(buffer, format='PNG')
+                rendered[number] = buffer.getvalue()
+            return rendered
+        
+        raise Exception("PyMuPDF or pdf2image is required to OCR scanned PDF pages.")
+    
+    def close(self):
+        """Stop the worker processes and close the cache"""
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+        self.cache.close()
@@ -3,9 +3,17 @@ DocMemory - Search and Retrieval Algorithms
 Advanced semantic search and retrieval functionality
 """
 import numpy as np
-from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
-from .docmemory_core import DocMemoryCore, DocumentMemory
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from . import tracing
+from .docmemory_core import DocMemoryCore, DocumentFields, DocumentMemory
+from .metrics import (
+    HYDRATION_SECONDS, INDEX_SEARCH_SECONDS, KEYWORD_SEARCH_SECONDS, RERANK_SECONDS, SEARCH_SECONDS
+)
 
 class SemanticSearchEngine:
     """Advanced semantic search engine for document retrieval"""
@@ -14,6 +22,21 @@ class SemanticSearchEngine:
         self.core_memory = core_memory
         self.search_history = []
         self.max_search_history = 100
+        self.search_history_lock = threading.Lock()
+    
+    def record_search(self, query: str, search_type: str, result_count: int, seconds: float):
+        """Remember a search in the bounded in-memory history"""
+        entry = {
+            'query': query,
+            'search_type': search_type,
+            'results': result_count,
+            'seconds': seconds,
+            'timestamp': datetime.now().isoformat()
+        }
+        with self.search_history_lock:
+            self.search_history.append(entry)
+            if len(self.search_history) > self.max_search_history:
+                del self.search_history[:-self.max_search_history]
     
     def semantic_search(self, 
                        query_embedding: np.ndarray, 
@@ -21,44 +44,100 @@ class SemanticSearchEngine:
                        filters: Dict[str, any] = None,
                        rerank: bool = True) -> List[Tuple[DocumentMemory, float]]:
         """Perform semantic search using vector similarity"""
+        return self.hydrate(self.semantic_ranking(query_embedding, limit, filters, rerank))
+    
+    def semantic_ranking(self,
+                         query_embedding: np.ndarray,
+                         limit: int = 10,
+                         filters: Dict[str, any] = None,
+                         rerank: bool = True) -> List[Tuple[str, float]]:
+        """Ranked (document ID, score) pairs by vector similarity, without loading the documents"""
+        with tracing.span("semantic_search", limit=limit, filtered=bool(filters), rerank=rerank) as stage:
+            ranking = self._semantic_ranking(query_embedding, limit, filters, rerank)
+            stage.set(results=len(ranking))
+            return ranking
+    
+    def _semantic_ranking(self,
+                          query_embedding: np.ndarray,
+                          limit: int,
+                          filters: Optional[Dict[str, any]],
+                          rerank: bool) -> List[Tuple[str, float]]:
         # Normalize query embedding
         query_embedding = query_embedding / np.linalg.norm(query_embedding)
         
-        # Perform FAISS search
-        if self.core_memory.faiss_index.ntotal == 0:
-            return []  # No documents to search
-        
-        # Search in FAISS index
-        scores, indices = self.core_memory.faiss_index.search(
-            query_embedding.reshape(1, -1).astype(np.float32), 
-            min(limit * 2, self.core_memory.faiss_index.ntotal)  # Search for more to allow filtering
-        )
-        
-        # Get document IDs from indices
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx != -1 and idx in self.core_memory.index_to_id:  # Valid index
-                doc_id = self.core_memory.index_to_id[idx]
-                
-                # Retrieve document
-                doc = self.core_memory.retrieve_document(doc_id)
+        # Hold the core lock so concurrent ingestion cannot change the index mid-search
+        with self.core_memory.lock:
+            # Perform FAISS search
+            if self.core_memory.faiss_index.ntotal == 0:
+                return []  # No documents to search
+            
+            # Search for more to allow filtering, plus one slot per orphaned vector
+            # that may still occupy a top-k position until the index is compacted
+            candidate_count = limit * 2 + self.core_memory.orphaned_vectors
+            
+            # Search in FAISS index
+            k = min(candidate_count, self.core_memory.faiss_index.ntotal)
+            with INDEX_SEARCH_SECONDS.time(), tracing.span("index_search", k=k,
+                                                           vectors=self.core_memory.faiss_index.ntotal) as stage:
+                scores, indices = self.core_memory.faiss_index.search(
+                    query_embedding.reshape(1, -1).astype(np.float32), k
+                )
+            
+                # Get document IDs from indices
+                candidates = [
+                    (self.core_memory.index_to_id[idx], score)
+                    for score, idx in zip(scores[0], indices[0])
+                    if idx != -1 and idx in self.core_memory.index_to_id  # Valid index
+                ]
+                stage.set(candidates=len(candidates))
+        
+        # Filter and rerank on the candidates' metadata, read in one query
+        with tracing.span("ranking_fields", candidates=len(candidates)) as stage:
+            fields = self.core_memory.get_ranking_fields([doc_id for doc_id, _ in candidates])
+            results = []
+            for doc_id, score in candidates:
+                doc = fields.get(doc_id)
                 if doc:
                     # Apply filters if provided
                     if filters and not self._apply_filters(doc, filters):
                         continue
                     
                     results.append((doc, float(score)))
+            stage.set(documents=len(results))
         
         # Sort by score (similarity) - higher is better
         results.sort(key=lambda x: x[1], reverse=True)
         
         # Apply reranking if requested
         if rerank:
-            results = self._rerank_results(query_embedding, results)
+            with RERANK_SECONDS.time(), tracing.span("rerank", documents=len(results)):
+                results = self._rerank_results(query_embedding, results)
         
-        return results[:limit]
+        return [(doc.id, score) for doc, score in results[:limit]]
+    
+    def hydrate(self, ranking: List[Tuple[str, float]]) -> List[Tuple[DocumentMemory, float]]:
+        """Load the documents of a ranking, skipping any deleted since it was ranked"""
+        return list(self.iter_hydrated(ranking))
+    
+    def iter_hydrated(self, ranking: List[Tuple[str, float]]) -> Iterator[Tuple[DocumentMemory, float]]:
+        """Load the documents of a ranking one at a time, as the caller consumes them"""
+        seconds = 0.0
+        with tracing.span("hydrate", candidates=len(ranking)) as stage:
+            loaded = 0
+            try:
+                for doc_id, score in ranking:
+                    start = time.perf_counter()
+                    doc = self.core_memory.retrieve_document(doc_id)
+                    seconds += time.perf_counter() - start
+                    if doc:
+                        loaded += 1
+                        stage.set(documents=loaded)
+                        yield doc, score
+            finally:
+                # Loading time only, not the time the consumer spent between results
+                HYDRATION_SECONDS.observe(seconds)
     
-    def _apply_filters(self, doc: DocumentMemory, filters: Dict[str, any]) -> bool:
+    def _apply_filters(self, doc: DocumentFields, filters: Dict[str, any]) -> bool:
         """Apply filters to search results"""
         for key, value in filters.items():
             if key == 'document_type' and doc.document_type != value:
@@ -71,7 +150,7 @@ class SemanticSearchEngine:
         return True
     
     def _rerank_results(self, query_embedding: np.ndarray, 
-                       results: List[Tuple[DocumentMemory, float]]) -> List[Tuple[DocumentMemory, float]]:
+                       results: List[Tuple[DocumentFields, float]]) -> List[Tuple[DocumentFields, float]]:
         """Apply reranking to improve search quality"""
         # In a more sophisticated system, this would use cross-encoder models
         # or other reranking techniques. For now, we'll apply a simple enhancement
@@ -82,9 +161,6 @@ class SemanticSearchEngine:
             # Apply recency boost for recent documents
             time_factor = self._calculate_recency_factor(doc.timestamp)
             
-            # Apply content length normalization to avoid bias toward longer docs
-            length_factor = min(1.0, len(doc.content) / 1000)  # Normalize against 1000 chars
-            
             # Apply metadata-based scoring
             metadata_factor = self._calculate_metadata_factor(doc)
             
@@ -110,7 +186,7 @@ class SemanticSearchEngine:
         recency_score = np.exp(-age_in_days / 30)  # 30-day half-life
         return min(1.0, recency_score)
     
-    def _calculate_metadata_factor(self, doc: DocumentMemory) -> float:
+    def _calculate_metadata_factor(self, doc: DocumentFields) -> float:
         """Calculate score based on document metadata"""
         # Higher scores for documents with more metadata or tags
         meta_score = 0.1 * len(doc.tags)  # 0.1 per tag
@@ -119,6 +195,16 @@ class SemanticSearchEngine:
     
     def keyword_search(self, query: str, limit: int = 10) -> List[Tuple[DocumentMemory, float]]:
         """Traditional keyword-based search"""
+        return self.hydrate(self.keyword_ranking(query, limit))
+    
+    def keyword_ranking(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Ranked (document ID, score) pairs by term frequency, without loading the documents"""
+        with tracing.span("keyword_search", limit=limit) as stage:
+            ranking = self._keyword_ranking(query, limit)
+            stage.set(results=len(ranking))
+            return ranking
+    
+    def _keyword_ranking(self, query: str, limit: int) -> List[Tuple[str, float]]:
         # This would normally use full-text search like Elasticsearch
         # For now, we'll do a simple substring match with SQLite
         
@@ -126,29 +212,34 @@ class SemanticSearchEngine:
         
         # Simple full-text search using SQLite LIKE
         search_term = f"%{query}%"
-        cursor.execute('''
-            SELECT id, content, title FROM document_memories 
-            WHERE content LIKE ? OR title LIKE ?
-            ORDER BY LENGTH(content) ASC
-            LIMIT ?
-        ''', (search_term, search_term, limit*2))  # Get more results for relevance scoring
-        
+        with self.core_memory.lock, KEYWORD_SEARCH_SECONDS.time(), \
+                tracing.span("like_scan", rows_limit=limit * 2) as stage:
+            cursor.execute('''
+                SELECT id, content, title FROM document_memories 
+                WHERE content LIKE ? OR title LIKE ?
+                ORDER BY LENGTH(content) ASC
+                LIMIT ?
+            ''', (search_term, search_term, limit*2))  # Get more results for relevance scoring
+            rows = cursor.fetchall()
+            stage.set(rows=len(rows))
+        
+        with tracing.span("score", candidates=len(rows)):
+            return self._score_keyword_rows(query, rows, limit)
+    
+    def _score_keyword_rows(self, query: str, rows: list, limit: int) -> List[Tuple[str, float]]:
         results = []
-        for row in cursor.fetchall():
-            doc_id = row['id']
-            doc = self.core_memory.retrieve_document(doc_id)
-            if doc:
-                # Simple relevance score based on query term frequency
-                query_lower = query.lower()
-                content_lower = doc.content.lower()
-                
-                term_count = content_lower.count(query_lower)
-                if ' ' in query:
-                    # For multi-word queries, also check whole phrase
-                    term_count += content_lower.count(query_lower) * 2
-                
-                score = term_count / len(content_lower.split())  # Normalize by document length
-                results.append((doc, min(1.0, score)))
+        query_lower = query.lower()
+        for row in rows:
+            # Simple relevance score based on query term frequency
+            content_lower = (row['content'] or "").lower()
+            
+            term_count = content_lower.count(query_lower)
+            if ' ' in query:
+                # For multi-word queries, also check whole phrase
+                term_count += content_lower.count(query_lower) * 2
+            
+            score = term_count / max(1, len(content_lower.split()))  # Normalize by document length
+            results.append((row['id'], min(1.0, score)))
         
         # Sort by score
         results.sort(key=lambda x: x[1], reverse=True)
@@ -161,34 +252,47 @@ class SemanticSearchEngine:
                      keyword_weight: float = 0.3,
                      limit: int = 10) -> List[Tuple[DocumentMemory, float]]:
         """Combine semantic and keyword search results"""
-        # Get semantic search results
-        semantic_results = self.semantic_search(query_embedding, limit=limit*2)
-        
-        # Get keyword search results
-        keyword_results = self.keyword_search(query, limit=limit*2)
-        
-        # Create result dictionaries for easy access
-        semantic_dict = {doc.id: score for doc, score in semantic_results}
-        keyword_dict = {doc.id: score for doc, score in keyword_results}
+        return self.hydrate(self.hybrid_ranking(query, query_embedding, semantic_weight, keyword_weight, limit))
+    
+    def hybrid_ranking(self,
+                       query: str,
+                       query_embedding: np.ndarray,
+                       semantic_weight: float = 0.7,
+                       keyword_weight: float = 0.3,
+                       limit: int = 10) -> List[Tuple[str, float]]:
+        """Ranked (document ID, score) pairs combining both rankings, without loading the documents"""
+        with tracing.span("hybrid_search", limit=limit, semantic_weight=semantic_weight,
+                          keyword_weight=keyword_weight) as stage:
+            ranking = self._hybrid_ranking(query, query_embedding, semantic_weight, keyword_weight, limit)
+            stage.set(results=len(ranking))
+            return ranking
+    
+    def _hybrid_ranking(self,
+                        query: str,
+                        query_embedding: np.ndarray,
+                        semantic_weight: float,
+                        keyword_weight: float,
+                        limit: int) -> List[Tuple[str, float]]:
+        # Get semantic and keyword rankings
+        semantic_dict = dict(self.semantic_ranking(query_embedding, limit=limit*2))
+        keyword_dict = dict(self.keyword_ranking(query, limit=limit*2))
         
         # Combine scores using weighted average
         combined_results = []
         all_doc_ids = set(semantic_dict.keys()) | set(keyword_dict.keys())
         
-        for doc_id in all_doc_ids:
-            semantic_score = semantic_dict.get(doc_id, 0.0)
-            keyword_score = keyword_dict.get(doc_id, 0.0)
-            
-            # Normalize scores to 0-1 range if needed
-            combined_score = (semantic_weight * semantic_score) + (keyword_weight * keyword_score)
+        with tracing.span("merge", semantic=len(semantic_dict), keyword=len(keyword_dict),
+                          merged=len(all_doc_ids)):
+            for doc_id in all_doc_ids:
+                semantic_score = semantic_dict.get(doc_id, 0.0)
+                keyword_score = keyword_dict.get(doc_id, 0.0)
+                
+                # Normalize scores to 0-1 range if needed
+                combined_score = (semantic_weight * semantic_score) + (keyword_weight * keyword_score)
+                combined_results.append((doc_id, combined_score))
             
-            # Retrieve document
-            doc = self.core_memory.retrieve_document(doc_id)
-            if doc:
-                combined_results.append((doc, combined_score))
-        
-        # Sort by combined score
-        combined_results.sort(key=lambda x: x[1], reverse=True)
+            # Sort by combined score
+            combined_results.sort(key=lambda x: x[1], reverse=True)
         return combined_results[:limit]
     
     def search_by_tags(self, tags: List[str], limit: int = 10) -> List[DocumentMemory]:
@@ -205,8 +309,10 @@ class SemanticSearchEngine:
         
         results = []
         for tag in tags:
-            cursor.execute(query, (f'%{tag}%', limit))
-            for row in cursor.fetchall():
+            with self.core_memory.lock:
+                cursor.execute(query, (f'%{tag}%', limit))
+                rows = cursor.fetchall()
+            for row in rows:
                 doc = self.core_memory.retrieve_document(row['id'])
                 if doc and doc not in [r[0] for r in results]:
                     results.append((doc, 1.0))  # Score for tag match
@@ -238,13 +344,15 @@ class SemanticSearchEngine:
         
         # Find documents from same source file
         cursor = self.core_memory.conn.cursor()
-        cursor.execute('''
-            SELECT id FROM document_memories 
-            WHERE source_file = ? AND id != ?
-            LIMIT ?
-        ''', (doc.source_file, doc_id, limit))
-        
-        for row in cursor.fetchall():
+        with self.core_memory.lock:
+            cursor.execute('''
+                SELECT id FROM document_memories 
+                WHERE source_file = ? AND id != ?
+                LIMIT ?
+            ''', (doc.source_file, doc_id, limit))
+            rows = cursor.fetchall()
+        
+        for row in rows:
             related_doc = self.core_memory.retrieve_document(row['id'])
             if related_doc and related_doc not in [r[0] for r in related_docs]:
                 similarity = np.dot(doc.embedding, related_doc.embedding)
@@ -257,9 +365,78 @@ class SemanticSearchEngine:
 class DocMemorySearchSystem:
     """Main search system integrating with DocMemory"""
     
-    def __init__(self, docmemory_system):
+    def __init__(self, docmemory_system, read_only: bool = False):
         self.docmemory_system = docmemory_system
         self.search_engine = SemanticSearchEngine(docmemory_system.core_memory)
+        
+        # Query counts for warm-up replay; search workers replay the writer's
+        # log but never write to the shared database
+        self.read_only = read_only
+        self.pending_queries = Counter()
+        self.query_log_lock = threading.Lock()
+        self.query_log_flush_every = 20
+        if not read_only:
+            self._init_query_log()
+    
+    def _init_query_log(self):
+        """Create the table of recent queries used to warm up a new process"""
+        core_memory = self.docmemory_system.core_memory
+        with core_memory.lock:
+            core_memory.conn.execute('''
+                CREATE TABLE IF NOT EXISTS recent_queries (
+                    query TEXT NOT NULL,
+                    search_type TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    last_used TEXT,
+                    PRIMARY KEY (query, search_type)
+                )
+            ''')
+            core_memory.conn.commit()
+    
+    def record_query(self, query: str, search_type: str):
+        """Count a query so it can be replayed when a process warms up
+        
+        Counts are buffered and written in one transaction every
+        query_log_flush_every queries to keep writes off the search path.
+        """
+        if self.read_only:
+            return
+        with self.query_log_lock:
+            self.pending_queries[(query, search_type)] += 1
+            pending = sum(self.pending_queries.values())
+        if pending >= self.query_log_flush_every:
+            self.flush_query_log()
+    
+    def flush_query_log(self):
+        """Write buffered query counts"""
+        with self.query_log_lock:
+            pending, self.pending_queries = self.pending_queries, Counter()
+        if not pending:
+            return
+        
+        now = datetime.now().isoformat()
+        core_memory = self.docmemory_system.core_memory
+        with core_memory.lock:
+            core_memory.conn.executemany('''
+                INSERT INTO recent_queries (query, search_type, hits, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT (query, search_type) DO UPDATE SET hits = hits + excluded.hits, last_used = excluded.last_used
+            ''', [(query, search_type, hits, now) for (query, search_type), hits in pending.items()])
+            core_memory.conn.commit()
+    
+    def top_queries(self, limit: int = 20) -> List[Tuple[str, str]]:
+        """Most frequent recent (query, search_type) pairs"""
+        self.flush_query_log()
+        core_memory = self.docmemory_system.core_memory
+        try:
+            with core_memory.lock:
+                rows = core_memory.conn.execute(
+                    "SELECT query, search_type FROM recent_queries ORDER BY hits DESC, last_used DESC LIMIT ?",
+                    (limit,)
+                ).fetchall()
+        except sqlite3.OperationalError:
+            # A search worker started before the writer created the table
+            return []
+        return [(row['query'], row['search_type']) for row in rows]
     
     def search(self, 
                query: str, 
@@ -268,43 +445,89 @@ class DocMemorySearchSystem:
                limit: int = 10,
                filters: Dict[str, any] = None) -> List[Dict[str, any]]:
         """Main search method"""
-        results = []
-        
+        ranked = self.search_engine.hydrate(self._rank(query, query_embedding, search_type, limit, filters))
+        with tracing.span("format_results", results=len(ranked)):
+            return [self.format_result(doc, score) for doc, score in ranked]
+    
+    def search_stream(self,
+                      query: str,
+                      query_embedding: np.ndarray = None,
+                      search_type: str = "hybrid",
+                      limit: int = 10,
+                      filters: Dict[str, any] = None) -> Iterator[Dict[str, Any]]:
+        """Search yielding events: the ranked IDs and scores, then one event per result
+        
+        The ranking is sent as soon as the index or keyword stage has scored
+        the candidates. Each document is then loaded and formatted only when
+        the consumer asks for its event, so the first result does not wait
+        for the others. A result deleted in between is skipped.
+        """
+        ranking = self._rank(query, query_embedding, search_type, limit, filters)
+        yield {
+            'type': 'ranking',
+            'results': [{'id': doc_id, 'score': float(score)} for doc_id, score in ranking]
+        }
+        rank = 0
+        for doc, score in self.search_engine.iter_hydrated(ranking):
+            rank += 1
+            yield {'type': 'result', 'rank': rank, 'result': self.format_result(doc, score)}
+    
+    @staticmethod
+    def format_result(doc: DocumentMemory, score: float) -> Dict[str, Any]:
+        """Search result fields for one ranked document"""
+        return {
+            'id': doc.id,
+            'title': doc.title,
+            'content': doc.content[:200] + "..." if len(doc.content) > 200 else doc.content,
+            'source_file': doc.source_file,
+            'document_type': doc.document_type,
+            'tags': doc.tags,
+            'timestamp': doc.timestamp.isoformat(),
+            'score': float(score),
+            'summary': doc.summary,
+            'page_numbers': doc.page_numbers
+        }
+    
+    def _rank(self,
+              query: str,
+              query_embedding: Optional[np.ndarray],
+              search_type: str,
+              limit: int,
+              filters: Optional[Dict[str, any]]) -> List[Tuple[str, float]]:
+        """Ranked (document ID, score) pairs for a query"""
+        start = time.perf_counter()
+        search_results = self._run_search(query, query_embedding, search_type, limit, filters)
+        seconds = time.perf_counter() - start
+        SEARCH_SECONDS.observe(seconds, search_type)
+        self.search_engine.record_search(query, search_type, len(search_results), seconds)
+        return search_results
+    
+    def _run_search(self,
+                    query: str,
+                    query_embedding: Optional[np.ndarray],
+                    search_type: str,
+                    limit: int,
+                    filters: Optional[Dict[str, any]]) -> List[Tuple[str, float]]:
         if search_type == "semantic" and query_embedding is not None:
-            search_results = self.search_engine.semantic_search(
+            search_results = self.search_engine.semantic_ranking(
                 query_embedding, limit=limit, filters=filters
             )
         elif search_type == "keyword":
-            search_results = self.search_engine.keyword_search(query, limit=limit)
+            search_results = self.search_engine.keyword_ranking(query, limit=limit)
         elif search_type == "hybrid" and query_embedding is not None:
-            search_results = self.search_engine.hybrid_search(
+            search_results = self.search_engine.hybrid_ranking(
                 query, query_embedding, limit=limit
             )
         else:
             # Default to semantic if embedding provided, otherwise keyword
             if query_embedding is not None:
-                search_results = self.search_engine.semantic_search(
+                search_results = self.search_engine.semantic_ranking(
                     query_embedding, limit=limit, filters=filters
                 )
             else:
-                search_results = self.search_engine.keyword_search(query, limit=limit)
+                search_results = self.search_engine.keyword_ranking(query, limit=limit)
         
-        # Format results
-        for doc, score in search_results:
-            results.append({
-                'id': doc.id,
-                'title': doc.title,
-                'content': doc.content[:200] + "..." if len(doc.content) > 200 else doc.content,
-                'source_file': doc.source_file,
-                'document_type': doc.document_type,
-                'tags': doc.tags,
-                'timestamp': doc.timestamp.isoformat(),
-                'score': float(score),
-                'summary': doc.summary,
-                'page_numbers': doc.page_numbers
-            })
-        
-        return results
+        return search_results
     
     def find_related_documents(self, doc_id: str, limit: int = 5) -> List[Dict[str, any]]:
         """Find documents related to a specific document"""
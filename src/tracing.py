@@ -0,0 +1,198 @@
+"""
+DocMemory - Request Tracing
+Per-request stage spans, counters and optional cProfile output for explaining searches
+"""
+import cProfile
+import pstats
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("docmemory_trace", default=None)
+
+# cProfile can only profile one request at a time; others run unprofiled
+_profile_lock = threading.Lock()
+
+class Trace:
+    """Tree of timed stages and aggregate counters for one request"""
+    
+    def __init__(self, name: str):
+        self.root = {'stage': name, 'ms': 0.0, 'children': []}
+        self.stack = [self.root]
+        self.counters: Dict[str, Dict[str, float]] = {}
+        self.started = time.perf_counter()
+        self.profile: Optional[List[Dict[str, Any]]] = None
+    
+    def count(self, name: str, seconds: float = None, amount: int = 1):
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = {'count': 0}
+        counter['count'] += amount
+        if seconds is not None:
+            counter['ms'] = counter.get('ms', 0.0) + seconds * 1000
+    
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """Calls and milliseconds per stage name, summed over the tree"""
+        totals = {}
+        pending = list(reversed(self.root['children']))
+        while pending:
+            node = pending.pop()
+            total = totals.setdefault(node['stage'], {'count': 0, 'ms': 0.0})
+            total['count'] += 1
+            total['ms'] += node['ms']
+            pending.extend(reversed(node['children']))
+        return {name: {'count': total['count'], 'ms': round(total['ms'], 3)} for name, total in totals.items()}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        def node_dict(node):
+            result = {key: value for key, value in node.items() if key != 'children'}
+            result['ms'] = round(node['ms'], 3)
+            if node['children']:
+                result['children'] = [node_dict(child) for child in node['children']]
+            return result
+        
+        explanation = {
+            'total_ms': round(self.root['ms'], 3),
+            'plan': [node_dict(child) for child in self.root['children']],
+            'stages': self.stage_totals(),
+            'counters': {name: {key: round(value, 3) for key, value in counter.items()}
+                         for name, counter in self.counters.items()}
+        }
+        if self.profile is not None:
+            explanation['profile'] = self.profile
+        return explanation
+
+class Span:
+    """Timed stage of the current trace, nested under the enclosing stage"""
+    __slots__ = ('name', 'attributes', 'trace', 'node', 'start')
+    
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.trace = None
+        self.node = None
+    
+    def __enter__(self) -> "Span":
+        self.trace = _current_trace.get()
+        if self.trace is not None:
+            self.node = {'stage': self.name, **self.attributes, 'ms': 0.0, 'children': []}
+            self.trace.stack[-1]['children'].append(self.node)
+            self.trace.stack.append(self.node)
+            self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace is not None:
+            self.node['ms'] = (time.perf_counter() - self.start) * 1000
+            if exc_type is not None:
+                self.node['error'] = exc_type.__name__
+            self.trace.stack.pop()
+        return False
+    
+    def set(self, **attributes):
+        if self.node is not None:
+            self.node.update(attributes)
+
+class Counted:
+    """Counter of the current trace that also sums the time of each with-block"""
+    __slots__ = ('name', 'trace', 'start')
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        self.trace = _current_trace.get()
+        if self.trace is not None:
+            self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace is not None:
+            self.trace.count(self.name, time.perf_counter() - self.start)
+        return False
+
+def span(name: str, **attributes) -> Span:
+    """Time a stage of the current trace as a child of the enclosing stage
+    
+    Keyword arguments become attributes of the stage, and set() adds more
+    (such as candidate counts) once they are known. Without an active trace
+    this costs one context variable lookup.
+    """
+    return Span(name, attributes)
+
+def counted(name: str) -> Counted:
+    """Count calls (and their time) of a hot operation without adding a stage per call"""
+    return Counted(name)
+
+def count(name: str, amount: int = 1):
+    """Add to a counter of the current trace, if any"""
+    current = _current_trace.get()
+    if current is not None:
+        current.count(name, amount=amount)
+
+def profile_rows(profiler: cProfile.Profile, limit: int = 25) -> List[Dict[str, Any]]:
+    """Functions with the most cumulative time"""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': f"{filename}:{line}({function})" if line else function,
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        }
+        for (filename, line, function), (_, calls, own, cumulative, _) in rows
+    ]
+
+class TraceScope:
+    """Installs a Trace as the current one for a with-block"""
+    
+    def __init__(self, name: str, profile: bool = False):
+        self.trace = Trace(name)
+        self.profile = profile
+        self.profiler = None
+    
+    def __enter__(self) -> Trace:
+        self.token = _current_trace.set(self.trace)
+        if self.profile and _profile_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self.trace
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler is not None:
+            self.profiler.disable()
+            _profile_lock.release()
+            self.trace.profile = profile_rows(self.profiler)
+        elif self.profile:
+            self.trace.profile = []
+        self.trace.root['ms'] = (time.perf_counter() - self.trace.started) * 1000
+        _current_trace.reset(self.token)
+        return False
+
+def trace(name: str, profile: bool = False) -> TraceScope:
+    """Collect a Trace for the with-block, optionally under cProfile
+    
+    The trace follows the calling thread (and tasks copied from its context),
+    so work handed to another thread shows up as the time spent waiting.
+    """
+    return TraceScope(name, profile)
+
+def format_trace(explanation: Dict[str, Any], profile_lines: int = 10) -> str:
+    """Readable multi-line summary of an explanation for the log"""
+    lines = [f"total {explanation['total_ms']:.1f} ms"]
+    
+    def add(nodes, depth):
+        for node in nodes:
+            attributes = ', '.join(f"{key}={value}" for key, value in node.items()
+                                   if key not in ('stage', 'ms', 'children'))
+            lines.append(f"{'  ' * depth}{node['stage']:<24} {node['ms']:9.2f} ms  {attributes}")
+            add(node.get('children', []), depth + 1)
+    
+    add(explanation['plan'], 1)
+    for name, counter in explanation['counters'].items():
+        lines.append(f"  {name}: {counter['count']} calls" + (f", {counter['ms']:.2f} ms" if 'ms' in counter else ""))
+    for row in explanation.get('profile', [])[:profile_lines]:
+        lines.append(f"  {row['cumulative_ms']:9.2f} ms cum {row['calls']:>7} calls  {row['function']}")
+    return "\n".join(lines)
@@ -4,9 +4,11 @@
 """
 Pytest configuration and shared fixtures
 """
+import hashlib
 import pytest
 import tempfile
 import shutil
+import numpy as np
 from pathlib import Path
 
 @pytest.fixture(scope="session")
@@ -16,6 +18,58 @@ def temp_storage():
     yield temp_dir
     shutil.rmtree(temp_dir)
 
+def random_vector(seed, dim=384):
+    """Deterministic unit-length embedding for storing chunks directly"""
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+class CountingEmbeddingModel:
+    """Deterministic embedding model that records every text it encodes"""
+    
+    def __init__(self, embedding_dim: int = 384):
+        self.embedding_dim = embedding_dim
+        self.encoded = []
+    
+    def encode(self, sentences, **kwargs):
+        embeddings = []
+        for sentence in sentences:
+            self.encoded.append(sentence)
+            seed = int.from_bytes(hashlib.sha256(sentence.encode('utf-8')).digest()[:8], 'little')
+            embedding = np.random.default_rng(seed).standard_normal(self.embedding_dim).astype(np.float32)
+            embeddings.append(embedding / np.linalg.norm(embedding))
+        return np.array(embeddings, dtype=np.float32).reshape(len(embeddings), self.embedding_dim)
+
+@pytest.fixture
+def embedding_model():
+    """Deterministic embedding model for tests"""
+    return CountingEmbeddingModel()
+
+@pytest.fixture
+def docmemory(tmp_path):
+    """DocMemory auto system backed by a per-test storage directory"""
+    from src.auto_save_load import DocMemoryAutoSystem
+    system = DocMemoryAutoSystem(str(tmp_path / "storage"))
+    yield system
+    system.core_memory.close()
+    system.auto_save.running = False
+
+@pytest.fixture
+def pipeline(docmemory, embedding_model):
+    """Ingestion pipeline over the test store with the deterministic model"""
+    from src.document_processor import DocumentIngestionPipeline
+    pipeline = DocumentIngestionPipeline(docmemory)
+    pipeline.set_embedding_model(embedding_model)
+    return pipeline
+
+@pytest.fixture
+def ingestor(docmemory, embedding_model):
+    """Directory ingestor over the test store with the deterministic model and no embedding cache"""
+    from src.document_processor import DocumentIngestionPipeline
+    from src.directory_ingest import DirectoryIngestor
+    pipeline = DocumentIngestionPipeline(docmemory)
+    pipeline.set_embedding_model(embedding_model, use_cache=False)
+    return DirectoryIngestor(docmemory.core_memory, pipeline, workers=2)
+
 @pytest.fixture
 def cleanup_test_files():
     """Cleanup test files after each test"""
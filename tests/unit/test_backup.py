@@ -0,0 +1,196 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for incremental online backups
+"""
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from backend.core.config import settings
+from backend.routers.backups import restore_target
+from src.auto_save_load import DocMemoryAutoSystem
+from src.backup import BackupManager, ChangeLog, Throttle
+from src.docmemory_core import DocMemoryCore
+from tests.conftest import random_vector
+
+def make_manager(core, tmp_path, **kwargs):
+    return BackupManager(core.storage_path, conn=core.conn, lock=core.lock,
+                         backup_dir=tmp_path / "backups", max_bytes_per_second=None, **kwargs)
+
+def test_snapshot_round_trip(docmemory, tmp_path):
+    """A snapshot restores the database and an index aligned with it"""
+    core = docmemory.core_memory
+    doc_ids = [core.store_document(f"chunk {i}", "Doc", "doc.txt", random_vector(i)) for i in range(5)]
+    manager = make_manager(core, tmp_path)
+    
+    manifest = manager.create_snapshot(label="nightly")
+    assert manifest['document_count'] == 5
+    assert manifest['vector_count'] == 5
+    assert manager.list_snapshots()[0]['label'] == "nightly"
+    
+    restored = tmp_path / "restored"
+    manager.extract(manifest['id'], restored)
+    conn = sqlite3.connect(restored / "document_memories.db")
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert conn.execute("SELECT COUNT(*) FROM document_memories").fetchone()[0] == 5
+    conn.close()
+    
+    vectors = np.load(restored / "index" / "vectors.npy")
+    with open(restored / "index" / "ids.json") as f:
+        ids = json.load(f)
+    assert sorted(ids) == sorted(doc_ids)
+    np.testing.assert_allclose(vectors[ids.index(doc_ids[3])], random_vector(3), rtol=1e-5)
+
+def test_second_snapshot_stores_only_changed_blocks(docmemory, tmp_path):
+    """Unchanged blocks are shared between snapshots and pruning keeps them"""
+    core = docmemory.core_memory
+    for i in range(200):
+        core.store_document(f"chunk {i} " + "text " * 200, "Doc", "doc.txt", random_vector(i))
+    manager = make_manager(core, tmp_path, block_size=16 * 1024)
+    
+    first = manager.create_snapshot()
+    assert first['stats']['blocks_written'] == first['stats']['blocks_total']
+    
+    core.store_document("one more chunk", "Doc", "doc.txt", random_vector(1000))
+    second = manager.create_snapshot()
+    assert second['document_count'] == 201
+    assert 0 < second['stats']['blocks_written'] < second['stats']['blocks_total'] / 2
+    
+    manager.prune(keep=1)
+    assert [m['id'] for m in manager.list_snapshots()] == [second['id']]
+    manager.extract(second['id'], tmp_path / "restored")
+    conn = sqlite3.connect(tmp_path / "restored" / "document_memories.db")
+    assert conn.execute("SELECT COUNT(*) FROM document_memories").fetchone()[0] == 201
+    conn.close()
+
+def test_writes_continue_during_backup(docmemory, tmp_path):
+    """The core lock is released between copy steps"""
+    core = docmemory.core_memory
+    for i in range(50):
+        core.store_document(f"chunk {i} " + "text " * 400, "Doc", "doc.txt", random_vector(i))
+    manager = make_manager(core, tmp_path, pages_per_step=1, step_sleep=0.005)
+    
+    written = []
+    
+    def writer():
+        for i in range(5):
+            written.append(core.store_document(f"during {i}", "Doc", "doc.txt", random_vector(100 + i)))
+    
+    thread = threading.Thread(target=writer)
+    original = manager._copy_database
+    
+    def copy_while_writing(target_path):
+        thread.start()
+        return original(target_path)
+    
+    manager._copy_database = copy_while_writing
+    manifest = manager.create_snapshot()
+    thread.join()
+    
+    assert len(written) == 5
+    # Writes that land mid-copy are carried into the snapshot, so the index
+    # exported from it always matches its documents
+    assert 50 <= manifest['document_count'] <= 55
+    assert manifest['vector_count'] == manifest['document_count']
+
+def test_throttle_limits_rate(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("src.backup.time.sleep", sleeps.append)
+    throttle = Throttle(max_bytes_per_second=1000)
+    throttle.consume(500)
+    assert sleeps and sleeps[-1] > 0.4
+    
+    unthrottled = Throttle()
+    unthrottled.consume(10 ** 9)
+    assert len(sleeps) == 1
+
+def test_point_in_time_restore(docmemory, tmp_path):
+    """Replaying the change log rolls a snapshot forward to the requested time"""
+    core = docmemory.core_memory
+    manager = make_manager(core, tmp_path)
+    core.change_log = manager.change_log
+    first = [core.store_document(f"chunk {i}", "Doc", "doc.txt", random_vector(i)) for i in range(3)]
+    manager.create_snapshot()
+    
+    later = core.store_document("added after the snapshot", "Doc", "doc.txt", random_vector(10))
+    core.delete_document(first[0])
+    cutoff = datetime.now()
+    time.sleep(0.01)
+    core.store_document("added after the cutoff", "Doc", "doc.txt", random_vector(11))
+    
+    target = tmp_path / "restored"
+    stats = manager.restore(target_path=target, until=cutoff)
+    assert stats['records_replayed'] == 3  # document + embedding commits, then the delete
+    
+    restored = DocMemoryCore(str(target))
+    try:
+        assert not (target / "index").exists()  # consumed by the load
+        assert restored.get_document_count() == 3
+        assert restored.faiss_index.ntotal == 3
+        assert set(restored.id_to_index) == {first[1], first[2], later}
+        scores, indices = restored.faiss_index.search(random_vector(10).reshape(1, -1), 1)
+        assert restored.index_to_id[indices[0][0]] == later
+    finally:
+        restored.close()
+
+def test_restore_in_place_starts_new_timeline(tmp_path):
+    """An in-place restore keeps the replaced files and the old change log aside"""
+    system = DocMemoryAutoSystem(str(tmp_path / "storage"))
+    core = system.core_memory
+    manager = system.auto_save.backup_manager
+    core.store_document("kept", "Doc", "doc.txt", random_vector(0))
+    snapshot = manager.create_snapshot()
+    core.store_document("rolled back", "Doc", "doc.txt", random_vector(1))
+    timeline = manager.change_log.timeline
+    system.close()
+    
+    stats = manager.restore(snapshot_id=snapshot['id'])
+    assert (Path(stats['previous_files']) / "document_memories.db").exists()
+    assert (Path(stats['previous_files']) / "changelog").exists()
+    assert manager.change_log.timeline != timeline
+    
+    restored = DocMemoryCore(str(tmp_path / "storage"))
+    try:
+        assert restored.get_document_count() == 1
+        assert restored.faiss_index.ntotal == 1
+    finally:
+        restored.close()
+
+def test_change_log_segments(tmp_path):
+    log = ChangeLog(tmp_path / "changelog")
+    log.append([("INSERT INTO t VALUES (?, ?)", ("a", b"\x00\x01"))])
+    log.rotate()
+    log.append([("DELETE FROM t WHERE id = ?", ("a",))])
+    log.close()
+    
+    reopened = ChangeLog(tmp_path / "changelog")
+    assert reopened.seq == 2
+    assert reopened.timeline == log.timeline
+    records = list(reopened.read())
+    assert [record['seq'] for record in records] == [1, 2]
+    assert records[0]['statements'][0][1][1] == {'b64': 'AAE='}
+    assert [record['seq'] for record in reopened.read(after_seq=1)] == [2]
+    
+    assert reopened.prune(up_to_seq=1) == 1
+    assert [record['seq'] for record in reopened.read()] == [2]
+
+def test_api_restore_target_stays_under_restore_root(tmp_path, monkeypatch):
+    """Restore targets from the API resolve under RESTORE_ROOT and nowhere else"""
+    monkeypatch.setattr(settings, "RESTORE_ROOT", "")
+    with pytest.raises(HTTPException) as error:
+        restore_target("restored")
+    assert error.value.status_code == 403
+    
+    monkeypatch.setattr(settings, "RESTORE_ROOT", str(tmp_path / "restores"))
+    assert restore_target("nightly/copy") == (tmp_path / "restores" / "nightly" / "copy").resolve()
+    for target in ("/etc", "../outside", "nightly/../../outside", "."):
+        with pytest.raises(HTTPException) as error:
+            restore_target(target)
+        assert error.value.status_code == 400
@@ -0,0 +1,79 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for bulk export and import
+"""
+import json
+import numpy as np
+import pytest
+from src.corpus_transfer import export_corpus, import_corpus
+from src.docmemory_core import DocMemoryCore
+from tests.conftest import random_vector
+
+@pytest.fixture
+def source(tmp_path):
+    core = DocMemoryCore(str(tmp_path / "source"))
+    ids = [core.store_document(f"chunk {i}", "Doc", "doc.txt", random_vector(i), tags=["a"]) for i in range(5)]
+    # Identical content shares the first copy's embedding
+    ids.append(core.store_document("chunk 0", "Copy", "copy.txt", random_vector(99)))
+    core.register_file("filehash", ids[:2], source_file="doc.txt", title="Doc")
+    yield core, ids
+    core.close()
+
+@pytest.fixture
+def target(tmp_path):
+    core = DocMemoryCore(str(tmp_path / "target"))
+    yield core
+    core.close()
+
+def test_iter_rows_pages_by_key(source):
+    core, ids = source
+    batches = list(core.iter_rows(batch_size=4))
+    assert [len(batch) for batch in batches] == [4, 2]
+    assert [row['id'] for batch in batches for row in batch] == sorted(ids)
+    
+    rows = [row for batch in core.iter_rows(with_embeddings=True) for row in batch]
+    assert sum(row['embedding'] is None for row in rows) == 1
+
+def test_round_trip(source, target, tmp_path):
+    core, ids = source
+    manifest = export_corpus(core, tmp_path / "export", shard_size=4)
+    assert manifest['document_count'] == 6
+    assert manifest['vector_count'] == 5
+    assert len(manifest['shards']) == 2
+    assert np.load(tmp_path / "export" / "shard-00000.npy").dtype == np.float16
+    
+    stats = import_corpus(target, tmp_path / "export")
+    assert stats['documents_imported'] == 6
+    assert target.get_document_count() == 6
+    assert target.faiss_index.ntotal == 5
+    
+    doc = target.retrieve_document(ids[3])
+    assert doc.content == "chunk 3" and doc.tags == ["a"]
+    np.testing.assert_allclose(doc.embedding, random_vector(3), atol=1e-3)
+    assert target.retrieve_document(ids[5]).title == "Copy"
+    assert target.find_file("filehash") == ids[:2]
+    
+    _, indices = target.faiss_index.search(random_vector(4).reshape(1, -1), 1)
+    assert target.index_to_id[indices[0][0]] == ids[4]
+    
+    # Running it again finds every chunk already present
+    assert import_corpus(target, tmp_path / "export")['documents_skipped'] == 6
+    assert target.faiss_index.ntotal == 5
+
+def test_float32_export_is_exact(source, target, tmp_path):
+    core, ids = source
+    export_corpus(core, tmp_path / "export", dtype="float32")
+    import_corpus(target, tmp_path / "export")
+    query = "SELECT embedding FROM document_embeddings WHERE id = ?"
+    assert target.conn.execute(query, (ids[2],)).fetchone()[0] == core.conn.execute(query, (ids[2],)).fetchone()[0]
+
+def test_parquet_round_trip(source, target, tmp_path):
+    pytest.importorskip("pyarrow")
+    core, ids = source
+    export_corpus(core, tmp_path / "export", format="parquet")
+    with open(tmp_path / "export" / "manifest.json") as f:
+        assert json.load(f)['shards'][0]['metadata'] == "shard-00000.parquet"
+    import_corpus(target, tmp_path / "export")
+    assert target.get_document_count() == 6
@@ -0,0 +1,95 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for resumable directory ingestion
+"""
+import os
+import pytest
+
+@pytest.fixture
+def ingestor(ingestor):
+    """The shared ingestor with two files per batch, so a small share spans several batches"""
+    ingestor.batch_size = 2
+    return ingestor
+
+@pytest.fixture
+def share(tmp_path):
+    """A small document share with a nested folder and an unsupported file"""
+    root = tmp_path / "share"
+    (root / "nested").mkdir(parents=True)
+    for i in range(3):
+        (root / f"doc{i}.txt").write_text(f"Document {i} talks about subject {i}. " * 20)
+    (root / "nested" / "deep.txt").write_text("A nested document. " * 20)
+    (root / "data.bin").write_bytes(b"\x00\x01")
+    return root
+
+def test_ingest_walks_supported_files(ingestor, share):
+    """Every supported file is ingested and checkpointed"""
+    stats = ingestor.ingest(str(share))
+    
+    assert stats.files_total == stats.files_added == 4
+    assert stats.files_failed == 0
+    checkpoint = ingestor.get_checkpoint((share / "nested" / "deep.txt").resolve())
+    assert checkpoint['document_ids']
+
+def test_rerun_skips_unchanged_and_updates_changed(ingestor, share, embedding_model):
+    """A second run only touches files whose content changed"""
+    ingestor.ingest(str(share))
+    encoded_before = len(embedding_model.encoded)
+    
+    # Touching a file without changing it does not re-ingest it
+    os.utime(share / "doc0.txt", ns=(1, 1))
+    (share / "doc1.txt").write_text("Document 1 was rewritten entirely. " * 20)
+    stats = ingestor.ingest(str(share))
+    
+    assert stats.files_unchanged == 3
+    assert stats.files_updated == 1
+    assert stats.files_added == 0
+    assert len(embedding_model.encoded) > encoded_before
+
+def test_interrupted_run_resumes(ingestor, share, embedding_model):
+    """Files checkpointed before an interruption are not processed again"""
+    paths = ingestor.scan(str(share))
+    ingestor.ingest_paths(paths[:2])
+    encoded_before = len(embedding_model.encoded)
+    
+    stats = ingestor.ingest(str(share))
+    
+    assert stats.files_unchanged == 2
+    assert stats.files_added == 2
+    assert stats.files_done == stats.files_total == 4
+    assert len(embedding_model.encoded) > encoded_before
+
+def test_watched_copy_of_an_upload_keeps_the_upload(ingestor, share, tmp_path):
+    """Editing or deleting a watched file never touches the upload it deduplicated onto"""
+    core = ingestor.core_memory
+    upload = tmp_path / "upload.txt"
+    upload.write_text("Quarterly figures shared by upload. " * 20)
+    upload_ids = ingestor.pipeline.process_and_store_document(str(upload))
+    
+    copy = share / "copy.txt"
+    copy.write_text(upload.read_text())
+    ingestor.ingest(str(share))
+    assert ingestor.get_checkpoint(copy.resolve())['document_ids'] == upload_ids
+    
+    # An edit forks new chunks instead of rewriting the upload's
+    copy.write_text("The copy was edited afterwards. " * 20)
+    ingestor.ingest(str(share))
+    copy_ids = ingestor.get_checkpoint(copy.resolve())['document_ids']
+    assert not set(copy_ids) & set(upload_ids)
+    assert core.retrieve_document(upload_ids[0]).content.startswith("Quarterly figures")
+    
+    # Deleting the edited copy removes only its own chunks
+    copy.unlink()
+    ingestor.prune(str(share))
+    assert core.retrieve_document(copy_ids[0]) is None
+    assert core.find_file(ingestor.pipeline.processor.compute_file_hash(str(upload))) == upload_ids
+    
+    # Deleting an unedited copy keeps the upload's chunks and their vectors
+    copy.write_text(upload.read_text())
+    ingestor.ingest(str(share))
+    copy.unlink()
+    assert ingestor.prune(str(share)) == 1
+    assert all(core.retrieve_document(doc_id) for doc_id in upload_ids)
+    assert all(doc_id in core.id_to_index for doc_id in upload_ids)
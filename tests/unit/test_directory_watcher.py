@@ -0,0 +1,103 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for the directory watcher
+"""
+import threading
+import time
+import pytest
+from src.directory_watcher import DirectoryWatcher, InotifyBackend, EVENT_CHANGED
+
+def run_until(watcher, condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        watcher.run_once(0.05)
+        if condition():
+            return
+    raise AssertionError("watcher did not catch up")
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_watcher_indexes_changes_and_deletes(tmp_path, ingestor, use_inotify):
+    """Created, modified and deleted files are reflected in the store"""
+    if use_inotify:
+        try:
+            InotifyBackend([str(tmp_path)]).close()
+        except OSError:
+            pytest.skip("inotify not available")
+    
+    watcher = DirectoryWatcher(ingestor, [str(tmp_path)], debounce=0.1, poll_interval=0.05,
+                               use_inotify=use_inotify)
+    core = ingestor.core_memory
+    path = tmp_path / "notes.txt"
+    
+    path.write_text("Watched folders are indexed continuously. " * 20)
+    run_until(watcher, lambda: ingestor.get_checkpoint(path.resolve()) is not None)
+    first_ids = ingestor.get_checkpoint(path.resolve())['document_ids']
+    assert core.get_document_count() == len(first_ids)
+    
+    path.write_text("The notes were edited. " * 20)
+    run_until(watcher, lambda: ingestor.get_checkpoint(path.resolve())['document_ids'] != first_ids)
+    
+    path.unlink()
+    run_until(watcher, lambda: ingestor.get_checkpoint(path.resolve()) is None)
+    assert core.get_document_count() == 0
+    watcher.stop()
+
+def test_bursts_are_coalesced_into_one_batch(tmp_path, ingestor):
+    """Repeated events for many files are flushed together once things go quiet"""
+    watcher = DirectoryWatcher(ingestor, [str(tmp_path)], debounce=60, use_inotify=False)
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"copy{i}.txt"
+        path.write_text(f"Bulk copied file {i}. " * 20)
+        paths.append(path)
+    
+    for _ in range(3):
+        watcher.add_events([(EVENT_CHANGED, str(path)) for path in paths])
+    assert len(watcher.pending) == 5
+    assert not watcher.flush_due()
+    
+    watcher.flush()
+    assert watcher.batches_flushed == 1
+    assert all(ingestor.get_checkpoint(path.resolve()) for path in paths)
+    watcher.stop()
+
+def test_start_syncs_on_the_watcher_thread(tmp_path, ingestor, monkeypatch):
+    """start() returns at once; the initial sync runs in the background"""
+    (tmp_path / "existing.txt").write_text("Indexed by the initial sync. " * 20)
+    release = threading.Event()
+    ingest = ingestor.ingest
+    monkeypatch.setattr(ingestor, "ingest", lambda root: release.wait(5) and ingest(root))
+    watcher = DirectoryWatcher(ingestor, [str(tmp_path)], debounce=0.1, use_inotify=False)
+    
+    watcher.start()
+    assert ingestor.get_checkpoint((tmp_path / "existing.txt").resolve()) is None
+    release.set()
+    deadline = time.monotonic() + 10
+    while ingestor.get_checkpoint((tmp_path / "existing.txt").resolve()) is None:
+        assert time.monotonic() < deadline, "initial sync did not run"
+        time.sleep(0.05)
+    watcher.stop()
+
+def test_failed_batch_is_retried(tmp_path, ingestor, monkeypatch):
+    """A batch that raises stays pending instead of being dropped"""
+    watcher = DirectoryWatcher(ingestor, [str(tmp_path)], debounce=60, use_inotify=False)
+    path = tmp_path / "retry.txt"
+    path.write_text("Indexed on the second attempt. " * 20)
+    ingest_paths = ingestor.ingest_paths
+    
+    def fail_once(paths):
+        monkeypatch.setattr(ingestor, "ingest_paths", ingest_paths)
+        raise RuntimeError("database is locked")
+    
+    monkeypatch.setattr(ingestor, "ingest_paths", fail_once)
+    watcher.add_events([(EVENT_CHANGED, str(path))])
+    with pytest.raises(RuntimeError):
+        watcher.flush()
+    assert watcher.pending == {str(path): EVENT_CHANGED} and watcher.failed_batches == 1
+    
+    watcher.flush()
+    assert not watcher.pending and watcher.batches_flushed == 1
+    assert ingestor.get_checkpoint(path.resolve()) is not None
+    watcher.stop()
@@ -0,0 +1,81 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for core memory storage
+"""
+import sqlite3
+import numpy as np
+from src.docmemory_core import DocMemoryCore, compute_content_hash
+
+def test_reupload_returns_existing_ids_without_embedding(tmp_path, pipeline, embedding_model):
+    """Identical file content is short-circuited by its SHA-256"""
+    first = tmp_path / "report.txt"
+    first.write_text("Quarterly report. Revenue grew.", encoding="utf-8")
+    doc_ids = pipeline.process_and_store_document(str(first))
+    
+    copy = tmp_path / "report-copy.txt"
+    copy.write_bytes(first.read_bytes())
+    embedding_model.encoded.clear()
+    
+    assert pipeline.process_and_store_document(str(copy)) == doc_ids
+    assert embedding_model.encoded == []
+    assert pipeline.docmemory_system.core_memory.get_document_count() == len(doc_ids)
+
+def test_identical_chunks_share_one_embedding(tmp_path, pipeline, embedding_model):
+    """Identical chunks in different files are embedded and indexed once"""
+    (tmp_path / "a.txt").write_text("Shared boilerplate paragraph.", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("Shared boilerplate paragraph.\n", encoding="utf-8")
+    
+    [first_id] = pipeline.process_and_store_document(str(tmp_path / "a.txt"))
+    [second_id] = pipeline.process_and_store_document(str(tmp_path / "b.txt"))
+    
+    core = pipeline.docmemory_system.core_memory
+    assert first_id != second_id
+    assert embedding_model.encoded == ["Shared boilerplate paragraph."]
+    assert core.faiss_index.ntotal == 1
+    
+    core.document_memories.clear()
+    shared = core.retrieve_document(second_id)
+    assert np.allclose(shared.embedding, core.retrieve_document(first_id).embedding)
+    
+    # Deleting the owner hands the embedding and vector over to the other chunk
+    core.delete_document(first_id)
+    core.document_memories.clear()
+    assert core.index_to_id[core.id_to_index[second_id]] == second_id
+    assert np.linalg.norm(core.retrieve_document(second_id).embedding) > 0
+
+def test_deleted_chunks_invalidate_file_fingerprint(tmp_path, pipeline):
+    """A file whose chunks were deleted is ingested again"""
+    path = tmp_path / "note.txt"
+    path.write_text("A short note.", encoding="utf-8")
+    [doc_id] = pipeline.process_and_store_document(str(path))
+    
+    pipeline.docmemory_system.core_memory.delete_document(doc_id)
+    
+    [new_id] = pipeline.process_and_store_document(str(path))
+    assert new_id != doc_id
+
+def test_content_hash_column_is_backfilled(tmp_path):
+    """Databases created before content hashing get the column and index"""
+    storage = tmp_path / "legacy"
+    storage.mkdir()
+    conn = sqlite3.connect(storage / "document_memories.db")
+    conn.execute('''
+        CREATE TABLE document_memories (
+            id TEXT PRIMARY KEY, title TEXT NOT NULL, content TEXT, source_file TEXT,
+            timestamp TEXT, document_type TEXT, tags TEXT, relationships TEXT,
+            metadata TEXT, summary TEXT, page_numbers TEXT
+        )
+    ''')
+    conn.execute("INSERT INTO document_memories (id, title, content) VALUES ('old', 'Old', 'legacy text')")
+    conn.commit()
+    conn.close()
+    
+    core = DocMemoryCore(str(storage))
+    row = core.conn.execute("SELECT content_hash FROM document_memories WHERE id = 'old'").fetchone()
+    indexes = [row['name'] for row in core.conn.execute("PRAGMA index_list(document_memories)")]
+    core.close()
+    
+    assert row['content_hash'] == compute_content_hash("legacy text")
+    assert 'idx_document_memories_content_hash' in indexes
@@ -0,0 +1,158 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for the document processing pipeline
+"""
+import csv
+from src.document_processor import DocumentProcessor
+from src.search_engine import SemanticSearchEngine
+
+PARAGRAPHS = [
+    f"Paragraph {i} explains topic number {i} in enough detail to fill a chunk. " * 12
+    for i in range(4)
+]
+
+def write_paragraphs(path, paragraphs):
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+    return str(path)
+
+def test_chunks_carry_content_hash(tmp_path):
+    """Each chunk is fingerprinted by its content"""
+    processor = DocumentProcessor()
+    chunks = processor.process_document(write_paragraphs(tmp_path / "doc.txt", PARAGRAPHS))
+    
+    assert chunks
+    for chunk in chunks:
+        assert chunk.metadata['content_hash'] == DocumentProcessor.compute_content_hash(chunk.content)
+
+def test_update_document_only_embeds_changed_chunks(tmp_path, pipeline, embedding_model):
+    """Unchanged chunks keep their IDs, edited chunks are re-embedded, removed ones deleted"""
+    file_path = write_paragraphs(tmp_path / "manual.txt", PARAGRAPHS)
+    doc_ids = pipeline.process_and_store_document(file_path, title="Manual", tags=["manual"])
+    assert len(doc_ids) > 2
+    
+    original_chunks = pipeline.processor.process_document(file_path, "Manual")
+    edited = original_chunks[-1].content.replace("topic", "subject")
+    write_paragraphs(tmp_path / "manual.txt", [chunk.content for chunk in original_chunks[1:-1]] + [edited])
+    
+    embedding_model.encoded.clear()
+    result = pipeline.update_document(file_path, doc_ids)
+    
+    assert result['success']
+    assert result['removed'] == 2
+    assert result['added'] == 1
+    assert result['kept'] == len(doc_ids) - 2
+    assert result['document_ids'][:-1] == doc_ids[1:-1]
+    assert embedding_model.encoded == [edited]
+    
+    core = pipeline.docmemory_system.core_memory
+    assert core.retrieve_document(doc_ids[0]) is None
+    assert doc_ids[0] not in core.id_to_index
+    
+    new_doc = core.retrieve_document(result['document_ids'][-1])
+    assert new_doc.title == "Manual"
+    assert new_doc.tags == ["manual"]
+
+def test_update_document_reports_failure(tmp_path, pipeline):
+    """A file that cannot be processed leaves the stored chunks untouched"""
+    result = pipeline.update_document(str(tmp_path / "missing.xyz"), ["some-id"])
+    
+    assert not result['success']
+    assert result['document_ids'] == ["some-id"]
+
+def test_deleted_chunks_do_not_take_semantic_search_slots(tmp_path, pipeline, embedding_model):
+    """Orphaned vectors are over-fetched around and removed once compaction triggers"""
+    core = pipeline.docmemory_system.core_memory
+    core.min_orphans_before_compaction = 3
+    doc_ids = []
+    for i in range(6):
+        path = tmp_path / f"note{i}.txt"
+        path.write_text(f"Standalone note number {i}.", encoding="utf-8")
+        doc_ids += pipeline.process_and_store_document(str(path))
+    
+    query = embedding_model.encode(["Standalone note number 0."])[0]
+    for doc_id in doc_ids[:2]:
+        core.delete_document(doc_id)
+    assert core.orphaned_vectors == 2
+    
+    engine = SemanticSearchEngine(core)
+    results = engine.semantic_search(query, limit=4, rerank=False)
+    assert len(results) == 4
+    assert doc_ids[0] not in [doc.id for doc, _ in results]
+    
+    core.delete_document(doc_ids[2])
+    assert core.orphaned_vectors == 0
+    assert core.faiss_index.ntotal == 3
+    assert sorted(core.id_to_index) == sorted(doc_ids[3:])
+    assert len(engine.semantic_search(query, limit=10, rerank=False)) == 3
+
+def test_batch_process_documents_dedups_and_reports_per_file(tmp_path, pipeline):
+    """Batches store each distinct file once and report a result for every file"""
+    stored_before = write_paragraphs(tmp_path / "stored.txt", PARAGRAPHS[:1])
+    stored_ids = pipeline.process_and_store_document(stored_before)
+    
+    first = write_paragraphs(tmp_path / "first.txt", PARAGRAPHS[1:3])
+    copy = write_paragraphs(tmp_path / "copy.txt", PARAGRAPHS[1:3])
+    again = write_paragraphs(tmp_path / "again.txt", PARAGRAPHS[:1])
+    other = write_paragraphs(tmp_path / "other.txt", PARAGRAPHS[3:])
+    missing = str(tmp_path / "missing.txt")
+    
+    reported = {}
+    progress = []
+    results = pipeline.batch_process_documents(
+        [first, copy, again, other, missing],
+        max_workers=3,
+        progress_callback=lambda stored, total: progress.append((stored, total)),
+        file_callback=lambda path, ids, error: reported.setdefault(path, (ids, error))
+    )
+    
+    assert set(results) == set(reported) == {first, copy, again, other, missing}
+    assert results[copy] == results[first] and results[first]
+    assert results[again] == stored_ids
+    assert results[missing] == [] and reported[missing][1]
+    assert progress[-1] == (len(results[first]) + len(results[other]),) * 2
+
+def test_csv_is_chunked_by_row_groups(tmp_path):
+    """CSV chunks repeat the header, stay within the token budget and record row ranges"""
+    processor = DocumentProcessor()
+    processor.max_chunk_tokens = 40
+    rows = [f"{i},customer {i},{i * 10}" for i in range(1, 51)]
+    path = tmp_path / "export.csv"
+    path.write_text("id,name,amount\n" + "\n".join(rows) + "\n", encoding="utf-8")
+    
+    chunks = processor.process_document(str(path))
+    
+    assert len(chunks) > 1
+    covered = []
+    for chunk in chunks:
+        lines = chunk.content.split("\n")
+        assert lines[0] == "id,name,amount"
+        assert processor.estimate_tokens(chunk.content) <= processor.max_chunk_tokens + len(lines)
+        assert lines[1:] == rows[chunk.metadata['row_start'] - 1:chunk.metadata['row_end']]
+        covered.extend(range(chunk.metadata['row_start'], chunk.metadata['row_end'] + 1))
+        assert chunk.metadata['document_type'] == 'csv'
+    assert covered == list(range(1, 51))
+
+def test_csv_keeps_quoted_cells_and_counts_blank_rows(tmp_path):
+    """Cells with commas stay quoted and row ranges count blank rows"""
+    processor = DocumentProcessor()
+    path = tmp_path / "contacts.csv"
+    path.write_text('name,address\n'
+                    'Ada,"12 Main St, Springfield"\n'
+                    '\n'
+                    'Grace,"Navy Yard, ""Building 7"""\n', encoding="utf-8")
+    
+    chunks = processor.process_document(str(path))
+    assert len(chunks) == 1
+    lines = chunks[0].content.split("\n")
+    assert lines == ['name,address', 'Ada,"12 Main St, Springfield"', 'Grace,"Navy Yard, ""Building 7"""']
+    assert list(csv.reader(lines)) == [
+        ['name', 'address'], ['Ada', '12 Main St, Springfield'], ['Grace', 'Navy Yard, "Building 7"']
+    ]
+    assert (chunks[0].metadata['row_start'], chunks[0].metadata['row_end']) == (1, 3)
+    
+    # One row per chunk: the row after the blank line is row 3
+    processor.max_chunk_tokens = 12
+    ranges = [(chunk.metadata['row_start'], chunk.metadata['row_end']) for chunk in processor.process_document(str(path))]
+    assert ranges == [(1, 1), (3, 3)]
@@ -0,0 +1,77 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for the persistent embedding cache
+"""
+import numpy as np
+from src.embedding_cache import EmbeddingCache, CachedEmbeddingModel
+
+def test_cached_model_encodes_each_text_once(tmp_path, embedding_model):
+    """Cached texts are served in bulk and only misses reach the model"""
+    cache = EmbeddingCache(tmp_path / "cache.db")
+    model = CachedEmbeddingModel(embedding_model, cache, "test-model")
+    
+    first = model.encode(["alpha", "beta"])
+    embedding_model.encoded.clear()
+    second = model.encode(["beta", "gamma", "alpha", "gamma"])
+    
+    assert embedding_model.encoded == ["gamma"]
+    assert np.allclose(second[0], first[1])
+    assert np.allclose(second[2], first[0])
+    assert np.allclose(second[1], second[3])
+    assert model.hits == 2 and model.misses == 4
+
+def test_cache_persists_and_is_keyed_by_model(tmp_path, embedding_model):
+    """Entries survive a reopen and are not shared between models"""
+    cache = EmbeddingCache(tmp_path / "cache.db")
+    CachedEmbeddingModel(embedding_model, cache, "model-a").encode(["persisted"])
+    cache.close()
+    
+    reopened = EmbeddingCache(tmp_path / "cache.db")
+    embedding_model.encoded.clear()
+    CachedEmbeddingModel(embedding_model, reopened, "model-a").encode(["persisted"])
+    assert embedding_model.encoded == []
+    
+    CachedEmbeddingModel(embedding_model, reopened, "model-b").encode(["persisted"])
+    assert embedding_model.encoded == ["persisted"]
+
+def test_cache_evicts_least_recently_used(tmp_path, embedding_model):
+    """The cache never grows beyond max_entries"""
+    cache = EmbeddingCache(tmp_path / "cache.db", max_entries=2)
+    model = CachedEmbeddingModel(embedding_model, cache, "test-model")
+    
+    model.encode(["one"])
+    model.encode(["two"])
+    model.encode(["one"])  # refresh "one"
+    model.encode(["three"])
+    
+    assert len(cache) == 2
+    embedding_model.encoded.clear()
+    model.encode(["one", "three", "two"])
+    assert embedding_model.encoded == ["two"]
+
+def test_reads_batch_recency_updates(tmp_path, embedding_model):
+    """Cache hits write nothing until enough uses are pending, and close flushes the rest"""
+    cache = EmbeddingCache(tmp_path / "cache.db", max_entries=2, flush_every=2)
+    model = CachedEmbeddingModel(embedding_model, cache, "test-model")
+    model.encode(["one", "two"])
+    
+    changes = cache.conn.total_changes
+    model.encode(["one"])
+    model.encode(["one"])
+    assert cache.conn.total_changes == changes
+    assert cache.pending_uses == {("test-model", cache.hash_text("one")): cache.clock}
+    
+    model.encode(["two", "one"])
+    model.encode(["one"])
+    assert cache.conn.total_changes == changes + 2 and len(cache.pending_uses) == 1
+    cache.close()
+    
+    # The last read of "one" survived the reopen, so "two" is evicted first
+    reopened = EmbeddingCache(tmp_path / "cache.db", max_entries=2)
+    model = CachedEmbeddingModel(embedding_model, reopened, "test-model")
+    model.encode(["three"])
+    embedding_model.encoded.clear()
+    model.encode(["one", "two"])
+    assert embedding_model.encoded == ["two"]
@@ -0,0 +1,79 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for the micro-batching embedding scheduler
+"""
+import asyncio
+import threading
+import numpy as np
+from src.embedding_scheduler import EmbeddingScheduler, PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+class RecordingModel:
+    """Wraps a model and records the size of every encode batch"""
+    
+    def __init__(self, model, gate: threading.Event = None):
+        self.model = model
+        self.gate = gate
+        self.batches = []
+    
+    def encode(self, sentences, **kwargs):
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        self.batches.append(list(sentences))
+        return self.model.encode(sentences)
+
+def test_concurrent_requests_share_one_batch(embedding_model):
+    """Requests arriving within the wait window run as one encode call"""
+    model = RecordingModel(embedding_model)
+    scheduler = EmbeddingScheduler(model, max_batch_size=32, max_wait_ms=200)
+    try:
+        futures = [scheduler.submit([f"query {i}"], PRIORITY_INTERACTIVE) for i in range(5)]
+        results = [future.result(timeout=5) for future in futures]
+    finally:
+        scheduler.shutdown()
+    
+    assert len(model.batches) == 1
+    for i, result in enumerate(results):
+        assert np.allclose(result[0], embedding_model.encode([f"query {i}"])[0])
+
+def test_large_requests_are_split_and_reassembled(embedding_model):
+    """A request bigger than max_batch_size is encoded in pieces, in order"""
+    model = RecordingModel(embedding_model)
+    scheduler = EmbeddingScheduler(model, max_batch_size=4, max_wait_ms=1)
+    texts = [f"chunk {i}" for i in range(10)]
+    try:
+        result = scheduler.lane(PRIORITY_BULK).encode(texts)
+    finally:
+        scheduler.shutdown()
+    
+    assert max(len(batch) for batch in model.batches) <= 4
+    assert np.allclose(result, embedding_model.encode(texts))
+
+def test_interactive_lane_goes_first(embedding_model):
+    """Queued queries are batched before queued bulk ingestion"""
+    gate = threading.Event()
+    model = RecordingModel(embedding_model, gate)
+    scheduler = EmbeddingScheduler(model, max_batch_size=2, max_wait_ms=1)
+    try:
+        blocker = scheduler.submit(["in flight"], PRIORITY_BULK)
+        while scheduler.pending_texts:
+            pass
+        bulk = scheduler.submit(["bulk 1", "bulk 2", "bulk 3", "bulk 4"], PRIORITY_BULK)
+        query = scheduler.submit(["query"], PRIORITY_INTERACTIVE)
+        gate.set()
+        blocker.result(timeout=5), bulk.result(timeout=5), query.result(timeout=5)
+    finally:
+        scheduler.shutdown()
+    
+    assert model.batches[1][0] == "query"
+
+def test_encode_async(embedding_model):
+    """Results can be awaited from an event loop"""
+    scheduler = EmbeddingScheduler(embedding_model, max_wait_ms=1)
+    try:
+        result = asyncio.run(scheduler.encode_async(["async query"]))
+    finally:
+        scheduler.shutdown()
+    
+    assert result.shape == (1, 384)
@@ -0,0 +1,91 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for the bounded request executors
+"""
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from backend.core.executors import BoundedExecutor, drained
+
+def test_overload_is_rejected_with_503():
+    """Calls beyond workers plus queue limit are rejected instead of queued"""
+    executor = BoundedExecutor("search", max_workers=1, max_queue=1)
+    release = threading.Event()
+    
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert executor.stats()["queued"] == 1
+        
+        with pytest.raises(HTTPException) as error:
+            await executor.run(lambda: "rejected")
+        assert error.value.status_code == 503
+        
+        release.set()
+        assert await running is True
+        assert await queued == "queued"
+        return await executor.run(lambda: "accepted")
+    
+    assert asyncio.run(scenario()) == "accepted"
+    assert executor.stats()["in_flight"] == 0
+    assert executor.stats()["rejected"] == 1
+
+def test_blocking_calls_do_not_block_the_event_loop():
+    """Work runs on the pool while the event loop keeps serving other tasks"""
+    executor = BoundedExecutor("ingest", max_workers=1, max_queue=0)
+    release = threading.Event()
+    
+    async def scenario():
+        blocked = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+        ticks = 0
+        for _ in range(3):
+            await asyncio.sleep(0)
+            ticks += 1
+        release.set()
+        await blocked
+        return ticks
+    
+    assert asyncio.run(scenario()) == 3
+
+def test_drain_waits_for_running_calls_and_rejects_new_ones():
+    """Maintenance starts only after in-flight calls finish; new calls get 503 meanwhile"""
+    search = BoundedExecutor("search", max_workers=2, max_queue=2)
+    ingest = BoundedExecutor("ingest", max_workers=1, max_queue=1)
+    release = threading.Event()
+    events = []
+    
+    def slow_search():
+        release.wait(5)
+        events.append("search finished")
+    
+    async def scenario():
+        running = asyncio.ensure_future(search.run(slow_search))
+        await asyncio.sleep(0.05)
+        
+        async def maintenance():
+            async with drained(search, ingest):
+                events.append("maintenance")
+        
+        drain = asyncio.ensure_future(maintenance())
+        await asyncio.sleep(0.05)
+        for executor in (search, ingest):
+            with pytest.raises(HTTPException) as error:
+                await executor.run(lambda: "rejected")
+            assert error.value.status_code == 503
+        with pytest.raises(HTTPException) as error:
+            async with drained(ingest):
+                pass
+        assert error.value.status_code == 409
+        
+        release.set()
+        await running
+        await drain
+        return await search.run(lambda: "accepted")
+    
+    assert asyncio.run(scenario()) == "accepted"
+    assert events == ["search finished", "maintenance"]
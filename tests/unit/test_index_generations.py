@@ -0,0 +1,189 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for published index generations
+"""
+import sqlite3
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from main import DocMemorySystem, MockEmbeddingModel
+from backend.main import app
+from backend.core.dependencies import get_docmemory_system
+from src.auto_save_load import DocMemoryAutoSystem
+from src.index_generations import ROLE_READER, ROLE_WRITER, GenerationReader, IndexPublisher, MappedIndex, read_current
+from src.search_engine import SemanticSearchEngine
+
+def random_vectors(count, dim=384, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+@pytest.fixture
+def reader_system(docmemory):
+    """Read-only system sharing the writer's storage"""
+    system = DocMemoryAutoSystem(str(docmemory.core_memory.storage_path), read_only=True)
+    yield system
+    system.core_memory.close()
+
+def test_mapped_index_matches_faiss():
+    """The mapped index returns the same neighbours and scores as IndexFlatIP"""
+    import faiss
+    vectors = random_vectors(200)
+    queries = random_vectors(3, seed=1)
+    flat = faiss.IndexFlatIP(384)
+    flat.add(vectors)
+    
+    expected_scores, expected_indices = flat.search(queries, 10)
+    scores, indices = MappedIndex(vectors).search(queries, 10)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+    
+    # Split into segments, positions and scores are unchanged
+    scores, indices = MappedIndex([vectors[:120], vectors[120:190], vectors[190:]]).search(queries, 10)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+    np.testing.assert_array_equal(MappedIndex([vectors[:120], vectors[120:]]).reconstruct_n(110, 20), vectors[110:130])
+    
+    # Asking for more neighbours than vectors pads with -1
+    _, indices = MappedIndex(vectors[:2]).search(queries[:1], 5)
+    assert list(indices[0][2:]) == [-1, -1, -1]
+    _, indices = MappedIndex([], dim=384).search(queries[:1], 2)
+    assert list(indices[0]) == [-1, -1]
+
+def test_reader_follows_published_generations(docmemory, reader_system, tmp_path):
+    """A reader maps the writer's index and swaps to each new generation"""
+    writer = docmemory.core_memory
+    directory = tmp_path / "generations"
+    vectors = random_vectors(3)
+    doc_ids = [writer.store_document(f"chunk {i}", "Doc", "doc.txt", vectors[i]) for i in range(3)]
+    
+    publisher = IndexPublisher(writer, directory)
+    assert publisher.publish() == 1
+    assert publisher.publish() is None  # unchanged
+    
+    reader = GenerationReader(reader_system.core_memory, directory)
+    assert reader_system.core_memory.faiss_index.ntotal == 0
+    assert reader.refresh()
+    assert not reader.refresh()
+    
+    engine = SemanticSearchEngine(reader_system.core_memory)
+    results = engine.semantic_search(vectors[1], limit=1, rerank=False)
+    assert results[0][0].id == doc_ids[1]
+    
+    # Deleting on the writer reaches the reader with the next generation
+    writer.delete_document(doc_ids[1])
+    assert publisher.publish() == 2
+    assert reader.refresh()
+    assert reader.generation == 2
+    results = engine.semantic_search(vectors[1], limit=3, rerank=False)
+    assert doc_ids[1] not in [doc.id for doc, _ in results]
+    assert read_current(directory)['count'] == 2
+
+def test_publish_copies_only_new_rows(docmemory, reader_system, tmp_path):
+    """Each generation appends a segment of the new rows; merges and compaction keep readers exact"""
+    writer = docmemory.core_memory
+    directory = tmp_path / "generations"
+    vectors = random_vectors(40)
+    doc_ids = [writer.store_document(f"chunk {i}", "Doc", "doc.txt", vectors[i]) for i in range(32)]
+    publisher = IndexPublisher(writer, directory, copy_batch=5)
+    publisher.publish()
+    reader = GenerationReader(reader_system.core_memory, directory)
+    engine = SemanticSearchEngine(reader_system.core_memory)
+    
+    copied = []
+    reconstruct_n = writer.faiss_index.reconstruct_n
+    writer.faiss_index.reconstruct_n = lambda start, count: copied.append(count) or reconstruct_n(start, count)
+    for i in range(32, 40):
+        doc_ids.append(writer.store_document(f"chunk {i}", "Doc", "doc.txt", vectors[i]))
+        publisher.publish()
+    # One row per generation, never the 32 already published
+    assert copied == [1] * 8
+    writer.faiss_index.reconstruct_n = reconstruct_n
+    
+    segments = read_current(directory)['segments']
+    assert sum(segment['count'] for segment in segments) == 40
+    assert len(segments) <= 4
+    assert [segment['start'] for segment in segments] == sorted(segment['start'] for segment in segments)
+    
+    # A deletion is published as an override of its position
+    writer.delete_document(doc_ids[3])
+    publisher.publish()
+    assert read_current(directory)['count'] == 39
+    assert reader.refresh()
+    assert reader_system.core_memory.faiss_index.ntotal == 40
+    assert reader_system.core_memory.orphaned_vectors == 1
+    results = engine.semantic_search(vectors[3], limit=40, rerank=False)
+    assert doc_ids[3] not in [doc.id for doc, _ in results]
+    for i in (0, 35, 39):
+        assert engine.semantic_search(vectors[i], limit=1, rerank=False)[0][0].id == doc_ids[i]
+    
+    # Compaction renumbers every row, so the next generation starts over in batches
+    writer.compact_index()
+    reconstruct_n = writer.faiss_index.reconstruct_n
+    writer.faiss_index.reconstruct_n = lambda start, count: copied.append(count) or reconstruct_n(start, count)
+    copied.clear()
+    publisher.publish()
+    assert copied == [5] * 7 + [4]
+    del writer.faiss_index.reconstruct_n
+    assert [segment['count'] for segment in read_current(directory)['segments']] == [39]
+    assert reader.refresh()
+    assert reader_system.core_memory.orphaned_vectors == 0
+    for i in (0, 4, 39):
+        assert engine.semantic_search(vectors[i], limit=1, rerank=False)[0][0].id == doc_ids[i]
+
+def test_old_generations_are_pruned(docmemory, tmp_path):
+    """Only files of the last few generations stay on disk"""
+    writer = docmemory.core_memory
+    directory = tmp_path / "generations"
+    publisher = IndexPublisher(writer, directory, keep=2)
+    for i, vector in enumerate(random_vectors(4)):
+        writer.store_document(f"chunk {i}", "Doc", "doc.txt", vector)
+        publisher.publish()
+    
+    names = {path.name for path in directory.iterdir()} - {"CURRENT"}
+    assert names == set().union(*publisher.history)
+    assert {"gen-00000003.overrides.json", "gen-00000004.overrides.json"} <= names
+    assert not any(name.startswith("gen-00000002") for name in names)
+    for segment in read_current(directory)['segments']:
+        assert f"{segment['name']}.npy" in names
+    
+    # A restarted publisher continues the numbering
+    assert IndexPublisher(writer, directory).generation == 4
+
+def test_reader_process_never_writes(tmp_path):
+    """A search worker serves the writer's store without writing to its databases"""
+    storage = str(tmp_path / "storage")
+    writer = DocMemorySystem(storage, ingest_workers=0, preload_model=False, role=ROLE_WRITER,
+                             index_sync_interval=60, embedding_model=MockEmbeddingModel())
+    reader = None
+    try:
+        (tmp_path / "notes.txt").write_text("quarterly warehouse inventory")
+        writer.add_document_from_file(str(tmp_path / "notes.txt"))
+        writer.index_publisher.publish()
+        job_id = writer.enqueue_documents([{'path': str(tmp_path / "missing.txt")}])
+        reader = DocMemorySystem(storage, ingest_workers=0, preload_model=False, role=ROLE_READER,
+                                 index_sync_interval=60, embedding_model=MockEmbeddingModel())
+        
+        for _ in range(reader.search_system.query_log_flush_every + 1):
+            assert reader.search("warehouse inventory")
+        reader.search_system.flush_query_log()
+        assert writer.search_system.top_queries() == []
+        assert reader.processor.embedding_cache is None
+        assert reader.get_job(job_id)['status'] == "queued"
+        
+        core = reader.docmemory.core_memory
+        with pytest.raises(sqlite3.OperationalError):
+            core.conn.execute("DELETE FROM document_memories")
+        with pytest.raises(Exception, match="read-only"):
+            reader.enqueue_documents([{'path': str(tmp_path / "notes.txt")}])
+        
+        app.dependency_overrides[get_docmemory_system] = lambda: reader
+        response = TestClient(app).post("/api/documents/upload", files={"file": ("a.txt", b"text")})
+        assert response.status_code == 409
+        assert not any((core.storage_path / "uploads").iterdir())
+    finally:
+        app.dependency_overrides.clear()
+        if reader is not None:
+            reader.close()
+        writer.close()
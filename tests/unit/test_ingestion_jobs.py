@@ -0,0 +1,80 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for background ingestion jobs
+"""
+import time
+from src.ingestion_jobs import IngestionJobQueue, JOB_COMPLETED, JOB_QUEUED
+
+def wait_for(queue, job_id, status, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get_job(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job stayed {job['status']}")
+
+def spool(queue, text):
+    path = queue.new_upload_path('.txt')
+    path.write_text(text, encoding='utf-8')
+    return path
+
+def test_job_reports_chunk_progress(pipeline):
+    """A queued upload is ingested in the background and reports chunks processed"""
+    queue = IngestionJobQueue(pipeline.docmemory_system.core_memory, pipeline, workers=1, poll_interval=0.05)
+    path = spool(queue, "Background ingestion keeps the event loop free. " * 60)
+    
+    job_id = queue.enqueue([{'path': str(path), 'filename': 'notes.txt', 'tags': ['async']}])
+    queue.start()
+    try:
+        job = wait_for(queue, job_id, JOB_COMPLETED)
+    finally:
+        queue.stop()
+    
+    result = job['results']['notes.txt']
+    assert result['count'] > 1
+    assert job['chunks_processed'] == job['chunks_total'] == result['count']
+    assert job['files_processed'] == job['files_total'] == 1
+    assert not path.exists()
+
+def test_failed_file_leaves_no_spool(pipeline):
+    """A file that fails to ingest is reported and its spooled upload removed"""
+    queue = IngestionJobQueue(pipeline.docmemory_system.core_memory, pipeline, workers=1, poll_interval=0.05)
+    good = spool(queue, "This upload ingests fine.")
+    bad = queue.new_upload_path('.pdf')
+    bad.write_bytes(b"not a pdf")
+    
+    job_id = queue.enqueue([{'path': str(good), 'filename': 'good.txt'}, {'path': str(bad), 'filename': 'bad.pdf'}])
+    queue.start()
+    try:
+        job = wait_for(queue, job_id, JOB_COMPLETED)
+    finally:
+        queue.stop()
+    
+    assert job['results']['good.txt']['count'] == 1
+    assert job['results']['bad.pdf']['error']
+    assert not good.exists() and not bad.exists()
+
+def test_queued_jobs_resume_after_restart(pipeline):
+    """Jobs queued or running when the process stopped are picked up again"""
+    core = pipeline.docmemory_system.core_memory
+    first = IngestionJobQueue(core, pipeline, workers=0)
+    queued_id = first.enqueue([{'path': str(spool(first, "Queued before restart."))}])
+    running_id = first.enqueue([{'path': str(spool(first, "Interrupted mid-run."))}])
+    first._claim_next_job()
+    assert first.get_job(queued_id)['status'] != JOB_QUEUED
+    
+    restarted = IngestionJobQueue(core, pipeline, workers=1, poll_interval=0.05)
+    restarted.start()
+    try:
+        for job_id in (queued_id, running_id):
+            assert wait_for(restarted, job_id, JOB_COMPLETED)['results']
+    finally:
+        restarted.stop()
+
+def test_unknown_job(pipeline):
+    """Unknown job IDs return None"""
+    queue = IngestionJobQueue(pipeline.docmemory_system.core_memory, pipeline, workers=0)
+    assert queue.get_job("missing") is None
@@ -0,0 +1,82 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for memory footprint accounting
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from main import DocMemorySystem, MockEmbeddingModel
+from backend.main import app
+from backend.core.dependencies import get_docmemory_system
+from src.docmemory_core import DocMemoryCore
+from src.index_generations import MappedIndex
+from src.memory_accounting import sampled_bytes
+
+@pytest.fixture
+def system(tmp_path):
+    """Full system with a few stored chunks and no background workers"""
+    model = MockEmbeddingModel()
+    system = DocMemorySystem(str(tmp_path / "storage"), ingest_workers=0, preload_model=False,
+                             embedding_model=model)
+    core = system.docmemory.core_memory
+    texts = [f"warehouse inventory count {i}" for i in range(10)]
+    for text, embedding in zip(texts, model.encode(texts)):
+        core.store_document(text, "Inventory", "inventory.txt", embedding)
+    yield system
+    system.close()
+
+def test_sampled_bytes_extrapolates():
+    assert sampled_bytes(iter([]), 0) == 0
+    assert sampled_bytes(iter([b"x" * 100] * 1000), 1000, len, sample_size=8) == 100000
+
+def test_core_report(tmp_path):
+    core = DocMemoryCore(str(tmp_path / "storage"))
+    vectors = np.random.default_rng(0).standard_normal((20, 384)).astype(np.float32)
+    for i, vector in enumerate(vectors):
+        core.store_document(f"chunk {i} " * 50, "Doc", "doc.txt", vector)
+    core.document_memories.clear()
+    core.retrieve_document(core.index_to_id[0])
+    
+    report = core.memory_report()
+    components = report['components']
+    assert report['documents'] == report['vectors'] == 20
+    assert components['faiss_index'] == {'bytes': 20 * 384 * 4, 'vectors': 20, 'mapped': False}
+    assert components['id_mappings']['entries'] == 20
+    # Content, embedding and metadata of the one cached chunk
+    cache = components['document_cache']
+    assert cache['entries'] == 1 and cache['bytes'] > len("chunk 0 " * 50) + 384 * 4
+    assert components['sqlite_page_cache']['bytes'] <= components['sqlite_page_cache']['limit_bytes']
+    assert report['total_bytes'] == sum(component['bytes'] for component in components.values())
+    expected = (components['faiss_index']['bytes'] + components['id_mappings']['bytes']) / 20
+    assert report['bytes_per_chunk'] == pytest.approx(expected, abs=0.1)
+    
+    core.faiss_index = MappedIndex(vectors)
+    assert core.memory_report()['components']['faiss_index']['mapped'] is True
+    core.close()
+
+def test_system_report_and_projection(system):
+    model = system.memory_report()['components']['embedding_model']
+    assert not model['loaded'] and model['bytes'] == 0
+    
+    system.embedding_model.load()
+    report = system.memory_report(project_chunks=1000)
+    model = report['components']['embedding_model']
+    assert model['loaded'] and model['bytes'] > 0 and model['name'] == "MockEmbeddingModel"
+    assert report['unaccounted_bytes'] == report['rss_bytes'] - report['total_bytes']
+    
+    projection = report['projection']
+    assert projection['rss_bytes'] == round(report['rss_bytes'] + 990 * report['bytes_per_chunk'])
+    assert projection['rss_bytes_all_cached'] >= projection['rss_bytes']
+
+def test_memory_endpoint(system):
+    app.dependency_overrides[get_docmemory_system] = lambda: system
+    try:
+        client = TestClient(app)
+        body = client.get("/api/status/memory").json()
+        assert body['documents'] == 10 and 'projection' not in body
+        assert client.get("/api/status/memory", params={"project_chunks": 5000}).json()['projection']['chunks'] == 5000
+        assert client.get("/api/status/memory", params={"project_chunks": -1}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
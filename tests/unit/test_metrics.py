@@ -0,0 +1,75 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for metrics and the /metrics endpoint
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from main import DocMemorySystem
+from backend.main import app
+from src.metrics import MetricsRegistry, registry
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets are cumulative and labelled series are rendered separately"""
+    metrics = MetricsRegistry()
+    histogram = metrics.histogram("stage_seconds", "Stage time", ("format",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "pdf")
+    histogram.observe(0.5, "pdf")
+    histogram.observe(5.0, "pdf")
+    with histogram.time("txt"):
+        pass
+    metrics.gauge("queue_depth", "Queue depth", lambda: {"bulk": 3, "interactive": 0}, ("lane",))
+    
+    text = metrics.render()
+    assert 'stage_seconds_bucket{format="pdf",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{format="pdf",le="1.0"} 2' in text
+    assert 'stage_seconds_bucket{format="pdf",le="+Inf"} 3' in text
+    assert 'stage_seconds_sum{format="pdf"} 5.55' in text
+    assert 'stage_seconds_count{format="txt"} 1' in text
+    assert 'queue_depth{lane="bulk"} 3' in text
+    assert "# TYPE queue_depth gauge" in text
+
+def count(name, *labels):
+    return registry.get(name).snapshot().get(labels, {"count": 0})["count"]
+
+def test_search_records_stages_and_history(tmp_path, embedding_model):
+    """A search is timed per stage and kept in the search history"""
+    system = DocMemorySystem(str(tmp_path / "storage"), ingest_workers=0, preload_model=False)
+    try:
+        system.embedding_model._model = embedding_model
+        core = system.docmemory.core_memory
+        core.store_document("metrics for every stage", "Doc", "doc.txt", embedding_model.encode(["x"])[0])
+        before = {name: count(name) for name in ["docmemory_query_embedding_seconds",
+                                                 "docmemory_index_search_seconds",
+                                                 "docmemory_hydration_seconds",
+                                                 "docmemory_rerank_seconds",
+                                                 "docmemory_keyword_search_seconds"]}
+        
+        system.search("metrics", search_type="hybrid")
+        
+        for name, previous in before.items():
+            assert count(name) > previous, name
+        assert count("docmemory_search_seconds", "hybrid") >= 1
+        history = system.search_system.search_engine.search_history
+        assert history[-1]["query"] == "metrics" and history[-1]["results"] == 1
+        
+        text = TestClient(app).get("/metrics").text
+        assert 'docmemory_index_vectors{state="live"} 1' in text
+        assert "docmemory_sqlite_commit_seconds_count" in text
+        assert 'docmemory_executor_in_flight{executor="search"} 0' in text
+        assert "docmemory_process_resident_memory_bytes" in text
+    finally:
+        system.close()
+
+def test_search_history_is_bounded(tmp_path):
+    system = DocMemorySystem(str(tmp_path / "storage"), ingest_workers=0, preload_model=False)
+    try:
+        engine = system.search_system.search_engine
+        engine.max_search_history = 3
+        for i in range(5):
+            system.search(f"query {i}", search_type="keyword")
+        assert [entry["query"] for entry in engine.search_history] == ["query 2", "query 3", "query 4"]
+    finally:
+        system.close()
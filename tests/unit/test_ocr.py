@@ -0,0 +1,103 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for the OCR stage
+"""
+import pytest
+from src.document_processor import DocumentIngestionPipeline, DocumentProcessor
+from src.ocr import OCREngine
+
+def fake_ocr(data, lang):
+    """Stand-in for tesseract that can run in a worker process"""
+    return f"recognised {len(data)} bytes"
+
+class CountingOCR:
+    def __init__(self):
+        self.calls = []
+    
+    def __call__(self, data, lang):
+        self.calls.append(data)
+        return f"page text {data.decode()}"
+
+def test_pages_are_recognised_once(tmp_path):
+    """Identical page images are recognised once, also across engines sharing a cache"""
+    ocr = CountingOCR()
+    cache_path = tmp_path / "ocr_cache.db"
+    engine = OCREngine(cache_path, max_workers=0, ocr_function=ocr)
+    
+    assert engine.recognise([b"a", b"b", b"a"]) == ["page text a", "page text b", "page text a"]
+    assert engine.recognise([b"b"]) == ["page text b"]
+    assert ocr.calls == [b"a", b"b"]
+    engine.close()
+    
+    restarted = OCREngine(cache_path, max_workers=0, ocr_function=ocr)
+    assert restarted.recognise([b"a"]) == ["page text a"]
+    assert len(ocr.calls) == 2
+    restarted.close()
+
+def test_process_pool_recognises_pages():
+    """Pages are recognised on worker processes"""
+    engine = OCREngine(max_workers=2, ocr_function=fake_ocr)
+    try:
+        assert engine.recognise([b"x" * 3, b"y" * 5]) == ["recognised 3 bytes", "recognised 5 bytes"]
+        assert engine.pages_recognised == 2
+    finally:
+        engine.close()
+
+def test_only_pages_without_text_layer_are_ocred(tmp_path, monkeypatch):
+    """Scanned pages of a PDF are rasterized and recognised, text pages are kept"""
+    ocr = CountingOCR()
+    processor = DocumentProcessor()
+    processor.ocr_engine = OCREngine(max_workers=0, ocr_function=ocr)
+    text_page = "This page has a real text layer. " * 5
+    monkeypatch.setattr(processor, '_extract_pdf_pages', lambda path: [text_page, "  ", text_page])
+    rasterized = []
+    monkeypatch.setattr(processor.ocr_engine, 'rasterize_pdf_pages',
+                        lambda path, pages: rasterized.extend(pages) or {page: b"scan" for page in pages})
+    
+    text = processor._process_pdf(tmp_path / "scan.pdf")
+    
+    assert rasterized == [2]
+    assert text == "\n".join([text_page.strip(), "page text scan", text_page.strip()])
+
+def test_scanned_pages_are_rasterized_in_windows(tmp_path, monkeypatch):
+    """Each window of pages is recognised before the next one is rendered"""
+    engine = OCREngine(max_workers=0, ocr_function=lambda data, lang: data.decode(), page_window=2)
+    calls = []
+    monkeypatch.setattr(engine, 'rasterize_pdf_pages',
+                        lambda path, pages: calls.append(('rasterize', pages)) or {page: f"p{page}".encode() for page in pages})
+    recognise = engine.recognise
+    monkeypatch.setattr(engine, 'recognise', lambda images: calls.append(('recognise', len(images))) or recognise(images))
+    
+    texts = engine.recognise_pdf_pages(tmp_path / "scan.pdf", [1, 2, 4, 5, 7])
+    
+    assert texts == {1: "p1", 2: "p2", 4: "p4", 5: "p5", 7: "p7"}
+    assert calls == [('rasterize', [1, 2]), ('recognise', 2), ('rasterize', [4, 5]), ('recognise', 2),
+                     ('rasterize', [7]), ('recognise', 1)]
+
+def test_pipeline_creates_ocr_engine_on_first_use(docmemory):
+    """The OCR engine and its cache database only appear when a scan needs them"""
+    pipeline = DocumentIngestionPipeline(docmemory)
+    cache_path = docmemory.core_memory.storage_path / "ocr_cache.db"
+    assert pipeline.processor.ocr_engine is None and not cache_path.exists()
+    
+    engine = pipeline.processor.get_ocr_engine()
+    try:
+        assert engine is pipeline.processor.get_ocr_engine()
+        assert cache_path.exists()
+    finally:
+        engine.close()
+
+def test_images_are_supported(tmp_path):
+    """Image files are ingested through OCR"""
+    processor = DocumentProcessor()
+    processor.ocr_engine = OCREngine(max_workers=0, ocr_function=lambda data, lang: "Invoice number 42")
+    path = tmp_path / "invoice.png"
+    path.write_bytes(b"\x89PNG fake image")
+    
+    chunks = processor.process_document(str(path))
+    
+    assert '.png' in processor.supported_formats
+    assert [chunk.content for chunk in chunks] == ["Invoice number 42"]
+    assert chunks[0].metadata['document_type'] == 'png'
@@ -0,0 +1,48 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for the index recall benchmark
+"""
+import numpy as np
+from benchmarks.bench_recall import (
+    load_store_vectors, parse_config, recall_at_k, run, store_queries
+)
+from src.docmemory_core import DocMemoryCore
+
+def clustered_vectors(count=2000, dim=384, clusters=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + rng.standard_normal((count, dim)).astype(np.float32) * 0.3
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_parse_config():
+    assert parse_config("IVF64,Flat:nprobe=1,8") == ("IVF64,Flat", "nprobe", [1, 8])
+    assert parse_config("HNSW16,Flat") == ("HNSW16,Flat", None, [None])
+
+def test_recall_at_k():
+    exact = np.array([[1, 2, 3, 4], [5, 6, 7, 8]])
+    found = np.array([[4, 3, 9, -1], [5, 6, 7, 8]])
+    assert recall_at_k(found, exact) == 0.75
+
+def test_sweep_against_exact_search(tmp_path):
+    vectors = clustered_vectors()
+    queries = store_queries(vectors, 50)
+    rows = run(vectors, queries, [("IVF16,Flat", "nprobe", [1, 16])], k=10, workdir=tmp_path, train_size=2000)
+    
+    assert [row['config'] for row in rows] == ["Flat (current)", "IVF16,Flat nprobe=1", "IVF16,Flat nprobe=16"]
+    assert rows[0]['recall'] == 1.0
+    # Probing every list is exhaustive
+    assert rows[2]['recall'] == 1.0
+    assert rows[1]['recall'] <= rows[2]['recall']
+    assert all(row['index_bytes'] > 0 and row['queries_per_second'] > 0 for row in rows)
+
+def test_reads_store_embeddings(tmp_path):
+    core = DocMemoryCore(str(tmp_path / "storage"))
+    vectors = clustered_vectors(count=5)
+    for i, vector in enumerate(vectors):
+        core.store_document(f"chunk {i}", "Doc", "doc.txt", vector * 2)
+    core.close()
+    
+    loaded = load_store_vectors(tmp_path / "storage", tmp_path / "scratch")
+    np.testing.assert_allclose(loaded, vectors, atol=1e-6)
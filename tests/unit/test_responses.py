@@ -0,0 +1,60 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for JSON responses and compression
+"""
+import gzip
+import json
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from backend.core.responses import CompressionMiddleware, FastJSONResponse, choose_encoding, dumps
+
+def make_app():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    
+    @app.get("/large")
+    async def large():
+        return FastJSONResponse({"content": "document text " * 500, "score": np.float32(0.5)})
+    
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+    
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"x" * 2000 + b"\n", b"y\n"]), media_type="application/x-ndjson")
+    
+    return app
+
+def test_dumps_handles_numpy_and_matches_json():
+    payload = {"results": [{"id": "a", "score": 0.25, "tags": ["é"]}]}
+    assert json.loads(dumps(payload)) == payload
+    assert json.loads(dumps({"score": np.float32(0.5)})) == {"score": 0.5}
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+    assert choose_encoding("*") in ("br", "gzip")
+
+def test_large_responses_are_compressed():
+    """Bodies above the threshold are gzipped; small and streamed ones are not"""
+    client = TestClient(make_app())
+    
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json()["score"] == 0.5
+    
+    raw = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert len(gzip.compress(raw.content)) < len(raw.content)
+    
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in streamed.headers
+    assert streamed.text.endswith("y\n")
@@ -0,0 +1,85 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for streamed search responses
+"""
+import json
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from main import DocMemorySystem
+from backend.main import app
+from backend.core.dependencies import get_docmemory_system
+
+@pytest.fixture
+def system(tmp_path):
+    """Full system with a few stored chunks and no background workers"""
+    system = DocMemorySystem(str(tmp_path / "storage"), ingest_workers=0, preload_model=False)
+    core = system.docmemory.core_memory
+    rng = np.random.default_rng(0)
+    for i in range(3):
+        core.store_document("streaming search " * (i + 1), f"Doc {i}", "doc.txt",
+                            rng.standard_normal(384).astype(np.float32))
+    yield system
+    system.close()
+
+@pytest.fixture
+def client(system):
+    app.dependency_overrides[get_docmemory_system] = lambda: system
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def test_search_stream_ranks_before_results(system):
+    """The ranking comes first, then one event per result, then timings"""
+    events = list(system.search_stream("streaming", search_type="keyword", limit=2))
+    
+    assert [event["type"] for event in events] == ["ranking", "result", "result", "done"]
+    ranked_ids = [hit["id"] for hit in events[0]["results"]]
+    assert [event["result"]["id"] for event in events[1:3]] == ranked_ids
+    assert [event["rank"] for event in events[1:3]] == [1, 2]
+    
+    done = events[-1]
+    assert done["count"] == 2
+    assert done["ranking_ms"] <= done["time_to_first_result_ms"] <= done["total_ms"]
+    
+    # Streamed results match the buffered response
+    assert [event["result"] for event in events[1:3]] == system.search("streaming", search_type="keyword", limit=2)
+
+def test_ndjson_endpoint(client):
+    response = client.post("/api/search/", json={"query": "streaming", "search_type": "keyword", "stream": "ndjson"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0]["type"] == "ranking"
+    assert events[-1]["type"] == "done" and events[-1]["count"] == 3
+    assert set(events[1]["result"]) == {"id", "title", "content", "score", "source_file", "tags", "timestamp"}
+
+def test_sse_endpoint(client):
+    response = client.post("/api/search/", json={"query": "streaming", "search_type": "keyword", "stream": "sse"})
+    
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in messages] == ["event: ranking"] + ["event: result"] * 3 + ["event: done"]
+    assert json.loads(messages[-1][1][len("data: "):])["count"] == 3
+
+def test_first_result_is_sent_before_later_documents_load(system):
+    """Documents are loaded one per result event, after the ranking is sent"""
+    core = system.docmemory.core_memory
+    core.document_memories.clear()
+    loaded = []
+    load_document = core._load_document
+    core._load_document = lambda doc_id: loaded.append(doc_id) or load_document(doc_id)
+    
+    events = system.search_stream("streaming", search_type="keyword", limit=3)
+    ranking = next(events)
+    assert ranking["type"] == "ranking" and len(ranking["results"]) == 3
+    assert loaded == []
+    
+    first = next(events)
+    assert first["result"]["id"] == ranking["results"][0]["id"]
+    assert loaded == [first["result"]["id"]]
+    
+    assert [event["type"] for event in events] == ["result", "result", "done"]
+    assert loaded == [hit["id"] for hit in ranking["results"]]
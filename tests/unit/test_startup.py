@@ -0,0 +1,55 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for startup cost: import time budget and lazy model loading
+"""
+import subprocess
+import sys
+from pathlib import Path
+from main import LazyEmbeddingModel
+from tests.conftest import CountingEmbeddingModel
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Cumulative `python -X importtime` budget for `import main` (about 0.2s when measured,
+# dominated by numpy and faiss)
+IMPORT_TIME_BUDGET_US = 1_500_000
+
+HEAVY_MODULES = {"PyPDF2", "pdfminer", "docx", "PIL", "pytesseract", "pandas", "bs4",
+                 "sentence_transformers", "torch"}
+
+def test_import_time_budget():
+    """Importing the system stays within budget and loads no format libraries or models"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         f"import main, sys; print('loaded:', sorted({HEAVY_MODULES!r} & set(sys.modules)))"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, total, name = line.split("|")
+            if total.strip().isdigit():
+                cumulative[name.rstrip()] = int(total)
+    
+    assert result.stdout.splitlines()[-1] == "loaded: []"
+    assert cumulative[" main"] < IMPORT_TIME_BUDGET_US
+
+def test_model_loads_on_first_use():
+    """The embedding model is only built when it is first needed"""
+    built = []
+    model = LazyEmbeddingModel(lambda: built.append(1) or CountingEmbeddingModel())
+    assert not model.loaded and not built
+    
+    assert model.encode(["hello"]).shape == (1, 384)
+    assert model.embedding_dim == 384
+    assert built == [1]
+    assert model.load_seconds is not None
+
+def test_model_warm_up_thread():
+    """Background warm-up loads the model without blocking the caller"""
+    model = LazyEmbeddingModel(CountingEmbeddingModel)
+    model.load_in_background().join(timeout=5)
+    assert model.loaded
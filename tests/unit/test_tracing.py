@@ -0,0 +1,93 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for request tracing and explained searches
+"""
+import pytest
+from fastapi.testclient import TestClient
+from main import DocMemorySystem, MockEmbeddingModel
+from backend.main import app
+from backend.core.dependencies import get_docmemory_system
+from src import tracing
+
+@pytest.fixture
+def system(tmp_path):
+    """Full system with a few stored chunks and no background workers"""
+    model = MockEmbeddingModel()
+    system = DocMemorySystem(str(tmp_path / "storage"), ingest_workers=0, preload_model=False,
+                             embedding_model=model)
+    core = system.docmemory.core_memory
+    texts = [f"quarterly revenue report {i}" for i in range(6)]
+    for text, embedding in zip(texts, model.encode(texts)):
+        core.store_document(text, "Report", "report.txt", embedding)
+    core.document_memories.clear()
+    yield system
+    system.close()
+
+@pytest.fixture
+def client(system):
+    app.dependency_overrides[get_docmemory_system] = lambda: system
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def stage_names(nodes):
+    return [node['stage'] for node in nodes]
+
+def test_spans_nest_and_count():
+    """Stages nest under the enclosing stage and counters sum across calls"""
+    # Without a trace, spans and counters do nothing
+    with tracing.span("ignored") as stage:
+        stage.set(rows=1)
+    tracing.count("ignored")
+    
+    with tracing.trace("request") as trace:
+        with tracing.span("outer", limit=5) as outer:
+            with tracing.span("inner"):
+                for _ in range(3):
+                    with tracing.counted("loads"):
+                        pass
+            outer.set(results=2)
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError()
+    
+    explanation = trace.to_dict()
+    assert stage_names(explanation['plan']) == ["outer", "failing"]
+    outer_node = explanation['plan'][0]
+    assert outer_node['limit'] == 5 and outer_node['results'] == 2
+    assert stage_names(outer_node['children']) == ["inner"]
+    assert explanation['plan'][1]['error'] == "ValueError"
+    assert explanation['counters']['loads']['count'] == 3
+    assert list(explanation['stages']) == ["outer", "inner", "failing"]
+    assert 'profile' not in explanation
+
+def test_explain_hybrid_search(system):
+    explained = system.explain_search("quarterly revenue", search_type="hybrid", limit=3, profile=True)
+    assert len(explained['results']) == 3
+    
+    explanation = explained['explain']
+    assert stage_names(explanation['plan']) == ["embed_query", "hybrid_search", "hydrate", "format_results",
+                                                 "record_query"]
+    hybrid = explanation['plan'][1]
+    assert stage_names(hybrid['children']) == ["semantic_search", "keyword_search", "merge"]
+    index_search = hybrid['children'][0]['children'][0]
+    assert index_search['stage'] == "index_search" and index_search['candidates'] == 6
+    assert stage_names(hybrid['children'][0]['children']) == ["index_search", "ranking_fields", "rerank"]
+    # Candidates are ranked on their metadata; only the returned documents are loaded
+    assert explanation['counters']['document_loads']['count'] == 3
+    assert 'document_cache_hits' not in explanation['counters']
+    assert explanation['profile'] and 'cumulative_ms' in explanation['profile'][0]
+    assert "hybrid_search" in tracing.format_trace(explanation)
+
+def test_explain_endpoint(client):
+    response = client.post("/api/search/", json={"query": "revenue", "search_type": "keyword", "explain": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert body['count'] == len(body['results'])
+    assert stage_names(body['explain']['plan'])[0] == "keyword_search"
+    assert 'profile' not in body['explain']
+    
+    assert 'explain' not in client.post("/api/search/", json={"query": "revenue"}).json()
+    response = client.post("/api/search/", json={"query": "revenue", "explain": True, "stream": "ndjson"})
+    assert response.status_code == 400
@@ -0,0 +1,126 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for streaming upload spooling and archive unpacking
+"""
+import asyncio
+import hashlib
+import io
+import tarfile
+import zipfile
+import pytest
+from fastapi import HTTPException, UploadFile
+from backend.core.config import settings
+from backend.core.uploads import FORM_OVERHEAD, UploadLimitMiddleware, spool_bulk_upload, spool_upload
+
+def test_spool_upload_streams_and_hashes(tmp_path, monkeypatch):
+    """Uploads are written in chunks and hashed while streaming"""
+    monkeypatch.setattr(settings, 'UPLOAD_CHUNK_SIZE', 7)
+    payload = b"streamed upload content " * 50
+    upload = UploadFile(file=io.BytesIO(payload), filename="doc.txt")
+    
+    spooled = asyncio.run(spool_upload(upload, tmp_path / "doc.txt"))
+    
+    assert spooled.path.read_bytes() == payload
+    assert spooled.size == len(payload)
+    assert spooled.sha256 == hashlib.sha256(payload).hexdigest()
+    assert spooled.filename == "doc.txt"
+
+def test_spool_upload_rejects_oversized_files(tmp_path, monkeypatch):
+    """Uploads above the size limit are rejected and removed"""
+    monkeypatch.setattr(settings, 'UPLOAD_CHUNK_SIZE', 16)
+    monkeypatch.setattr(settings, 'MAX_UPLOAD_SIZE', 64)
+    upload = UploadFile(file=io.BytesIO(b"x" * 100), filename="big.txt")
+    
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(spool_upload(upload, tmp_path / "big.txt"))
+    
+    assert error.value.status_code == 413
+    assert not (tmp_path / "big.txt").exists()
+
+def test_oversized_upload_is_rejected_before_parsing(monkeypatch):
+    """A declared body over the limit gets 413 without reaching the route"""
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    from backend.core.dependencies import get_docmemory_system
+    monkeypatch.setattr(settings, 'MAX_UPLOAD_SIZE', 1000)
+    calls = []
+    app.dependency_overrides[get_docmemory_system] = lambda: calls.append(1)
+    try:
+        response = TestClient(app).post(
+            "/api/documents/upload", files={"file": ("big.txt", b"x" * (1000 + FORM_OVERHEAD))}
+        )
+    finally:
+        app.dependency_overrides.clear()
+    
+    assert response.status_code == 413
+    assert calls == []
+
+def test_streamed_body_is_cut_off_at_the_limit(monkeypatch):
+    """A body without Content-Length stops being read once it passes the limit"""
+    monkeypatch.setattr(settings, 'MAX_UPLOAD_SIZE', 0)
+    chunks = [{"type": "http.request", "body": b"x" * 30000, "more_body": True} for _ in range(10)]
+    received, sent = [], []
+    
+    async def receive():
+        return chunks.pop(0)
+    
+    async def send(message):
+        sent.append(message)
+    
+    async def route(scope, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ConnectionError("client disconnected")
+            received.append(message)
+            if not message["more_body"]:
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+    
+    scope = {"type": "http", "path": "/api/documents/upload", "headers": []}
+    asyncio.run(UploadLimitMiddleware(route)(scope, receive, send))
+    
+    assert len(received) == FORM_OVERHEAD // 30000
+    assert [message.get("status") for message in sent] == [413, None]
+
+def make_archives(tmp_path):
+    members = {
+        "docs/a.txt": b"alpha document",
+        "docs/b.txt": b"beta document",
+        "docs/copy-of-a.txt": b"alpha document",
+        "docs/image.bin": b"\x00\x01",
+    }
+    zip_path = tmp_path / "docs.zip"
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    tar_path = tmp_path / "docs.tar.gz"
+    with tarfile.open(tar_path, 'w:gz') as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return zip_path, tar_path
+
+@pytest.mark.parametrize("archive_name", ["docs.zip", "docs.tar.gz"])
+def test_spool_bulk_upload_unpacks_archives(tmp_path, archive_name):
+    """Archive members are spooled one by one, deduplicated and filtered by format"""
+    make_archives(tmp_path)
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    paths = iter(spool_dir / f"{i}.txt" for i in range(100))
+    files = [
+        UploadFile(file=open(tmp_path / archive_name, 'rb'), filename=archive_name),
+        UploadFile(file=io.BytesIO(b"gamma document"), filename="c.txt"),
+    ]
+    
+    bulk = spool_bulk_upload(files, lambda suffix: next(paths), ['.txt'])
+    
+    assert [upload.filename for upload in bulk.uploads] == ["docs/a.txt", "docs/b.txt", "c.txt"]
+    assert bulk.uploads[0].path.read_bytes() == b"alpha document"
+    assert bulk.duplicates == [{"filename": "docs/copy-of-a.txt", "duplicate_of": "docs/a.txt"}]
+    assert [entry["filename"] for entry in bulk.skipped] == ["docs/image.bin"]
+    assert len(list(spool_dir.iterdir())) == 3
+    files[0].file.close()
@@ -0,0 +1,85 @@
+# → Architecture & Build by DocSynapse
+# Intelligent by Design. Crafted for Humanity.
+
+"""
+Unit tests for warm-up and readiness
+"""
+import threading
+import time
+import pytest
+from main import DocMemorySystem
+from backend.core import dependencies
+from backend.core.warmup import WarmupState
+
+@pytest.fixture
+def system(tmp_path):
+    """Full system with lazy model loading and no background workers"""
+    system = DocMemorySystem(str(tmp_path / "storage"), ingest_workers=0, preload_model=False)
+    yield system
+    system.close()
+
+def test_warm_up_replays_frequent_queries(system):
+    """Warm-up loads the model, touches storage and replays the most frequent queries"""
+    for query in ["alpha", "alpha", "beta", "alpha", "beta", "gamma"]:
+        system.search(query, search_type="keyword")
+    assert system.search_system.top_queries(2) == [("alpha", "keyword"), ("beta", "keyword")]
+    assert not system.embedding_model.loaded
+    
+    timings = system.warm_up(replay_queries=2)
+    
+    assert system.embedding_model.loaded
+    assert set(timings) == {"model_load", "encode", "index", "database", "replay"}
+
+class FakeSystem:
+    def __init__(self, fail=False):
+        self.fail = fail
+    
+    def warm_up(self, replay_queries=0):
+        if self.fail:
+            raise RuntimeError("model download failed")
+        return {"model_load": 0.5, "encode": 0.01}
+
+def test_readiness_follows_warm_up():
+    """The readiness report turns ready only after warm-up completes"""
+    state = WarmupState()
+    assert state.report()["status"] == "not_started"
+    
+    state.start(FakeSystem).join(timeout=5)
+    
+    report = state.report()
+    assert report["status"] == "ready"
+    assert set(report["phases"]) == {"system", "model_load", "encode"}
+    assert report["total_seconds"] is not None
+
+def test_failed_warm_up_is_reported():
+    """A failing warm-up keeps the instance not ready and reports the error"""
+    state = WarmupState()
+    state.run(lambda: FakeSystem(fail=True))
+    
+    assert not state.ready
+    assert state.report()["status"] == "failed"
+    assert "model download failed" in state.report()["error"]
+
+def test_system_is_built_once_during_warm_up(monkeypatch):
+    """Requests arriving while warm-up builds the system wait for that instance"""
+    built = []
+    
+    def slow_build():
+        time.sleep(0.2)
+        built.append(FakeSystem())
+        return built[-1]
+    
+    monkeypatch.setattr(dependencies, "build_docmemory_system", slow_build)
+    monkeypatch.setattr(dependencies, "_system", None)
+    state = WarmupState()
+    warmup = state.start(dependencies.get_docmemory_system)
+    seen = []
+    requests = [threading.Thread(target=lambda: seen.append(dependencies.get_docmemory_system()))
+                for _ in range(4)]
+    for thread in requests:
+        thread.start()
+    for thread in [warmup, *requests]:
+        thread.join(timeout=5)
+    
+    assert len(built) == 1
+    assert state.ready and all(system is built[0] for system in seen)
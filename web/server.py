@@ -7,8 +7,10 @@ import sys
 # Add the parent directory to the path to import docmemory
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+import hashlib
 import json
+import tempfile
 from datetime import datetime
 
 # Import DocMemory system
@@ -23,8 +25,16 @@ except ImportError:
                 return 0
             def search(self, query, search_type="hybrid", limit=10):
                 return []
-            def add_document_from_file(self, file_path, title=None, tags=None, custom_metadata=None):
+            def search_stream(self, query, search_type="hybrid", limit=10):
+                yield {'type': 'ranking', 'results': []}
+                yield {'type': 'done', 'count': 0, 'ranking_ms': 0.0,
+                       'time_to_first_result_ms': None, 'total_ms': 0.0}
+            def add_document_from_file(self, file_path, title=None, tags=None, custom_metadata=None, file_hash=None):
                 return ["mock_id"]
+            def compute_file_hash(self, file_path):
+                return ""
+            def find_documents_by_file_hash(self, file_hash):
+                return None
             def get_document(self, doc_id):
                 return None
             def get_related_documents(self, doc_id, limit=5):
@@ -65,25 +75,48 @@ def search_documents():
     data = request.get_json()
     query = data.get('query', '')
     search_type = data.get('type', 'hybrid')
+    stream = data.get('stream')
+    
+    if stream in STREAM_MIMETYPES:
+        return stream_search(query, search_type, stream)
     
     # Perform search using DocMemory system
     results = docmemory_system.search(query, search_type=search_type, limit=10)
     
     # Format results
-    formatted_results = []
-    for result in results:
-        formatted_results.append({
-            'id': result['id'],
-            'title': result['title'],
-            'content': result['content'][:300] + '...' if len(result['content']) > 300 else result['content'],
-            'score': result['score'],
-            'source': result['source_file'],
-            'tags': result.get('tags', []),
-            'timestamp': result.get('timestamp', '')
-        })
+    formatted_results = [format_result(result) for result in results]
     
     return jsonify({'results': formatted_results})
 
+STREAM_MIMETYPES = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+def format_result(result):
+    """Search result fields shown by the UI"""
+    return {
+        'id': result['id'],
+        'title': result['title'],
+        'content': result['content'][:300] + '...' if len(result['content']) > 300 else result['content'],
+        'score': result['score'],
+        'source': result['source_file'],
+        'tags': result.get('tags', []),
+        'timestamp': result.get('timestamp', '')
+    }
+
+def stream_search(query, search_type, stream):
+    """Stream the ranked IDs and scores, then each result, as NDJSON or server-sent events"""
+    def generate():
+        for event in docmemory_system.search_stream(query, search_type=search_type, limit=10):
+            if event['type'] == 'result':
+                event = {**event, 'result': format_result(event['result'])}
+            data = json.dumps(event)
+            yield f"event: {event['type']}\ndata: {data}\n\n" if stream == 'sse' else data + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[stream])
+
+# Uploads are streamed to disk in chunks of this size and rejected above the limit
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+
 @app.route('/api/upload', methods=['POST'])
 def upload_document():
     """Upload a document to memory"""
@@ -94,16 +127,39 @@ def upload_document():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
-    # Save file temporarily
-    temp_path = f"temp_{file.filename}"
-    file.save(temp_path)
-    
+    # Stream the upload to a unique spool file, hashing it on the way
+    suffix = os.path.splitext(file.filename)[1]
+    fd, temp_path = tempfile.mkstemp(prefix='docmemory_upload_', suffix=suffix)
     try:
+        digest = hashlib.sha256()
+        size = 0
+        too_large = False
+        with os.fdopen(fd, 'wb') as spool_file:
+            while True:
+                chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_SIZE:
+                    too_large = True
+                    break
+                digest.update(chunk)
+                spool_file.write(chunk)
+        if too_large:
+            os.remove(temp_path)
+            return jsonify({'error': f'Upload exceeds maximum size of {MAX_UPLOAD_SIZE} bytes'}), 413
+        file_hash = digest.hexdigest()
+        
+        # A re-upload of identical content returns the stored chunks
+        existing_ids = docmemory_system.find_documents_by_file_hash(file_hash)
+        duplicate = existing_ids is not None
+        
         # Add document to DocMemory system
-        doc_ids = docmemory_system.add_document_from_file(
+        doc_ids = existing_ids if duplicate else docmemory_system.add_document_from_file(
             temp_path,
             title=file.filename,
-            tags=['uploaded']
+            tags=['uploaded'],
+            file_hash=file_hash
         )
         
         # Clean up temp file
@@ -112,7 +168,8 @@ def upload_document():
         return jsonify({
             'success': True,
             'document_ids': doc_ids,
-            'count': len(doc_ids)
+            'count': len(doc_ids),
+            'duplicate': duplicate
         })
     except Exception as e:
         # Clean up temp file even if there's an error